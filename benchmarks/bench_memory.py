@@ -0,0 +1,145 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+
+Metadata memory benchmark
+=========================
+
+This script measures the memory held by the iRODS metadata of the files of a synthetic study, as it is held
+during a run: one IrodsSeqFileMetadata per file, built from the file's raw metadata as fetched from iRODS.
+With --baseline, it measures the representation the metadata had before the slots and the interning instead:
+objects with a __dict__, holding their own strings and sets of values, built the same way as back then.
+
+Usage (from the root of the repository):
+    python -m benchmarks.bench_memory --files 10000 20000
+    python -m benchmarks.bench_memory --files 10000 --baseline
+"""
+
+import argparse
+import gc
+import tracemalloc
+
+import mcheck.metadata.irods_metadata.constants as irods_consts
+from benchmarks import synthetic_data
+from benchmarks.fake_providers import convert_baton_data_object
+from mcheck.metadata.common.identifiers import EntityIdentifier
+from mcheck.metadata.irods_metadata.file_metadata import IrodsSeqFileMetadata
+
+
+class _DictBasedACL:
+    def __init__(self, access_group: str, zone: str, permission):
+        self.access_group = access_group
+        self.zone = zone
+        self.permission = permission
+
+
+class _DictBasedFileReplica:
+    def __init__(self, checksum: str, replica_nr: int):
+        self.checksum = checksum
+        self.replica_nr = replica_nr
+
+
+class _DictBasedSeqFileMetadata:
+    """
+    The metadata of a file as IrodsSeqFileMetadata held it before the slots and the interning.
+    """
+    def __init__(self, fpath: str, file_replicas, acls, avus):
+        self.fpath = fpath
+        self.file_replicas = file_replicas
+        self.acls = acls
+        self.avus = avus
+        self.samples = None
+        self.libraries = None
+        self.studies = None
+        self.checksum_in_meta = None
+        self.checksum_at_upload = None
+        self._reference_paths = []
+        self.run_ids = []
+        self.lane_ids = []
+        self._npg_qc_values = [None]
+        self._target_values = [None]
+
+    def get_values_for_attribute(self, attribute: str):
+        found = self.avus.get(attribute)
+        return found if found else set()
+
+    @classmethod
+    def from_baton_data_object(cls, data_object: dict):
+        avus = {}
+        for avu in data_object['avus']:
+            avus.setdefault(avu['attribute'], set()).add(avu['value'])
+        metadata = cls(data_object['collection'] + '/' + data_object['data_object'],
+                       file_replicas=[_DictBasedFileReplica(replica['checksum'], replica['number'])
+                                      for replica in data_object['replicates']],
+                       acls=[_DictBasedACL(acl['owner'], acl['zone'], irods_consts.IrodsPermission(acl['level']))
+                             for acl in data_object['access']],
+                       avus=avus)
+        metadata.checksum_at_upload = {replica.checksum for replica in metadata.file_replicas}
+        metadata.samples = {'name': metadata.get_values_for_attribute('sample'),
+                            'accession_number': metadata.get_values_for_attribute('sample_accession_number'),
+                            'internal_id': metadata.get_values_for_attribute('sample_id')}
+        metadata.libraries = EntityIdentifier.separate_identifiers_by_type(
+            metadata.get_values_for_attribute('library').union(metadata.get_values_for_attribute('library_id')))
+        metadata.studies = {'name': metadata.get_values_for_attribute('study'),
+                            'accession_number': metadata.get_values_for_attribute('study_accession_number'),
+                            'internal_id': metadata.get_values_for_attribute('study_id')}
+        metadata.checksum_in_meta = metadata.get_values_for_attribute('md5')
+        metadata._reference_paths = metadata.get_values_for_attribute('reference')
+        metadata._npg_qc_values = metadata.get_values_for_attribute('manual_qc')
+        metadata._target_values = metadata.get_values_for_attribute('target')
+        return metadata
+
+
+def _build_metadata(file_nr: int):
+    raw_metadata = convert_baton_data_object(synthetic_data.get_baton_data_object(file_nr))
+    return IrodsSeqFileMetadata.from_raw_metadata(raw_metadata)
+
+
+def _build_dict_based_metadata(file_nr: int):
+    return _DictBasedSeqFileMetadata.from_baton_data_object(synthetic_data.get_baton_data_object(file_nr))
+
+
+def measure_bytes_per_file(files: int, baseline_representation: bool=False) -> float:
+    build_metadata = _build_dict_based_metadata if baseline_representation else _build_metadata
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    metadata = [build_metadata(file_nr) for file_nr in range(files)]
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del metadata
+    return held / files
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='bench_memory',
+                                     description='Measure the memory held by the iRODS metadata of each file')
+    parser.add_argument('--files', type=int, nargs='+', default=[10000],
+                        help='The numbers of files to build the metadata of, one measurement for each of them')
+    parser.add_argument('--baseline', action='store_true',
+                        help='Measure the metadata as it was held before the slots and the interning')
+    args = parser.parse_args()
+    for files in args.files:
+        print("%s files: %.0f bytes per file%s" % (files, measure_bytes_per_file(files, args.baseline),
+                                                   ' (baseline)' if args.baseline else ''))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+
+Argument checks microbenchmark
+==============================
+
+This script measures the cost per call of the helpers decorated with wrappers.check_args_not_none,
+next to the same helpers checked the way the decorator used to (with inspect.getcallargs on every call)
+and not checked at all (as with MCHECK_SKIP_ARG_CHECKS set).
+
+Usage (from the root of the repository):
+    python -m benchmarks.bench_wrappers --calls 200000
+"""
+
+import argparse
+import functools
+import inspect
+import timeit
+
+from mcheck.com import utils
+from mcheck.metadata.common.identifiers import EntityIdentifier
+
+
+def check_args_not_none_by_getcallargs(funct):
+    @functools.wraps(funct)
+    def wrapper(*args, **kwargs):
+        func_args = inspect.getcallargs(funct, *args, **kwargs)
+        none_args = [(arg, val) for arg, val in list(func_args.items()) if val is None]
+        if none_args:
+            raise ValueError("None arguments have been provided for this function: "+str(func_args))
+        return funct(*args, **kwargs)
+    return wrapper
+
+
+def get_undecorated(funct):
+    return getattr(funct, '__wrapped__', funct)
+
+
+def get_calls():
+    """
+    :return: list of (name, call) - each call runs one of the decorated helpers, as it is called per file
+    """
+    is_internal_id = EntityIdentifier.is_internal_id.__func__
+    is_accession_nr = EntityIdentifier.is_accession_nr.__func__
+    extract_fname = utils.extract_fname
+    return [('EntityIdentifier.is_internal_id', is_internal_id, lambda funct: funct(EntityIdentifier, '1234')),
+            ('EntityIdentifier.is_accession_nr', is_accession_nr, lambda funct: funct(EntityIdentifier, 'EGAN001')),
+            ('utils.extract_fname', extract_fname, lambda funct: funct('/seq/1234/1234_1#1.cram'))]
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='bench_wrappers',
+                                     description='Measure the cost per call of wrappers.check_args_not_none')
+    parser.add_argument('--calls', type=int, default=200000, help='The number of calls timed for each helper')
+    args = parser.parse_args()
+    print("%-35s %15s %15s %15s" % ('helper (ns per call)', 'getcallargs', 'precomputed', 'unchecked'))
+    for name, decorated, call in get_calls():
+        undecorated = get_undecorated(decorated)
+        variants = [check_args_not_none_by_getcallargs(undecorated), decorated, undecorated]
+        timings = [min(timeit.repeat(functools.partial(call, funct), number=args.calls, repeat=3)) / args.calls * 1e9
+                   for funct in variants]
+        print("%-35s %15.0f %15.0f %15.0f" % ((name,) + tuple(timings)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+
+Fake providers module
+=====================
+
+This module stands in for iRODS (baton), samtools and the Sequencescape warehouse, answering from the synthetic study
+with a configurable latency per call. Only the lowest level calls are replaced (fetching one file's metadata by path,
+one file's header and opening a connection to Sequencescape), so everything above them is the real code.
+"""
+
+import time
+from unittest import mock
+
+from sequencescape import Sample, Study, Library
+
+from benchmarks import synthetic_data
+from mcheck.metadata.common.identifiers import EntityIdentifier
+from mcheck.metadata.file_header_metadata.header_meta_provider import SAMFileHeaderMetadataProvider
+from mcheck.metadata.file_header_metadata.header_metadata import SAMFileHeaderMetadata
+from mcheck.metadata.irods_metadata import constants as irods_consts
+from mcheck.metadata.irods_metadata.acl import IrodsACL
+from mcheck.metadata.irods_metadata.file_metadata import IrodsRawFileMetadata
+from mcheck.metadata.irods_metadata.file_replica import IrodsFileReplica
+from mcheck.metadata.irods_metadata.irods_meta_provider import iRODSMetadataProvider
+from mcheck.metadata.seqscape_metadata.seqscape_meta_provider import SeqscapeRawMetadataProvider
+
+
+def _wait(latency: float):
+    if latency:
+        time.sleep(latency)
+
+
+def convert_baton_data_object(data_object: dict) -> IrodsRawFileMetadata:
+    """
+    Converts a data object in baton's JSON format into the file's raw metadata,
+    the same way IrodsRawFileMetadata.from_baton_wrapper does for the baton wrapper's objects.
+    """
+    avus = {}
+    for avu in data_object['avus']:
+        avus.setdefault(avu['attribute'], set()).add(avu['value'])
+    return IrodsRawFileMetadata(fpath=data_object['collection'] + '/' + data_object['data_object'],
+                                file_replicas=[IrodsFileReplica(replica['checksum'], replica['number'])
+                                               for replica in data_object['replicates']],
+                                acls=[IrodsACL(acl['owner'], acl['zone'], irods_consts.IrodsPermission(acl['level']))
+                                      for acl in data_object['access']],
+                                avus=avus)
+
+
+class FakeIrods:
+    def __init__(self, latency: float=0):
+        self.latency = latency
+
+    def fetch_raw_file_metadata_by_path(self, fpath):
+        _wait(self.latency)
+        return convert_baton_data_object(synthetic_data.get_baton_data_object(synthetic_data.get_file_nr(fpath)))
+
+
+class FakeSamtools:
+    def __init__(self, latency: float=0):
+        self.latency = latency
+
+    def fetch_metadata(self, fpath, irods=False):
+        _wait(self.latency)
+        file_nr = synthetic_data.get_file_nr(fpath)
+        sample = synthetic_data.get_sample_ids(synthetic_data.get_sample_nr(file_nr))
+        library = synthetic_data.get_library_ids(synthetic_data.get_library_nr(file_nr))
+        return SAMFileHeaderMetadata(fpath=fpath,
+                                     samples=EntityIdentifier.separate_identifiers_by_type([sample['name']]),
+                                     libraries=EntityIdentifier.separate_identifiers_by_type([library['internal_id']]),
+                                     platforms=['ILLUMINA'])
+
+
+class FakeSeqscapeMapper:
+    """
+    This class answers the queries for one type of entity, as the mappers of a Sequencescape connection do.
+    Each query costs one latency, whatever the number of ids in it.
+    """
+
+    def __init__(self, entity_class, get_ids, entities: int, latency: float=0):
+        self.entity_class = entity_class
+        self.get_ids = get_ids
+        self.entities = entities
+        self.latency = latency
+        self.queries = 0
+        self._entities = {}
+        self._nr_by_id_type = {}
+        for entity_nr in range(entities):
+            for id_type, id_value in get_ids(entity_nr).items():
+                self._nr_by_id_type.setdefault(id_type, {})[id_value] = entity_nr
+
+    def _find_nr(self, id_type: str, id_value) -> int:
+        return self._nr_by_id_type.get(id_type, {}).get(str(id_value))
+
+    def get_entity(self, entity_nr: int):
+        # The same entity is returned by all the queries, as it would be by the ORM of a real connection:
+        if entity_nr not in self._entities:
+            entity = self.entity_class()
+            for id_type, id_value in self.get_ids(entity_nr).items():
+                setattr(entity, id_type, id_value)
+            self._entities[entity_nr] = entity
+        return self._entities[entity_nr]
+
+    def _query(self, id_type, ids):
+        _wait(self.latency)
+        self.queries += 1
+        entity_nrs = [self._find_nr(id_type, id_value) for id_value in ids]
+        return [self.get_entity(entity_nr) for entity_nr in entity_nrs if entity_nr is not None]
+
+    def get_by_name(self, names):
+        return self._query('name', names)
+
+    def get_by_id(self, internal_ids):
+        return self._query('internal_id', internal_ids)
+
+    def get_by_accession_number(self, accession_numbers):
+        return self._query('accession_number', accession_numbers)
+
+
+class FakeSampleMapper(FakeSeqscapeMapper):
+    def get_associated_with_study(self, studies):
+        _wait(self.latency)
+        self.queries += 1
+        samples = []
+        for study in studies:
+            study_nr = int(study.internal_id) - synthetic_data.FIRST_STUDY_ID
+            first_sample_nr = study_nr * synthetic_data.SAMPLES_PER_STUDY
+            samples.extend(self.get_entity(sample_nr) for sample_nr in
+                           range(first_sample_nr, min(first_sample_nr + synthetic_data.SAMPLES_PER_STUDY,
+                                                      self.entities)))
+        return samples
+
+
+class FakeStudyMapper(FakeSeqscapeMapper):
+    def get_associated_with_sample(self, samples):
+        _wait(self.latency)
+        self.queries += 1
+        study_nrs = {synthetic_data.get_study_nr(int(sample.internal_id) - synthetic_data.FIRST_SAMPLE_ID)
+                     for sample in samples}
+        return [self.get_entity(study_nr) for study_nr in sorted(study_nrs)]
+
+
+class FakeSeqscapeConnection:
+    """
+    This class stands in for a connection to the Sequencescape warehouse holding the entities of the synthetic study.
+    """
+
+    def __init__(self, files: int, latency: float=0):
+        samples = (files + synthetic_data.FILES_PER_SAMPLE - 1) // synthetic_data.FILES_PER_SAMPLE
+        libraries = (files + synthetic_data.FILES_PER_LIBRARY - 1) // synthetic_data.FILES_PER_LIBRARY
+        studies = synthetic_data.get_study_nr(samples - 1) + 1 if samples else 0
+        self.sample = FakeSampleMapper(Sample, synthetic_data.get_sample_ids, samples, latency)
+        self.study = FakeStudyMapper(Study, synthetic_data.get_study_ids, studies, latency)
+        self.library = FakeSeqscapeMapper(Library, synthetic_data.get_library_ids, libraries, latency)
+        self.well = FakeSeqscapeMapper(Library, synthetic_data.get_library_ids, 0, latency)
+        self.multiplexed_library = FakeSeqscapeMapper(Library, synthetic_data.get_library_ids, 0, latency)
+
+
+def install_fake_providers(files: int, irods_latency: float=0, header_latency: float=0,
+                           seqscape_latency: float=0) -> list:
+    """
+    Replaces the calls to iRODS, samtools and Sequencescape with the fakes answering from the synthetic study.
+    :param files: the number of files in the synthetic study
+    :param irods_latency: the number of seconds each fetch of a file's iRODS metadata takes
+    :param header_latency: the number of seconds each fetch of a file's header takes
+    :param seqscape_latency: the number of seconds each query to Sequencescape takes
+    :return: list of the patches started, to be stopped by the caller (see mock.patch.stopall)
+    """
+    fake_irods = FakeIrods(irods_latency)
+    fake_samtools = FakeSamtools(header_latency)
+    patches = [mock.patch.object(iRODSMetadataProvider, 'fetch_raw_file_metadata_by_path',
+                                 fake_irods.fetch_raw_file_metadata_by_path),
+               mock.patch.object(SAMFileHeaderMetadataProvider, 'fetch_metadata', fake_samtools.fetch_metadata),
+               mock.patch.object(SeqscapeRawMetadataProvider, '_get_connection',
+                                 lambda host, port, db_name, user: FakeSeqscapeConnection(files, seqscape_latency))]
+    for patch in patches:
+        patch.start()
+    return patches
@@ -0,0 +1,154 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+
+Benchmark runner
+================
+
+This script runs the checks of a synthetic study through mcheck.main.api, with iRODS, samtools and Sequencescape
+replaced by the fakes in benchmarks.fake_providers, and reports the files/s, the peak RSS and the time spent
+in each stage. Each size is run in its own process, so that the peak RSS of a run isn't inflated by the previous one.
+
+Usage (from the root of the repository):
+    python -m benchmarks.run_benchmark --files 1000 10000 100000 --irods_latency 0.005 --json results.json
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+from collections import OrderedDict
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(prog='run_benchmark',
+                                     description='Benchmark the checks on a synthetic study, without iRODS, '
+                                                 'samtools or Sequencescape')
+    parser.add_argument('--files', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='The numbers of files to check, one run for each of them (default: %s)' % DEFAULT_SIZES)
+    parser.add_argument('--irods_latency', type=float, default=0,
+                        help='The number of seconds each fetch of a file\'s iRODS metadata takes')
+    parser.add_argument('--header_latency', type=float, default=0,
+                        help='The number of seconds each fetch of a file\'s header takes')
+    parser.add_argument('--seqscape_latency', type=float, default=0,
+                        help='The number of seconds each query to Sequencescape takes')
+    parser.add_argument('--irods_workers', type=int, default=1)
+    parser.add_argument('--header_workers', type=int, default=1)
+    parser.add_argument('--seqscape_workers', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=1,
+                        help='The number of processes to split the files between')
+    parser.add_argument('--pipelined', action='store_true',
+                        help='Run the checks of each file through a pipeline of stages')
+    parser.add_argument('--json', dest='json_output',
+                        help='Write the results of all the runs as JSON to this file')
+    parser.add_argument('--dump_baton_json',
+                        help='Write the data objects of the largest synthetic study, one per line, to this file '
+                             '(e.g. to run `given_at_stdin` on it) and exit')
+    parser.add_argument('--single_run', action='store_true', help=argparse.SUPPRESS)
+    return parser.parse_args(args)
+
+
+def get_peak_rss_mb() -> float:
+    # On Linux ru_maxrss is in kilobytes; the processes of a sharded run are counted by their own peak:
+    peak_rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                   resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return round(peak_rss / 1024, 1)
+
+
+def run_once(args) -> OrderedDict:
+    """
+    Runs the checks of a synthetic study of args.files[0] files in this process.
+    :return: OrderedDict with the results of the run
+    """
+    from benchmarks import synthetic_data
+    from benchmarks.fake_providers import install_fake_providers
+    from mcheck.com.profiling import PROFILER
+    from mcheck.main.api import check_metadata_fetched_by_path
+    from mcheck.main.pipeline import FileChecksPipeline
+    from mcheck.main.run_statistics import RunStatistics
+
+    files = args.files[0]
+    install_fake_providers(files, args.irods_latency, args.header_latency, args.seqscape_latency)
+    fpaths = synthetic_data.get_fpaths(files)
+    run_stats = RunStatistics()
+    pipeline = None
+    if args.pipelined:
+        pipeline = FileChecksPipeline(header_workers=args.header_workers, seqscape_workers=args.seqscape_workers,
+                                      run_stats=run_stats)
+    PROFILER.enable()
+    started = time.perf_counter()
+    check_results_by_path = check_metadata_fetched_by_path(fpaths, run_stats=run_stats,
+                                                           irods_workers=args.irods_workers, pipeline=pipeline,
+                                                           workers=args.workers, header_workers=args.header_workers)
+    wall_time = time.perf_counter() - started
+    return OrderedDict([('files', files),
+                        ('files_checked', len(check_results_by_path)),
+                        ('wall_time_s', round(wall_time, 3)),
+                        ('files_per_s', round(files / wall_time, 2) if wall_time > 0 else None),
+                        ('peak_rss_mb', get_peak_rss_mb()),
+                        ('stages', PROFILER.get_report())])
+
+
+def run_in_subprocess(args, files: int) -> OrderedDict:
+    command = [sys.executable, '-m', 'benchmarks.run_benchmark', '--single_run', '--files', str(files),
+               '--irods_latency', str(args.irods_latency), '--header_latency', str(args.header_latency),
+               '--seqscape_latency', str(args.seqscape_latency), '--irods_workers', str(args.irods_workers),
+               '--header_workers', str(args.header_workers), '--seqscape_workers', str(args.seqscape_workers),
+               '--workers', str(args.workers)]
+    if args.pipelined:
+        command.append('--pipelined')
+    output = subprocess.check_output(command, universal_newlines=True)
+    # The checks might print to stdout too, so the result is the last line:
+    return json.loads(output.strip().splitlines()[-1], object_pairs_hook=OrderedDict)
+
+
+def format_result(result: OrderedDict) -> str:
+    lines = ["%s files: %s s, %s files/s, peak RSS %s MB" % (result['files'], result['wall_time_s'],
+                                                            result['files_per_s'], result['peak_rss_mb'])]
+    for stage, stage_report in result['stages'].items():
+        lines.append("    %s: %s" % (stage, ', '.join("%s = %s" % (name, value)
+                                                      for name, value in stage_report.items())))
+    return '\n'.join(lines)
+
+
+def main():
+    args = parse_args()
+    if args.dump_baton_json:
+        from benchmarks import synthetic_data
+        synthetic_data.write_baton_json(max(args.files), args.dump_baton_json)
+        return
+    if args.single_run:
+        print(json.dumps(run_once(args)))
+        return
+    results = []
+    for files in args.files:
+        result = run_in_subprocess(args, files)
+        print(format_result(result))
+        results.append(result)
+    if args.json_output:
+        with open(args.json_output, 'w') as json_file:
+            json.dump(results, json_file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+
+Synthetic data module
+=====================
+
+This module generates the metadata of a synthetic sequencing study, as baton would return it from iRODS.
+Everything about a file is computed from its number, so the fake providers can answer for any file
+without keeping the whole study in memory. The files are laid out like the lanelets of real runs:
+96 files per run (8 lanes x 12 tags), 2 files per library, 4 files per sample and 250 samples per study.
+"""
+
+import hashlib
+import json
+import re
+
+FIRST_RUN_ID = 20000
+LANES_PER_RUN = 8
+TAGS_PER_LANE = 12
+FILES_PER_LIBRARY = 2
+FILES_PER_SAMPLE = 4
+SAMPLES_PER_STUDY = 250
+
+FIRST_SAMPLE_ID = 1000000
+FIRST_LIBRARY_ID = 2000000
+FIRST_STUDY_ID = 3000
+
+REFERENCE = '/lustre/scratch110/srpipe/references/Homo_sapiens/GRCh38_15/all/fasta/Homo_sapiens.GRCh38_15.fa'
+
+_FPATH_REGEX = re.compile(r'^/seq/(?P<run_id>[0-9]+)/(?P=run_id)_(?P<lane>[0-9])#(?P<tag>[0-9]+)\.cram$')
+
+
+def get_fpath(file_nr: int) -> str:
+    files_per_run = LANES_PER_RUN * TAGS_PER_LANE
+    run_id = FIRST_RUN_ID + file_nr // files_per_run
+    lane = file_nr % files_per_run // TAGS_PER_LANE + 1
+    tag = file_nr % TAGS_PER_LANE + 1
+    return '/seq/%s/%s_%s#%s.cram' % (run_id, run_id, lane, tag)
+
+
+def get_file_nr(fpath: str) -> int:
+    match = _FPATH_REGEX.match(fpath)
+    if not match:
+        raise ValueError("Not a synthetic file path: %s" % fpath)
+    return (int(match.group('run_id')) - FIRST_RUN_ID) * LANES_PER_RUN * TAGS_PER_LANE + \
+           (int(match.group('lane')) - 1) * TAGS_PER_LANE + int(match.group('tag')) - 1
+
+
+def get_fpaths(files: int):
+    return [get_fpath(file_nr) for file_nr in range(files)]
+
+
+def get_sample_nr(file_nr: int) -> int:
+    return file_nr // FILES_PER_SAMPLE
+
+
+def get_library_nr(file_nr: int) -> int:
+    return file_nr // FILES_PER_LIBRARY
+
+
+def get_study_nr(sample_nr: int) -> int:
+    return sample_nr // SAMPLES_PER_STUDY
+
+
+def get_sample_ids(sample_nr: int) -> dict:
+    return {'name': 'SC_BENCH%07d' % sample_nr,
+            'internal_id': str(FIRST_SAMPLE_ID + sample_nr),
+            'accession_number': 'EGAN%011d' % (sample_nr + 1)}
+
+
+def get_library_ids(library_nr: int) -> dict:
+    return {'name': 'BENCHLIB%07d' % library_nr,
+            'internal_id': str(FIRST_LIBRARY_ID + library_nr)}
+
+
+def get_study_ids(study_nr: int) -> dict:
+    return {'name': 'Benchmark study %s' % study_nr,
+            'internal_id': str(FIRST_STUDY_ID + study_nr),
+            'accession_number': 'EGAS%011d' % (study_nr + 1)}
+
+
+def get_checksum(fpath: str) -> str:
+    return hashlib.md5(fpath.encode()).hexdigest()
+
+
+def get_baton_data_object(file_nr: int) -> dict:
+    """
+    :param file_nr: the number of the file in the synthetic study
+    :return: dict - the data object of the file, in the JSON format output by baton-list --avu --acl --replicate
+    """
+    fpath = get_fpath(file_nr)
+    checksum = get_checksum(fpath)
+    sample = get_sample_ids(get_sample_nr(file_nr))
+    library = get_library_ids(get_library_nr(file_nr))
+    study = get_study_ids(get_study_nr(get_sample_nr(file_nr)))
+    run_id, lane_and_tag = fpath.split('/')[-1].split('.')[0].split('_')
+    avus = [('sample', sample['name']),
+            ('sample_id', sample['internal_id']),
+            ('sample_accession_number', sample['accession_number']),
+            ('sample_common_name', 'Homo sapiens'),
+            ('library_id', library['internal_id']),
+            ('study', study['name']),
+            ('study_id', study['internal_id']),
+            ('study_accession_number', study['accession_number']),
+            ('md5', checksum),
+            ('reference', REFERENCE),
+            ('type', 'cram'),
+            ('target', '1'),
+            ('manual_qc', '1'),
+            ('alignment', '1'),
+            ('id_run', run_id),
+            ('lane', lane_and_tag.split('#')[0]),
+            ('tag_index', lane_and_tag.split('#')[1])]
+    return {'collection': fpath.rsplit('/', 1)[0],
+            'data_object': fpath.rsplit('/', 1)[1],
+            'avus': [{'attribute': attribute, 'value': value} for attribute, value in avus],
+            'access': [{'owner': 'ss_%s' % study['internal_id'], 'zone': 'seq', 'level': 'read'},
+                       {'owner': 'irods', 'zone': 'seq', 'level': 'own'}],
+            'replicates': [{'checksum': checksum, 'number': 0, 'valid': True, 'location': 'irods-seq-sr04',
+                            'resource': 'irods-seq-sr04-ddn-gc10-30-31-32'},
+                           {'checksum': checksum, 'number': 1, 'valid': True, 'location': 'irods-seq-i10',
+                            'resource': 'irods-seq-i10-bc'}]}
+
+
+def write_baton_json(files: int, output_path: str):
+    """
+    Writes the data objects of the synthetic study to a file, one per line, as they would be output by baton-list.
+    :param files: the number of files in the synthetic study
+    :param output_path: the path of the file to write
+    """
+    with open(output_path, 'w') as output:
+        for file_nr in range(files):
+            output.write(json.dumps(get_baton_data_object(file_nr)) + '\n')
@@ -21,12 +21,14 @@ This file has been created on Jun 10, 2016.
 
 from mcheck.results.checks_results import CheckResult, RESULT
 from mcheck.check_names import CHECK_NAMES
+from mcheck.com.profiling import profiled
 from collections import  defaultdict
 
 
 class FileMetadataComparison:
 
     @staticmethod
+    @profiled('comparison', count_files=lambda irods_metadata_dict, *args, **kwargs: len(irods_metadata_dict))
     def check_metadata_across_different_sources(irods_metadata_dict, header_metadata_dict, seqsc_metadata_dict, issues_dict):
         """
         This function checks the metadata from 3 different sources in terms of samples, libraries and studies.
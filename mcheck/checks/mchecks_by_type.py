@@ -21,12 +21,18 @@ This file has been created on Jun 10, 2016.
 
 import sys
 import os
-from collections import  defaultdict
+import itertools
+from collections import  defaultdict, OrderedDict
 from mcheck.metadata.irods_metadata.irods_meta_provider import iRODSMetadataProvider
-from mcheck.metadata.seqscape_metadata.seqscape_meta_provider import SeqscapeRawMetadataProvider
+from mcheck.metadata.seqscape_metadata.seqscape_meta_provider import SeqscapeRawMetadataProvider, SeqscapeConnectionProvider
 from mcheck.metadata.file_header_metadata.header_meta_provider import SAMFileHeaderMetadataProvider
+from mcheck.metadata.file_header_metadata.header_metadata import SAMFileHeaderMetadata
 from mcheck.metadata.seqscape_metadata.seqscape_metadata import SeqscapeMetadata
 from mcheck.metadata.irods_metadata.file_metadata import IrodsSeqFileMetadata
+from mcheck.check_names import CHECK_NAMES
+from mcheck.results.checks_results import CheckResult
+from mcheck.results.error_details import copy_error_message
+from mcheck.com.profiling import profiled
 
 
 class MetadataSelfChecks:
@@ -43,75 +49,231 @@ class MetadataSelfChecks:
         :return: a dict of key: fpath, value: the iRODS metadata for that path
         """
         irods_metadata_by_path = {}
+        for fpath, file_metadata, check_results in MetadataSelfChecks.iter_irods_metadata_by_metadata(search_criteria,
+                                                                                                     irods_zone,
+                                                                                                     reference):
+            irods_metadata_by_path[fpath] = file_metadata
+            issues_dict[fpath].extend(check_results)
+        return irods_metadata_by_path
+
+    @staticmethod
+    def iter_irods_metadata_by_metadata(search_criteria, irods_zone, reference):
+        """
+        This function fetches the irods metadata of the files matching the criteria given
+        and preprocesses it, one file at a time.
+        :return: generator of tuples (fpath, IrodsSeqFileMetadata, list of CheckResults)
+        """
         try:
             all_files_metadata_objs_list = iRODSMetadataProvider.retrieve_raw_files_metadata_by_metadata(search_criteria,
                                                                                                          irods_zone)
         except Exception as e:
             print(e)
             sys.exit(1)
-        else:
-            for raw_metadata in all_files_metadata_objs_list:
-                check_results = []
-                file_metadata = IrodsSeqFileMetadata.from_raw_metadata(raw_metadata)
-                check_results.extend(file_metadata.check_metadata(reference))
-                irods_metadata_by_path[raw_metadata.fpath] = file_metadata
-                issues_dict[raw_metadata.fpath].extend(check_results)
-        return irods_metadata_by_path
+        for raw_metadata in all_files_metadata_objs_list:
+            file_metadata = IrodsSeqFileMetadata.from_raw_metadata(raw_metadata)
+            yield raw_metadata.fpath, file_metadata, file_metadata.check_metadata(reference)
+
 
+    @staticmethod
+    def iter_irods_metadata_by_path(irods_fpaths, reference, workers=1, chunk_size=None, worker_pool=None,
+                                    cache=None):
+        """
+        This function fetches the irods metadata by file path and preprocesses it, one file at a time.
+        If the metadata of a file can't be fetched, the file comes with no metadata and a single check result
+        recorded as not executed, so that the other files are still checked.
+        :param irods_fpaths: list of iRODS file paths
+        :param reference: the desired genome reference
+        :param workers: the number of paths to fetch the metadata for concurrently
+        :param chunk_size: the number of paths to fetch with one baton-list process (None = one baton call per path)
+        :param worker_pool: BatonWorkerPool to fetch the metadata with (optional)
+        :param cache: IrodsRawFileMetadataCache to take the metadata of the unchanged files from (optional)
+        :return: generator of tuples (fpath, IrodsSeqFileMetadata or None, list of CheckResults),
+                 in the order of irods_fpaths
+        """
+        for fpath, raw_metadata, error in iRODSMetadataProvider.fetch_raw_files_metadata_by_paths(irods_fpaths,
+                                                                                                 workers,
+                                                                                                 chunk_size,
+                                                                                                 worker_pool,
+                                                                                                 cache):
+            if error:
+                check_result = CheckResult(check_name=CHECK_NAMES.check_all_id_types_present, executed=False,
+                                           result=None,
+                                           error_message=["iRODS metadata could not be fetched: %s" % error])
+                yield fpath, None, [check_result]
+            else:
+                file_metadata = IrodsSeqFileMetadata.from_raw_metadata(raw_metadata)
+                yield fpath, file_metadata, file_metadata.check_metadata(reference)
 
     @staticmethod
-    def fetch_and_preprocess_irods_metadata_by_path(irods_fpaths, issues_dict, reference):
+    def fetch_and_preprocess_irods_metadata_by_path(irods_fpaths, issues_dict, reference, workers=1, chunk_size=None,
+                                                    worker_pool=None, cache=None):
         """
         This function fetches the irods metadata by file path and preprocesses it.
         It also adds the issues found to the issues_dict given as parameter.
         :param irods_fpaths:
         :param issues_dict:
         :param reference:
+        :param workers: the number of paths to fetch the metadata for concurrently
+        :param chunk_size: the number of paths to fetch with one baton-list process (None = one baton call per path)
+        :param worker_pool: BatonWorkerPool to fetch the metadata with (optional)
+        :param cache: IrodsRawFileMetadataCache to take the metadata of the unchanged files from (optional)
         :return:
         """
         irods_metadata_dict = defaultdict(list)
-        for fpath in irods_fpaths:
-            try:
-                raw_metadata = iRODSMetadataProvider.fetch_raw_file_metadata_by_path(fpath)
-            except Exception as e:
-                print(e)
-                sys.exit(1)
-            else:
-                check_results = []
-                file_metadata = IrodsSeqFileMetadata.from_raw_metadata(raw_metadata)
-                check_results.extend(file_metadata.check_metadata(reference))
+        for fpath, file_metadata, check_results in MetadataSelfChecks.iter_irods_metadata_by_path(irods_fpaths,
+                                                                                                 reference,
+                                                                                                 workers,
+                                                                                                 chunk_size,
+                                                                                                 worker_pool,
+                                                                                                 cache):
+            if file_metadata is not None:
                 irods_metadata_dict[fpath] = file_metadata
-                issues_dict[fpath].extend(check_results)
+            issues_dict[fpath].extend(check_results)
         return irods_metadata_dict
 
 
     @staticmethod
-    def fetch_and_preprocess_header_metadata(irods_fpaths, issues_dict):
-        header_metadata_dict = {}
+    def get_content_checksum(irods_metadata):
+        """
+        This function returns the checksum of the file's content, as long as all the replicas agree on it.
+        :param irods_metadata: IrodsSeqFileMetadata
+        :return: str - the checksum, or None if there isn't a single checksum for all the replicas
+        """
+        checksums = set(irods_metadata.checksum_at_upload or [])
+        if len(checksums) == 1:
+            return checksums.pop()
+        return None
+
+    @staticmethod
+    def fetch_and_preprocess_header_metadata(irods_fpaths, issues_dict, workers=1, timeout=None, run_stats=None,
+                                             cache=None, checksums_by_path=None):
+        """
+        This function fetches the header metadata of each file and checks it, adding the results to the issues_dict.
+        If the header of a file can't be fetched, the header checks of that file are recorded as not executed,
+        and the file gets an empty header, so that the comparisons with the header are not executed either.
+        :param irods_fpaths: list of iRODS file paths
+        :param issues_dict: key: fpath, value: list of CheckResults
+        :param workers: the number of headers to fetch concurrently
+        :param timeout: the maximum number of seconds to wait for the header of one file (None = no limit)
+        :param run_stats: RunStatistics to be updated with the number of headers fetched and failed (optional)
+        :param cache: SAMFileHeaderMetadataCache to take the headers from instead of fetching them (optional)
+        :param checksums_by_path: dict of key: fpath, value: the checksum of the file's content,
+                                  only the files with a checksum are looked up in and added to the cache
+        :return: a dict of key: fpath, value: the header metadata for that path
+        """
+        checksums_by_path = checksums_by_path or {}
+        cached_headers = []
+        fpaths_to_fetch = []
         for fpath in irods_fpaths:
-            try:
-                header_metadata = SAMFileHeaderMetadataProvider.fetch_metadata(fpath, irods=True)
-            except (OSError, IOError) as e:
-                # TODO: log this error so that one knows what went wrong
-                pass
+            header_metadata = None
+            if cache and checksums_by_path.get(fpath):
+                header_metadata = cache.get(fpath, checksums_by_path[fpath])
+            if header_metadata:
+                cached_headers.append((fpath, header_metadata, None))
+            else:
+                fpaths_to_fetch.append(fpath)
+        fetched_headers = SAMFileHeaderMetadataProvider.fetch_metadata_for_paths(fpaths_to_fetch, irods=True,
+                                                                                 workers=workers, timeout=timeout)
+        fetched_fpaths = set(fpaths_to_fetch)
+        header_metadata_dict = {}
+        for fpath, header_metadata, error in itertools.chain(cached_headers, fetched_headers):
+            if error:
+                check_result = CheckResult(check_name=CHECK_NAMES.check_valid_ids, executed=False, result=None,
+                                           error_message=["Header could not be fetched: %s" % error])
+                header_metadata_dict[fpath] = SAMFileHeaderMetadata(fpath, samples={}, libraries={}, studies={})
+                issues_dict[fpath].append(check_result)
+                if run_stats is not None:
+                    run_stats.increment('header', 'timed_out' if isinstance(error, TimeoutError) else 'failed')
             else:
+                if cache and checksums_by_path.get(fpath) and fpath in fetched_fpaths:
+                    cache.put(header_metadata, checksums_by_path[fpath])
                 check_results = header_metadata.check_metadata()
                 header_metadata.fix_metadata()
                 header_metadata_dict[fpath] = header_metadata
                 issues_dict[fpath].extend(check_results)
+                if run_stats is not None:
+                    run_stats.increment('header', 'fetched')
         return header_metadata_dict
 
 
     @staticmethod
-    def fetch_and_preprocess_seqscape_metadata(irods_metadata_by_path_dict, issues_dict):
-        seqsc_metadata_dict = {}
+    def _fingerprint_entities_ids(entities_ids):
+        if entities_ids is None:
+            return None
+        return tuple(sorted((id_type, frozenset(ids) if ids else frozenset())
+                            for id_type, ids in entities_ids.items()))
+
+    @staticmethod
+    def fingerprint_seqscape_ids(irods_metadata):
+        """
+        This function returns a hashable fingerprint of the sample, library and study ids of a file,
+        which are the only inputs of the Sequencescape fetch and checks. Files with the same fingerprint
+        get the same Sequencescape metadata and check results.
+        :param irods_metadata: IrodsSeqFileMetadata
+        :return: tuple
+        """
+        return (MetadataSelfChecks._fingerprint_entities_ids(irods_metadata.samples),
+                MetadataSelfChecks._fingerprint_entities_ids(irods_metadata.libraries),
+                MetadataSelfChecks._fingerprint_entities_ids(irods_metadata.studies))
+
+    @staticmethod
+    @profiled('seqscape_fetch', count_files=lambda irods_metadata_by_path_dict, *args, **kwargs:
+              len(irods_metadata_by_path_dict))
+    def fetch_and_preprocess_seqscape_metadata(irods_metadata_by_path_dict, issues_dict, connection_provider=None,
+                                               batched=False, run_stats=None):
+        """
+        This function fetches from Sequencescape the metadata of each file, based on the ids found in iRODS,
+        and runs the checks on it, adding the results to the issues_dict given as parameter.
+        The fetching and the checks are done only once for all the files that have the same ids in iRODS,
+        and each of these files gets its own copies of the resulting CheckResults and SeqscapeMetadata.
+        :param irods_metadata_by_path_dict: key: fpath, value: irods_metadata for that file
+        :param issues_dict: key: fpath, value: list of CheckResults
+        :param connection_provider: SeqscapeConnectionProvider to reuse for all the files,
+                                    if missing one is created just for this call
+        :param batched: if True, the ids of all the files are fetched together in chunked queries,
+                        instead of querying Sequencescape for each file
+        :param run_stats: RunStatistics to be updated with the number of distinct sets of ids (optional)
+        :return: a dict of key: fpath, value: the seqscape metadata for that path
+        """
+        if not connection_provider:
+            connection_provider = SeqscapeConnectionProvider.from_config()
+        fpaths_by_fingerprint = OrderedDict()
         for fpath, irods_metadata in irods_metadata_by_path_dict.items():
-            raw_metadata = SeqscapeRawMetadataProvider.fetch_raw_metadata(irods_metadata.samples, irods_metadata.libraries,
-                                                                          irods_metadata.studies)
+            fingerprint = MetadataSelfChecks.fingerprint_seqscape_ids(irods_metadata)
+            fpaths_by_fingerprint.setdefault(fingerprint, []).append(fpath)
+
+        raw_metadata_by_path = {}
+        if batched:
+            entities_ids_by_fpath = {}
+            for fpaths in fpaths_by_fingerprint.values():
+                irods_metadata = irods_metadata_by_path_dict[fpaths[0]]
+                entities_ids_by_fpath[fpaths[0]] = (irods_metadata.samples, irods_metadata.libraries,
+                                                    irods_metadata.studies)
+            raw_metadata_by_path = SeqscapeRawMetadataProvider.fetch_raw_metadata_in_batch(entities_ids_by_fpath,
+                                                                                           connection_provider)
+        seqsc_metadata_dict = {}
+        for fpaths in fpaths_by_fingerprint.values():
+            irods_metadata = irods_metadata_by_path_dict[fpaths[0]]
+            if batched:
+                raw_metadata = raw_metadata_by_path[fpaths[0]]
+            else:
+                raw_metadata = SeqscapeRawMetadataProvider.fetch_raw_metadata(irods_metadata.samples,
+                                                                              irods_metadata.libraries,
+                                                                              irods_metadata.studies,
+                                                                              connection_provider)
             check_results = raw_metadata.check_metadata()
-            issues_dict[fpath].extend(check_results)
             seqsc_metadata = SeqscapeMetadata.from_raw_metadata(raw_metadata)
-            check_results = seqsc_metadata.check_metadata()
-            issues_dict[fpath].extend(check_results)
-            seqsc_metadata_dict[fpath] = seqsc_metadata
+            check_results.extend(seqsc_metadata.check_metadata())
+            for fpath in fpaths:
+                # Each file gets its own copies of the results and metadata, in case they are changed later on:
+                issues_dict[fpath].extend(CheckResult(check_name=check_result.check_name,
+                                                      executed=check_result.executed, result=check_result.result,
+                                                      severity=check_result.severity,
+                                                      error_message=copy_error_message(check_result.error_message))
+                                          for check_result in check_results)
+                seqsc_metadata_dict[fpath] = SeqscapeMetadata.from_raw_metadata(raw_metadata)
+
+        if run_stats is not None and irods_metadata_by_path_dict:
+            run_stats.add_counters('seqscape_dedup', {'files': len(irods_metadata_by_path_dict),
+                                                      'distinct_id_sets': len(fpaths_by_fingerprint)})
         return seqsc_metadata_dict
@@ -0,0 +1,227 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+
+Profiling module
+================
+
+This module measures how long each stage of a run takes (fetching the metadata from iRODS, the headers and
+Sequencescape, comparing the metadata across sources and each of the checks of the iRODS metadata).
+The profiler is disabled by default, in which case profiling a stage costs a single method call.
+
+Usage:
+    with PROFILER.profile('header_fetch'):
+        fetch_header(fpath)
+
+    @profiled('comparison')
+    def compare(fpath):
+        ...
+"""
+
+import functools
+import json
+import math
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, List
+
+
+class _NotProfiled:
+    # A single instance is shared by all the stages when profiling is disabled,
+    # so it has no state, and the number of files set on it is ignored:
+    __slots__ = ()
+
+    @property
+    def files(self) -> int:
+        return 0
+
+    @files.setter
+    def files(self, files: int):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_NOT_PROFILED = _NotProfiled()
+
+
+class _StageTimer:
+    def __init__(self, profiler, stage: str, files: int):
+        self.profiler = profiler
+        self.stage = stage
+        self.files = files
+
+    def __enter__(self):
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.profiler.record(self.stage, time.perf_counter() - self.started, self.files, self.started_at)
+        return False
+
+
+class _StageTimings:
+    def __init__(self):
+        self.latencies = []
+        self.files = 0
+        self.first_started_at = None
+        self.last_ended_at = None
+
+    def add(self, latency: float, files: int, started_at: float):
+        self.latencies.append(latency)
+        self.files += files
+        ended_at = started_at + latency
+        if self.first_started_at is None or started_at < self.first_started_at:
+            self.first_started_at = started_at
+        if self.last_ended_at is None or ended_at > self.last_ended_at:
+            self.last_ended_at = ended_at
+
+
+def percentile(sorted_values: List[float], percent: float) -> float:
+    """
+    :param sorted_values: list of values, sorted in ascending order
+    :param percent: a number between 0 and 100
+    :return: the smallest value greater than or equal to percent% of the values (nearest rank)
+    """
+    if not sorted_values:
+        return 0
+    rank = max(1, int(math.ceil(percent / 100 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+class StageProfiler:
+    """
+    This class gathers the latency of each call of each stage profiled during a run, from any thread.
+    The wall time of a stage is the time from the start of its first call to the end of its last call,
+    so the calls running concurrently are counted once.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._timings_by_stage = defaultdict(_StageTimings)
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._timings_by_stage = defaultdict(_StageTimings)
+
+    def profile(self, stage: str, files: int=1):
+        """
+        :param stage: the name of the stage
+        :param files: the number of files processed by this call of the stage
+        :return: a context manager that records the time spent in its block, if the profiler is enabled
+        """
+        if not self.enabled:
+            return _NOT_PROFILED
+        return _StageTimer(self, stage, files)
+
+    def record(self, stage: str, latency: float, files: int=1, started_at: float=None):
+        if started_at is None:
+            started_at = time.time() - latency
+        with self._lock:
+            self._timings_by_stage[stage].add(latency, files, started_at)
+
+    def to_raw(self) -> Dict:
+        """
+        :return: the timings recorded, in a form that can be sent to another process and merged there
+        """
+        with self._lock:
+            return {stage: {'latencies': list(timings.latencies), 'files': timings.files,
+                            'first_started_at': timings.first_started_at, 'last_ended_at': timings.last_ended_at}
+                    for stage, timings in self._timings_by_stage.items()}
+
+    def merge(self, raw_timings: Dict):
+        """
+        Adds the timings recorded by another profiler (e.g. in another process) to this one.
+        :param raw_timings: dict, as returned by to_raw()
+        """
+        with self._lock:
+            for stage, raw in raw_timings.items():
+                timings = self._timings_by_stage[stage]
+                timings.latencies.extend(raw['latencies'])
+                timings.files += raw['files']
+                if timings.first_started_at is None or raw['first_started_at'] < timings.first_started_at:
+                    timings.first_started_at = raw['first_started_at']
+                if timings.last_ended_at is None or raw['last_ended_at'] > timings.last_ended_at:
+                    timings.last_ended_at = raw['last_ended_at']
+
+    def get_report(self) -> Dict:
+        """
+        :return: OrderedDict of key = stage, value = dict of wall time, calls, files, latency percentiles and files/s
+        """
+        report = OrderedDict()
+        with self._lock:
+            for stage in sorted(self._timings_by_stage):
+                timings = self._timings_by_stage[stage]
+                latencies = sorted(timings.latencies)
+                wall_time = timings.last_ended_at - timings.first_started_at
+                report[stage] = OrderedDict([
+                    ('wall_time_s', round(wall_time, 3)),
+                    ('calls', len(latencies)),
+                    ('files', timings.files),
+                    ('p50_ms', round(percentile(latencies, 50) * 1000, 3)),
+                    ('p95_ms', round(percentile(latencies, 95) * 1000, 3)),
+                    ('p99_ms', round(percentile(latencies, 99) * 1000, 3)),
+                    ('files_per_s', round(timings.files / wall_time, 2) if wall_time > 0 else None)])
+        return report
+
+    def format_as_text(self) -> str:
+        lines = []
+        for stage, stage_report in self.get_report().items():
+            lines.append("%s: %s" % (stage, ', '.join("%s = %s" % (name, value)
+                                                      for name, value in stage_report.items())))
+        return '\n'.join(lines)
+
+    def write_as_json(self, path: str):
+        with open(path, 'w') as json_file:
+            json.dump(self.get_report(), json_file, indent=2)
+
+
+# The profiler used by all the stages of a run, in this process:
+PROFILER = StageProfiler()
+
+
+def profiled(stage: str, count_files=None):
+    """
+    This function decorator records each call of the decorated function as a call of the stage given as parameter.
+    :param stage: the name of the stage
+    :param count_files: function called with the arguments of the decorated function, returning the number
+                        of files processed by the call (by default each call processes one file)
+    """
+    def decorator(funct):
+        @functools.wraps(funct)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.enabled:
+                return funct(*args, **kwargs)
+            with PROFILER.profile(stage, count_files(*args, **kwargs) if count_files else 1):
+                return funct(*args, **kwargs)
+        return wrapper
+    return decorator
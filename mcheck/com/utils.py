@@ -21,11 +21,11 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
 import os
+import re
 import time
 import unicodedata
 import datetime
 import collections
-import string
 
 from os.path import isfile, join
 from collections import defaultdict
@@ -288,8 +288,10 @@ def get_date_and_time_now():
     return time.strftime("%H:%M on %d/%m/%Y")
     
     
+HEXADECIMAL_REGEX = re.compile('[0-9a-fA-F]*')
+
 def is_hexadecimal_string(s):
-    return all(c in string.hexdigits for c in s)
+    return HEXADECIMAL_REGEX.fullmatch(s) is not None
 
 def levenshtein(a,b):
     "Calculates the Levenshtein distance between a and b."
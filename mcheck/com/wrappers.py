@@ -22,16 +22,46 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 import functools
 import inspect
+import os
+
+# Setting MCHECK_SKIP_ARG_CHECKS in the environment (e.g. in production, once the code is known to be called right)
+# turns check_args_not_none off: the functions it decorates are then left as they are, at no cost per call.
+ARG_CHECKS_ENABLED = not os.environ.get('MCHECK_SKIP_ARG_CHECKS')
+
+
+def _raise_none_args_error(funct, args, kwargs):
+    func_args = inspect.getcallargs(funct, *args, **kwargs)
+    msg = "None arguments have been provided for this function: "+str(func_args)
+    raise ValueError(msg)
 
 
 def check_args_not_none(funct):
+    """
+    This function decorator raises a ValueError if any of the named parameters of the decorated function
+    is None, whether given by the caller or left to its default value.
+    The signature is looked up once, when decorating, so that a call with all the parameters given positionally
+    (the common case) only costs a loop over the arguments.
+    """
+    if not ARG_CHECKS_ENABLED:
+        return funct
+    parameters = list(inspect.signature(funct).parameters.values())
+    positional_kinds = (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD)
+    has_only_positional_params = all(param.kind in positional_kinds for param in parameters)
+    nr_params = len(parameters)
+
     @functools.wraps(funct)
     def wrapper(*args, **kwargs):
+        if not kwargs and len(args) == nr_params and has_only_positional_params:
+            for arg in args:
+                if arg is None:
+                    _raise_none_args_error(funct, args, kwargs)
+            return funct(*args)
+        # Keyword arguments, defaults, *args or a wrong call: bind the arguments the slow way,
+        # which also raises the TypeError of a wrong call:
         func_args = inspect.getcallargs(funct, *args, **kwargs)
-        none_args = [(arg, val) for arg, val in list(func_args.items()) if val is None]
-        if none_args:
-            msg = "None arguments have been provided for this function: "+str(func_args)
-            raise ValueError(msg)
+        for val in func_args.values():
+            if val is None:
+                _raise_none_args_error(funct, args, kwargs)
         return funct(*args, **kwargs)
     return wrapper
 
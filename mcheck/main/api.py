@@ -27,22 +27,128 @@ from iRODS and fed into this software, which is:
 - metadata fetched by metacheck, given a file path
 - metadata fetched by metacheck, given some metadata to query by iRODS
 - metadata given as a stream of json data.
-The result of all 3 check functions is the same: a dictionary of path - list of CheckResults.
+The result of all 3 check functions is the same: a dictionary of path - list of CheckResults,
+kept compact in a read-only CheckResultsStore.
 """
 
 #from mcheck.main.run_checks import check_metadata_given_as_json_stream, check_metadata_fetched_by_path, check_metadata_fetched_by_metadata
 
 import sys
-from collections import defaultdict
-from mcheck.main.input_parser import convert_json_to_baton_objs
+from collections import defaultdict, OrderedDict
+from mcheck.main.input_parser import iter_data_objects
 from mcheck.checks.mchecks_by_comparison import FileMetadataComparison
 from mcheck.checks.mchecks_by_type import MetadataSelfChecks
 from mcheck.metadata.irods_metadata.file_metadata import IrodsSeqFileMetadata
 from mcheck.metadata.irods_metadata.irods_meta_provider import iRODSMetadataProvider
+from mcheck.metadata.irods_metadata.baton_worker_pool import BatonWorkerPool
+from mcheck.metadata.irods_metadata.irods_meta_cache import IrodsRawFileMetadataCache
+from mcheck.metadata.seqscape_metadata.seqscape_meta_provider import SeqscapeConnectionProvider
+from mcheck.main.sharding import iter_chunks, run_in_chunks, run_in_shards
+from mcheck.results.results_store import CheckResultsStore
+from mcheck.metadata.file_header_metadata.header_cache import SAMFileHeaderMetadataCache
+
+
+# The number of files whose results are gathered in lists, before being packed into the CheckResultsStore:
+CHECKS_CHUNK_SIZE = 10000
+
+
+def _check_irods_items_chunk(irods_items, connection_provider, run_stats=None, header_workers=1, header_timeout=None,
+                             header_cache=None):
+    irods_metadata_dict = OrderedDict()
+    check_results_by_path = defaultdict(list)
+    for fpath, irods_metadata, check_results in irods_items:
+        # The files whose iRODS metadata couldn't be fetched only get the check results they come with:
+        if irods_metadata is not None:
+            irods_metadata_dict[fpath] = irods_metadata
+        check_results_by_path[fpath].extend(check_results)
+    checksums_by_path = {fpath: MetadataSelfChecks.get_content_checksum(irods_metadata)
+                         for fpath, irods_metadata in irods_metadata_dict.items()}
+    header_metadata_dict = MetadataSelfChecks.fetch_and_preprocess_header_metadata(irods_metadata_dict.keys(),
+                                                                                   check_results_by_path,
+                                                                                   header_workers, header_timeout,
+                                                                                   run_stats, header_cache,
+                                                                                   checksums_by_path)
+    seqscape_metadata_dict = MetadataSelfChecks.fetch_and_preprocess_seqscape_metadata(irods_metadata_dict,
+                                                                                       check_results_by_path,
+                                                                                       connection_provider,
+                                                                                       batched=True,
+                                                                                       run_stats=run_stats)
+    FileMetadataComparison.check_metadata_across_different_sources(irods_metadata_dict, header_metadata_dict,
+                                                                   seqscape_metadata_dict, check_results_by_path)
+    return check_results_by_path
+
+
+def _check_fetched_irods_items(irods_items, run_stats=None, header_workers=1, header_timeout=None,
+                               header_cache_path=None, chunk_size=None, on_result=None):
+    """
+    Runs the header, Sequencescape and comparison checks of the files given as parameter, CHECKS_CHUNK_SIZE files
+    at a time, packing the results of each chunk into the CheckResultsStore as soon as its checks are done,
+    so that the results are never held as lists of CheckResults for more than a chunk of files.
+    :param irods_items: iterable of tuples (fpath, IrodsSeqFileMetadata, list of the iRODS CheckResults)
+    :param on_result: function called with (fpath, check_results) for each file of a chunk,
+            as soon as the checks of the chunk are done (optional)
+    :return: CheckResultsStore of key = fpath, value = list[CheckResult], in the order of irods_items
+    """
+    check_results_by_path = CheckResultsStore()
+    connection_provider = SeqscapeConnectionProvider.from_config()
+    header_cache = SAMFileHeaderMetadataCache(header_cache_path) if header_cache_path else None
+    try:
+        for irods_items_chunk in iter_chunks(irods_items, chunk_size or CHECKS_CHUNK_SIZE):
+            chunk_results = _check_irods_items_chunk(irods_items_chunk, connection_provider, run_stats,
+                                                     header_workers, header_timeout, header_cache)
+            if on_result:
+                for fpath, check_results in chunk_results.items():
+                    on_result(fpath, check_results)
+            check_results_by_path.update(chunk_results)
+    finally:
+        if header_cache:
+            header_cache.close()
+            if run_stats is not None:
+                run_stats.add_counters('header_cache', header_cache.get_stats())
+        if run_stats is not None:
+            run_stats.add_counters('seqscape_connection', connection_provider.get_stats())
+    if not check_results_by_path:
+        print("No irods metadata found. No checks performed.")
+        sys.exit(1)
+    return check_results_by_path
+
+
+def _check_fetched_irods_items_in_shards(irods_items, workers, run_stats=None, header_workers=1, header_timeout=None,
+                                         header_cache_path=None, on_result=None):
+    """
+    Runs the checks of _check_fetched_irods_items in workers processes, sending them the files CHECKS_CHUNK_SIZE
+    at a time as they are read from irods_items, instead of reading all of them first.
+    :return: CheckResultsStore of key = fpath, value = list[CheckResult], in the order of irods_items
+    """
+    check_results_by_path = run_in_chunks(_check_fetched_irods_items, irods_items, workers, CHECKS_CHUNK_SIZE,
+                                          run_stats, on_result, header_workers=header_workers,
+                                          header_timeout=header_timeout, header_cache_path=header_cache_path)
+    if not check_results_by_path:
+        print("No irods metadata found. No checks performed.")
+        sys.exit(1)
+    return check_results_by_path
+
+
+def _check_workers_and_pipeline(workers, pipeline):
+    if workers > 1 and pipeline:
+        raise ValueError("The checks can't be run both in several processes (workers = %s) and in a pipeline." % workers)
+
+
+def _check_in_pipeline(irods_items, pipeline):
+    # The results of each file are packed as soon as they come out of the pipeline:
+    check_results_by_path = CheckResultsStore()
+    for fpath, check_results in pipeline.run(irods_items):
+        check_results_by_path.add(fpath, check_results)
+    if not check_results_by_path:
+        print("No irods metadata found. No checks performed.")
+        sys.exit(1)
+    return check_results_by_path
 
 
 def check_metadata_fetched_by_metadata(filter_npg_qc=None, filter_target=None, file_types=None, study_name=None,
-                                       study_acc_nr=None, study_internal_id=None, irods_zone=None, reference=None):
+                                       study_acc_nr=None, study_internal_id=None, irods_zone=None, reference=None,
+                                       run_stats=None, pipeline=None, workers=1, header_workers=1,
+                                       header_timeout=None, header_cache_path=None, on_result=None):
     """
     This function fetches the iRODS metadata by querying iRODS by other metadata. It takes as parameters a set of optional
     querying fields and returns a dict where key = file path checked, value = a list of CheckResult objects corresponding
@@ -55,27 +161,37 @@ def check_metadata_fetched_by_metadata(filter_npg_qc=None, filter_target=None, f
     :param study_internal_id: the study internal id that we want to fetch data for
     :param irods_zone: the zone where the query should be run
     :param reference: the genome reference => one wants to check if the data has this reference as metadata
-    :return: dict of key = string file path, value = list[CheckResult]
+    :param run_stats: RunStatistics object to be updated with the counters of this run (optional)
+    :param pipeline: FileChecksPipeline to run the checks of each file through, once its iRODS metadata
+            has been fetched (optional)
+    :param workers: the number of processes to split the files between for running the header, Sequencescape
+            and comparison checks (the iRODS query is run only once)
+    :param header_workers: the number of files to fetch the header for concurrently
+    :param header_timeout: the maximum number of seconds to wait for the header of one file (None = no limit)
+    :param header_cache_path: the path of the SQLite file where the headers are cached between runs (optional)
+    :param on_result: function called with (fpath, check_results) for each file, as soon as the checks of the chunk
+            of files it is in are done, e.g. for writing them out (optional). Not used with a pipeline,
+            which calls its own on_result.
+    :return: CheckResultsStore (a read-only dict) of key = string file path, value = list[CheckResult]
     """
-    check_results_by_path = defaultdict(list)
+    _check_workers_and_pipeline(workers, pipeline)
     search_criteria = iRODSMetadataProvider.convert_to_irods_fields(filter_npg_qc, filter_target,
                                                                     file_types, study_name,
                                                                     study_acc_nr, study_internal_id)
-    irods_metadata_dict = MetadataSelfChecks.fetch_and_preprocess_irods_metadata_by_metadata(search_criteria,
-                                                                                             irods_zone,
-                                                                                             check_results_by_path,
-                                                                                             reference)
-    if not irods_metadata_dict:
-        print("No irods metadata found. No checks performed.")
-        sys.exit(1)
-    header_metadata_dict = MetadataSelfChecks.fetch_and_preprocess_header_metadata(irods_metadata_dict.keys(), check_results_by_path)
-    seqscape_metadata_dict = MetadataSelfChecks.fetch_and_preprocess_seqscape_metadata(irods_metadata_dict, check_results_by_path)
-    FileMetadataComparison.check_metadata_across_different_sources(irods_metadata_dict, header_metadata_dict,
-                                                                   seqscape_metadata_dict, check_results_by_path)
-    return check_results_by_path
+    irods_items = MetadataSelfChecks.iter_irods_metadata_by_metadata(search_criteria, irods_zone, reference)
+    if pipeline:
+        return _check_in_pipeline(irods_items, pipeline)
+    if workers > 1:
+        return _check_fetched_irods_items_in_shards(irods_items, workers, run_stats, header_workers, header_timeout,
+                                                    header_cache_path, on_result)
+    return _check_fetched_irods_items(irods_items, run_stats, header_workers, header_timeout, header_cache_path,
+                                      on_result=on_result)
 
 
-def check_metadata_fetched_by_path(irods_fpaths, reference=None):
+def check_metadata_fetched_by_path(irods_fpaths, reference=None, run_stats=None, irods_workers=1,
+                                   irods_chunk_size=None, baton_pool_size=None, pipeline=None, workers=1,
+                                   header_workers=1, header_timeout=None, header_cache_path=None, irods_cache_path=None,
+                                   irods_cache_ttl=None, on_result=None):
     """
     This function fetches the iRODS metadata by file path. It takes as parameter a list of file paths and queries
     iRODS for metadata for each of the paths taken as parameter. It returns a dict where
@@ -83,42 +199,95 @@ def check_metadata_fetched_by_path(irods_fpaths, reference=None):
     :param irods_fpaths: list of strings corresponding to iRODS file paths
     :param reference: string that contains the name of the genome reference =>
             one wants to check if the data has this reference as metadata
-    :return: dict of key = string file path, value = list[CheckResult]
+    :param run_stats: RunStatistics object to be updated with the counters of this run (optional)
+    :param irods_workers: the number of paths to fetch the iRODS metadata for concurrently
+    :param irods_chunk_size: the number of paths to fetch the iRODS metadata for with a single baton-list process
+    :param baton_pool_size: the number of long-lived baton processes to fetch the iRODS metadata with,
+            instead of starting a baton process for each path (optional)
+    :param pipeline: FileChecksPipeline to run the checks of each file through, as soon as its iRODS metadata
+            has been fetched (optional)
+    :param workers: the number of processes to split the paths between, each of them running all the checks
+            of its paths with its own connections to iRODS and Sequencescape
+    :param header_workers: the number of files to fetch the header for concurrently
+    :param header_timeout: the maximum number of seconds to wait for the header of one file (None = no limit)
+    :param header_cache_path: the path of the SQLite file where the headers are cached between runs (optional)
+    :param irods_cache_path: the path of the SQLite file where the iRODS metadata is cached between runs (optional)
+    :param irods_cache_ttl: the number of seconds for which the cached iRODS metadata is used before it is fetched
+            again (None = IrodsRawFileMetadataCache.DEFAULT_TTL)
+    :param on_result: function called with (fpath, check_results) for each file, as soon as the checks of the chunk
+            of files it is in are done, e.g. for writing them out (optional). Not used with a pipeline,
+            which calls its own on_result.
+    :return: CheckResultsStore (a read-only dict) of key = string file path, value = list[CheckResult],
+             in the order of irods_fpaths
     """
-    check_results_by_path = defaultdict(list)
-    irods_metadata_dict = MetadataSelfChecks.fetch_and_preprocess_irods_metadata_by_path(irods_fpaths,
-                                                                                         check_results_by_path,
-                                                                                         reference)
-    if not irods_metadata_dict:
-        print("No irods metadata found. No checks performed.")
-        sys.exit(1)
-    header_metadata_dict = MetadataSelfChecks.fetch_and_preprocess_header_metadata(irods_metadata_dict.keys(), check_results_by_path)
-    seqscape_metadata_dict = MetadataSelfChecks.fetch_and_preprocess_seqscape_metadata(irods_metadata_dict, check_results_by_path)
-    FileMetadataComparison.check_metadata_across_different_sources(irods_metadata_dict, header_metadata_dict,
-                                                                   seqscape_metadata_dict, check_results_by_path)
-    return check_results_by_path
+    _check_workers_and_pipeline(workers, pipeline)
+    if workers > 1:
+        return run_in_shards(check_metadata_fetched_by_path, list(irods_fpaths), workers, run_stats, on_result,
+                             reference=reference, irods_workers=irods_workers, irods_chunk_size=irods_chunk_size,
+                             baton_pool_size=baton_pool_size, header_workers=header_workers,
+                             header_timeout=header_timeout, header_cache_path=header_cache_path,
+                             irods_cache_path=irods_cache_path, irods_cache_ttl=irods_cache_ttl)
+    worker_pool = None
+    if baton_pool_size:
+        worker_pool = BatonWorkerPool(baton_pool_size)
+        irods_workers = max(irods_workers, baton_pool_size)
+    irods_cache = None
+    if irods_cache_path:
+        irods_cache = IrodsRawFileMetadataCache(irods_cache_path,
+                                                irods_cache_ttl if irods_cache_ttl is not None
+                                                else IrodsRawFileMetadataCache.DEFAULT_TTL)
+    try:
+        irods_items = MetadataSelfChecks.iter_irods_metadata_by_path(irods_fpaths, reference, irods_workers,
+                                                                     irods_chunk_size, worker_pool, irods_cache)
+        if pipeline:
+            return _check_in_pipeline(irods_items, pipeline)
+        return _check_fetched_irods_items(irods_items, run_stats, header_workers, header_timeout, header_cache_path,
+                                          on_result=on_result)
+    finally:
+        if irods_cache:
+            irods_cache.close()
+            if run_stats is not None:
+                run_stats.add_counters('irods_cache', irods_cache.get_stats())
+        if worker_pool:
+            worker_pool.close()
+            if run_stats is not None:
+                for worker_name, worker_stats in worker_pool.get_stats().items():
+                    run_stats.add_counters(worker_name, worker_stats)
+
+
+def _iter_irods_metadata_from_stream(stream, reference):
+    # The data objects are parsed one at a time, so that the checks of the first files can start
+    # before the whole input has been read:
+    for data_obj in iter_data_objects(stream):
+        irods_metadata = IrodsSeqFileMetadata.from_baton_wrapper(data_obj)
+        yield irods_metadata.fpath, irods_metadata, irods_metadata.check_metadata(reference)
 
 
-def check_metadata_given_as_json_stream(reference=None):
+def check_metadata_given_as_json_stream(reference=None, run_stats=None, pipeline=None, workers=1, header_workers=1,
+                                        header_timeout=None, header_cache_path=None, on_result=None):
     """
     This function takes in the iRODS metadata as a stream of json data read from stdin and it uses for checking the files.
+    The stream can be a JSON array of data objects or one data object per line, and it is parsed one object at a time.
     :param reference: string that contains the name of the genome reference =>
                       one wants to check if the data has this reference as metadata
-    :return: dict of key = string file path, value = list[CheckResult]
+    :param run_stats: RunStatistics object to be updated with the counters of this run (optional)
+    :param pipeline: FileChecksPipeline to run the checks of each file through (optional)
+    :param workers: the number of processes to split the files between for running the header, Sequencescape
+            and comparison checks
+    :param header_workers: the number of files to fetch the header for concurrently
+    :param header_timeout: the maximum number of seconds to wait for the header of one file (None = no limit)
+    :param header_cache_path: the path of the SQLite file where the headers are cached between runs (optional)
+    :param on_result: function called with (fpath, check_results) for each file, as soon as the checks of the chunk
+            of files it is in are done, e.g. for writing them out (optional). Not used with a pipeline,
+            which calls its own on_result.
+    :return: CheckResultsStore (a read-only dict) of key = string file path, value = list[CheckResult]
     """
-    check_results_by_path = defaultdict(list)
-    json_input_data = sys.stdin.read()
-    baton_data_objects_list = convert_json_to_baton_objs(json_input_data)
-    irods_metadata_dict = {}
-    for data_obj in baton_data_objects_list:
-        meta = IrodsSeqFileMetadata.from_baton_wrapper(data_obj)
-        check_results_by_path[meta.fpath].extend(meta.check_metadata(reference))
-        irods_metadata_dict[meta.fpath] = meta
-    if not irods_metadata_dict:
-        print("No irods metadata found. No checks performed.")
-        sys.exit(1)
-    header_metadata_dict = MetadataSelfChecks.fetch_and_preprocess_header_metadata(irods_metadata_dict.keys(), check_results_by_path)
-    seqscape_metadata_dict = MetadataSelfChecks.fetch_and_preprocess_seqscape_metadata(irods_metadata_dict, check_results_by_path)
-    FileMetadataComparison.check_metadata_across_different_sources(irods_metadata_dict, header_metadata_dict,
-                                                                   seqscape_metadata_dict, check_results_by_path)
-    return check_results_by_path
+    _check_workers_and_pipeline(workers, pipeline)
+    irods_items = _iter_irods_metadata_from_stream(sys.stdin, reference)
+    if pipeline:
+        return _check_in_pipeline(irods_items, pipeline)
+    if workers > 1:
+        return _check_fetched_irods_items_in_shards(irods_items, workers, run_stats, header_workers, header_timeout,
+                                                    header_cache_path, on_result)
+    return _check_fetched_irods_items(irods_items, run_stats, header_workers, header_timeout, header_cache_path,
+                                      on_result=on_result)
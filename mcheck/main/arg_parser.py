@@ -43,10 +43,93 @@ def parse_args():
                             required=False,
                             help='write the output as json',
     )
+    output_grp.add_argument('--output_as_ndjson', '--output-as-ndjson',
+                            dest='ndjson_output',
+                            action='store_true',
+                            required=False,
+                            help='write the output as newline delimited json, one line for each file checked',
+    )
+    output_grp.add_argument('--output_deduplicated', '--output-deduplicated',
+                            dest='deduplicated_output',
+                            action='store_true',
+                            required=False,
+                            help='write the output as newline delimited json, with each distinct check result '
+                                 'written once and each file referring to the ids of its check results',
+    )
+    out.add_argument('--output_file', '--output-file',
+                     dest='output_file',
+                     help='write the output to this file instead of stdout',
+    )
+    out.add_argument('--max_listed_ids', '--max-listed-ids',
+                     dest='max_listed_ids',
+                     type=int,
+                     default=20,
+                     help='The maximum number of ids listed in an error message about many entities '
+                          '(e.g. the samples missing from a study), the others are only counted',
+    )
+    out.add_argument('--full_error_details', '--full-error-details',
+                     dest='full_error_details',
+                     action='store_true',
+                     help='List all the ids in the error messages, however many they are',
+    )
 
     # ADDITIONALS:
     additional_outputs_grp = parent_parser.add_argument_group('INCLUDE IN OUTPUT', 'What to include in the output')
     additional_outputs_grp.add_argument("-v", "--verbosity", action="count", help="increase output verbosity")
+
+    # EXECUTION: how to run the checks?
+    execution_grp = parent_parser.add_argument_group('EXECUTION', 'How to run the checks')
+    execution_grp.add_argument('--workers',
+                               dest='workers',
+                               type=int,
+                               default=1,
+                               help='The number of processes to split the files checked between',
+    )
+    execution_grp.add_argument('--header_cache', '--header-cache',
+                               dest='header_cache',
+                               help='The path of a file where the headers are cached between runs, '
+                                    'by file path and checksum',
+    )
+    execution_grp.add_argument('--pipelined',
+                               dest='pipelined',
+                               action='store_true',
+                               help='Run the header, Sequencescape and comparison checks of each file as soon as its '
+                                    'iRODS metadata is fetched, instead of running each step for all the files in turn',
+    )
+    execution_grp.add_argument('--header_workers', '--header-workers',
+                               dest='header_workers',
+                               type=int,
+                               default=1,
+                               help='The number of files to fetch the header for concurrently',
+    )
+    execution_grp.add_argument('--header_timeout', '--header-timeout',
+                               dest='header_timeout',
+                               type=float,
+                               help='The maximum number of seconds to wait for the header of a file. If it takes '
+                                    'longer, the header checks of that file are reported as not executed',
+    )
+    execution_grp.add_argument('--seqscape_workers', '--seqscape-workers',
+                               dest='seqscape_workers',
+                               type=int,
+                               default=1,
+                               help='The number of batches of files to fetch the Sequencescape metadata for '
+                                    'concurrently, when --pipelined',
+    )
+    additional_outputs_grp.add_argument('--results_db', '--results-db',
+                                        dest='results_db',
+                                        help='Also store the check results of this run in the SQLite database at '
+                                             'this path, one row for each check of each file, under a new run id',
+    )
+    additional_outputs_grp.add_argument('--profile_stages', '--profile-stages',
+                                        dest='profile_stages',
+                                        action='store_true',
+                                        help='Report the wall time, the number of calls, the latency percentiles and '
+                                             'the files/s of each stage of the run on stderr, at the end of the run',
+    )
+    additional_outputs_grp.add_argument('--profile_stages_json', '--profile-stages-json',
+                                        dest='profile_stages_json',
+                                        help='Write the report of --profile_stages as JSON to this file',
+    )
     subparsers = parser.add_subparsers(title='Choose the Strategy for fetching iRODS metadata: in batch, per file or given by the user as input',
                                        description='One subcommand required: fetch_by_path | fetch_by_metadata | given_by_user',
                                        help='Sub-commands',
@@ -63,6 +146,38 @@ def parse_args():
                                   nargs='+',
                                   help='List of file paths in iRODS'
     )
+    parser_filecheck.add_argument('--irods_workers', '--irods-workers',
+                                  dest='irods_workers',
+                                  type=int,
+                                  default=1,
+                                  help='The number of paths to fetch the iRODS metadata for concurrently',
+    )
+    irods_fetching_grp = parser_filecheck.add_mutually_exclusive_group()
+    irods_fetching_grp.add_argument('--irods_chunk_size', '--irods-chunk-size',
+                                    dest='irods_chunk_size',
+                                    type=int,
+                                    help='Fetch the iRODS metadata for this many paths at a time with a single '
+                                         'baton-list process, instead of calling baton once per path',
+    )
+    irods_fetching_grp.add_argument('--baton_pool_size', '--baton-pool-size',
+                                    dest='baton_pool_size',
+                                    type=int,
+                                    help='Fetch the iRODS metadata through this many long-lived baton processes, '
+                                         'shared by all the paths checked',
+    )
+    parser_filecheck.add_argument('--irods_cache', '--irods-cache',
+                                  dest='irods_cache',
+                                  help='Keep the iRODS metadata fetched in this SQLite file, and on the next runs '
+                                       'use it for the files fetched less than --irods_cache_ttl seconds ago, '
+                                       'without checking iRODS: changes to their AVUs or ACLs made since then '
+                                       'are not seen',
+    )
+    parser_filecheck.add_argument('--irods_cache_ttl', '--irods-cache-ttl',
+                                  dest='irods_cache_ttl',
+                                  type=float,
+                                  help='The number of seconds for which the cached iRODS metadata of a file is used, '
+                                       'before it is fetched again (default: one day)',
+    )
     parser_give_by_user = subparsers.add_parser('given_at_stdin', parents=[parent_parser],
                                                 help="The metadata is given as baton output via stdin and should be a list of data objects with metadata.")
 
@@ -1,5 +1,6 @@
 import json
-from typing import List
+import re
+from typing import Iterator, List, TextIO, Tuple
 
 from baton._baton.json import DataObjectJSONDecoder
 from baton.models import DataObject
@@ -12,6 +13,12 @@ IRODS_METADATA_REFERENCE_PROPERTY = "reference"
 IRODS_METADATA_TARGET_PROPERTY = "target"
 IRODS_ORIGINAL_REPLICA_NUMBER = 0
 
+DEFAULT_READ_SIZE = 64 * 1024
+_WHITESPACE = re.compile(r'\s*')
+
+# Building the decoder's deserializer is expensive, so it is done only once:
+_DATA_OBJECT_DECODER = DataObjectJSONDecoder()
+
 
 def convert_json_to_baton_objs(data_objects_as_json_string: str) -> List[IrodsSeqFileMetadata]:
     decoded = json.loads(data_objects_as_json_string, cls=DataObjectJSONDecoder)
@@ -20,6 +27,97 @@ def convert_json_to_baton_objs(data_objects_as_json_string: str) -> List[IrodsSe
     return decoded
 
 
+def _iter_parsed_json_objects(stream: TextIO, read_size: int=DEFAULT_READ_SIZE) -> Iterator[Tuple[dict, str]]:
+    """
+    Reads the JSON objects from the stream given as parameter one at a time - see iter_json_objects_as_strings.
+    :return: generator of tuples (the JSON object parsed, the JSON object as a string)
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    end_of_stream = False
+    in_array = None
+    array_closed = False
+    # Inside the array: whether an element or a comma is expected next (neither, right after the opening bracket):
+    element_expected = comma_expected = False
+    while True:
+        position = _WHITESPACE.match(buffer, position).end()
+        if position == len(buffer):
+            if end_of_stream:
+                if in_array:
+                    raise ValueError("The JSON array given as input isn't closed.")
+                return
+            buffer = stream.read(read_size)
+            position = 0
+            end_of_stream = not buffer
+            continue
+        if array_closed:
+            raise ValueError("Unexpected data after the end of the JSON array given as input: %s" %
+                             buffer[position:position + 50])
+        if in_array is None:
+            in_array = buffer[position] == '['
+            if in_array:
+                position += 1
+                continue
+        if in_array and buffer[position] == ']' and not element_expected:
+            in_array = False
+            array_closed = True
+            position += 1
+            continue
+        if in_array and buffer[position] == ',' and comma_expected:
+            element_expected, comma_expected = True, False
+            position += 1
+            continue
+        if comma_expected:
+            raise ValueError("Expected a comma or the end of the JSON array given as input: %s" %
+                             buffer[position:position + 50])
+        if buffer[position] != '{':
+            raise ValueError("The JSON given as input contains something else than an object: %s" %
+                             buffer[position:position + 50])
+        try:
+            json_object, end = decoder.raw_decode(buffer, position)
+        except ValueError as e:
+            if end_of_stream:
+                raise ValueError("Invalid JSON given as input: %s" % e)
+            # The object continues after the end of the buffer. The next read is at least as long as what
+            # is already buffered, so that an object is parsed O(log(size)) times whatever its size:
+            more = stream.read(max(read_size, len(buffer) - position))
+            buffer = buffer[position:] + more
+            position = 0
+            end_of_stream = not more
+            continue
+        yield json_object, buffer[position:end]
+        position = end
+        element_expected, comma_expected = False, in_array
+
+
+def iter_json_objects_as_strings(stream: TextIO, read_size: int=DEFAULT_READ_SIZE) -> Iterator[str]:
+    """
+    Reads the JSON objects from the stream given as parameter one at a time, without reading the whole stream
+    in memory first. The stream can contain either a JSON array of objects or JSON objects separated by whitespace
+    (e.g. one per line, as output by baton). At most the largest object and one read of the stream are kept in memory.
+    :param stream: a text stream (e.g. sys.stdin)
+    :param read_size: the number of characters to read from the stream at a time
+    :return: generator of the JSON objects, each of them as a string
+    :raises ValueError: if the stream doesn't contain valid JSON, if it contains anything else than JSON objects
+                        or if there is anything else than whitespace after the end of the JSON array
+    """
+    for _, json_object_as_string in _iter_parsed_json_objects(stream, read_size):
+        yield json_object_as_string
+
+
+def iter_data_objects(stream: TextIO, read_size: int=DEFAULT_READ_SIZE) -> Iterator[DataObject]:
+    """
+    Parses the data objects serialised as JSON by baton from the stream given as parameter, one at a time.
+    Each of them is parsed only once, and then mapped onto a DataObject.
+    :param stream: a text stream containing a JSON array of data objects or one data object per line
+    :param read_size: the number of characters to read from the stream at a time
+    :return: generator of DataObject
+    """
+    for json_object, _ in _iter_parsed_json_objects(stream, read_size):
+        yield _DATA_OBJECT_DECODER.decode_parsed(json_object)
+
+
 def parse_data_objects(data_objects_as_json_string: str) -> List[IrodsSeqFileMetadata]:
     """
     Parses the given data object(s) in the JSON serialised form, defined by baton, into representations that are used
@@ -19,27 +19,164 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 This file has been created on Jul 27, 2016.
 """
 
+import io
 import json
+from abc import ABC, abstractmethod
+from typing import Dict, List, TextIO
+
 from mcheck.results.checks_results import RESULT, CheckResult    #, CheckResultJSONEncoder
 from hgijson import MappingJSONEncoderClassBuilder, JsonPropertyMapping, MappingJSONDecoderClassBuilder
 
+# Building the encoder class is expensive, so it is done only once:
+CheckResultJSONEncoder = MappingJSONEncoderClassBuilder(CheckResult, CheckResult.to_json_mapping()).build()
+
+
+class ResultsWriter(ABC):
+    """
+    This class writes the check results of each file to a text stream (e.g. sys.stdout or a file) as soon as
+    they are given to it, so that the report never has to be held in memory as a whole.
+    """
+
+    def __init__(self, output: TextIO):
+        self.output = output
+        self.files_written = 0
+
+    @abstractmethod
+    def write(self, fpath: str, check_results: List[CheckResult]):
+        pass
+
+    def write_all(self, check_results_by_path: Dict):
+        for fpath, check_results in check_results_by_path.items():
+            self.write(fpath, check_results)
+
+    def close(self):
+        self.output.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class TSVResultsWriter(ResultsWriter):
+    """
+    This class writes the check results as tab separated values, one line for each check of each file.
+    """
+
+    def write(self, fpath: str, check_results: List[CheckResult]):
+        if not self.files_written:
+            self.output.write("Fpath\tExecuted\tResult\tErrors\t")
+        self.files_written += 1
+        lines = []
+        for issue in check_results:
+            errors = issue.error_message if (issue.error_message or issue.error_message is None) else None
+            lines.append('\t'.join([str(fpath), str(issue.check_name), str(issue.executed), str(issue.result),
+                                    str(errors)]) + '\n')
+        self.output.write(''.join(lines))
+
+
+class JSONResultsWriter(ResultsWriter):
+    """
+    This class writes the check results as a single JSON object of key = file path, value = list of check results.
+    The object is only complete once the writer has been closed.
+    """
+
+    def __init__(self, output: TextIO):
+        super().__init__(output)
+        self._encoder = CheckResultJSONEncoder()
+
+    def write(self, fpath: str, check_results: List[CheckResult]):
+        self.output.write('{' if not self.files_written else ', ')
+        self.files_written += 1
+        self.output.write(json.dumps(fpath) + ': ' + self._encoder.encode(check_results))
+
+    def close(self):
+        self.output.write('}\n' if self.files_written else '{}\n')
+        super().close()
+
+
+class NDJSONResultsWriter(ResultsWriter):
+    """
+    This class writes the check results as newline delimited JSON: one line for each file,
+    with a JSON object of the form {"fpath": ..., "check_results": [...]}.
+    """
+
+    def __init__(self, output: TextIO):
+        super().__init__(output)
+        self._encoder = CheckResultJSONEncoder()
+
+    def write(self, fpath: str, check_results: List[CheckResult]):
+        self.files_written += 1
+        self.output.write(self._encoder.encode({'fpath': fpath, 'check_results': check_results}) + '\n')
+
+
+class DeduplicatedResultsWriter(ResultsWriter):
+    """
+    This class writes the check results as newline delimited JSON, with each distinct check result (check name,
+    severity, executed, result and error message) written only once, as {"message_id": ..., "check_result": {...}},
+    the first time it is seen. Each file is written as {"fpath": ..., "message_ids": [...]}, referring to the check
+    results written before it, so the size of the report grows with the number of distinct problems found,
+    not with the number of files times the number of checks.
+    """
+
+    def __init__(self, output: TextIO):
+        super().__init__(output)
+        self._encoder = CheckResultJSONEncoder()
+        self._message_ids = {}
+
+    @staticmethod
+    def _get_key(check_result: CheckResult):
+        error_message = check_result.error_message
+        if isinstance(error_message, list):
+            error_message = tuple(error_message)
+        return (check_result.check_code, check_result.severity_code, check_result.executed,
+                check_result.result_code, error_message)
+
+    def _get_message_id(self, check_result: CheckResult) -> int:
+        key = self._get_key(check_result)
+        message_id = self._message_ids.get(key)
+        if message_id is None:
+            message_id = self._message_ids[key] = len(self._message_ids)
+            self.output.write(self._encoder.encode({'message_id': message_id, 'check_result': check_result}) + '\n')
+        return message_id
+
+    def write(self, fpath: str, check_results: List[CheckResult]):
+        self.files_written += 1
+        message_ids = [self._get_message_id(check_result) for check_result in check_results]
+        self.output.write(json.dumps({'fpath': fpath, 'message_ids': message_ids}) + '\n')
+
+    @property
+    def messages_written(self) -> int:
+        return len(self._message_ids)
+
+
+def read_deduplicated_results(lines):
+    """
+    This function reads back the report written by DeduplicatedResultsWriter.
+    :param lines: iterable of the lines of the report
+    :return: generator of tuples (fpath, list of the check results of the file, as dicts)
+    """
+    check_results_by_id = {}
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if 'message_id' in record:
+            check_results_by_id[record['message_id']] = record['check_result']
+        else:
+            yield record['fpath'], [check_results_by_id[message_id] for message_id in record['message_ids']]
+
+
 def format_output_as_tsv(check_results_by_path):
     """
     This function converts a dictionary of key = fpath, values = CheckResults into a tab delimited values string.
     :param check_results_by_path:
     :return:
     """
-    result_str = ''
-    if check_results_by_path:
-        result_str += "Fpath\tExecuted\tResult\tErrors\t"
-        for fpath, issues in check_results_by_path.items():
-            for issue in issues:
-                errors = issue.error_message if (issue.error_message or issue.error_message is None) else None
-                result_str = result_str + str(fpath) + '\t' + str(issue.check_name) + '\t' + str(
-                    issue.executed) + '\t' + str(
-                    issue.result) + '\t' + str(errors) + '\n'
-    return result_str
-
+    output = io.StringIO()
+    TSVResultsWriter(output).write_all(check_results_by_path)
+    return output.getvalue()
 
 
 def format_output_as_json(check_results_by_path):
@@ -48,5 +185,4 @@ def format_output_as_json(check_results_by_path):
     :param check_results_by_path: dict - key = str (filepath), value = list[CheckResult]
     :return: json formatted string
     """
-    CheckResultJSONEncoder = MappingJSONEncoderClassBuilder(CheckResult, CheckResult.to_json_mapping()).build()
-    return json.dumps(check_results_by_path, cls=CheckResultJSONEncoder)
\ No newline at end of file
+    return json.dumps(check_results_by_path, cls=CheckResultJSONEncoder)
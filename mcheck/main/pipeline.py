@@ -0,0 +1,286 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+
+Pipeline module
+===============
+
+This module runs the checks of each file through a pipeline of stages: header -> seqscape -> comparison,
+fed by the files whose iRODS metadata has been fetched and checked. The stages are connected by bounded queues and
+each of them runs in its own threads, so a file can be compared while the headers of the next files are still being
+fetched, and the results of a file are returned as soon as all its stages are done, instead of at the end of the run.
+"""
+
+import queue
+import threading
+from typing import Callable, Iterable, List
+
+from mcheck.checks.mchecks_by_comparison import FileMetadataComparison
+from mcheck.checks.mchecks_by_type import MetadataSelfChecks
+from mcheck.metadata.seqscape_metadata.seqscape_meta_provider import SeqscapeConnectionProvider
+
+_END = object()
+
+
+class _PipelineStopped(Exception):
+    pass
+
+
+class FileCheckItem:
+    """
+    This class holds everything that is known about a file while it goes through the pipeline.
+    """
+
+    def __init__(self, fpath, irods_metadata, check_results: List=None):
+        self.fpath = fpath
+        self.irods_metadata = irods_metadata
+        self.header_metadata = None
+        self.seqscape_metadata = None
+        self.check_results = check_results if check_results is not None else []
+
+
+class PipelineStage:
+    """
+    This class runs a function on the items coming from an input queue, in one or more threads,
+    and puts the processed items on an output queue. When batch_size > 1, the function is given all
+    the items waiting in the input queue (up to batch_size), instead of one item at a time.
+    """
+
+    def __init__(self, name: str, process: Callable, input_queue: queue.Queue, output_queue: queue.Queue,
+                 stop_event: threading.Event, failures: List, workers: int=1, batch_size: int=1):
+        if workers < 1:
+            raise ValueError("The %s stage needs at least one worker, got: %s" % (name, workers))
+        self.name = name
+        self.process = process
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.stop_event = stop_event
+        self.failures = failures
+        self.workers = workers
+        self.batch_size = batch_size
+        self._workers_running = workers
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        for worker_nr in range(self.workers):
+            thread = threading.Thread(target=self._run, name='%s-%s' % (self.name, worker_nr), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _next_batch(self):
+        batch = []
+        item = get_from_queue(self.input_queue, self.stop_event)
+        while True:
+            if item is _END:
+                return batch, item
+            batch.append(item)
+            if len(batch) == self.batch_size:
+                return batch, None
+            try:
+                item = self.input_queue.get_nowait()
+            except queue.Empty:
+                return batch, None
+
+    def _run(self):
+        try:
+            while not self.stop_event.is_set():
+                batch, end = self._next_batch()
+                if batch:
+                    if self.batch_size > 1:
+                        self.process(batch)
+                    else:
+                        self.process(batch[0])
+                    for item in batch:
+                        put_in_queue(self.output_queue, item, self.stop_event)
+                if end is _END:
+                    # Let the other workers of this stage know that there is nothing left:
+                    put_in_queue(self.input_queue, _END, self.stop_event)
+                    with self._lock:
+                        self._workers_running -= 1
+                        last_worker = self._workers_running == 0
+                    if last_worker:
+                        put_in_queue(self.output_queue, _END, self.stop_event)
+                    return
+        except _PipelineStopped:
+            return
+        except BaseException as e:
+            self.failures.append(e)
+            self.stop_event.set()
+
+
+def put_in_queue(items_queue: queue.Queue, item, stop_event: threading.Event, timeout: float=0.1):
+    while True:
+        try:
+            items_queue.put(item, timeout=timeout)
+            return
+        except queue.Full:
+            if stop_event.is_set():
+                raise _PipelineStopped()
+
+
+def get_from_queue(items_queue: queue.Queue, stop_event: threading.Event, timeout: float=0.1):
+    while True:
+        try:
+            return items_queue.get(timeout=timeout)
+        except queue.Empty:
+            if stop_event.is_set():
+                raise _PipelineStopped()
+
+
+class FileChecksPipeline:
+    """
+    This class runs the header, seqscape and comparison checks of each file in a pipeline.
+    The Sequencescape stage fetches the metadata of the files waiting in its queue together (up to seqscape_batch_size),
+    so that the queries to Sequencescape are still batched.
+    """
+    DEFAULT_QUEUE_SIZE = 100
+    DEFAULT_SEQSCAPE_BATCH_SIZE = 100
+
+    def __init__(self, header_workers: int=1, seqscape_workers: int=1, comparison_workers: int=1,
+                 queue_size: int=DEFAULT_QUEUE_SIZE, seqscape_batch_size: int=DEFAULT_SEQSCAPE_BATCH_SIZE,
+                 connection_provider=None, run_stats=None, on_result: Callable=None, header_timeout: float=None,
+                 header_cache=None):
+        """
+        :param header_workers: the number of files to fetch the header for at the same time
+        :param seqscape_workers: the number of batches of files to fetch the Sequencescape metadata for at the same time
+        :param comparison_workers: the number of files to compare the metadata of at the same time
+        :param queue_size: the maximum number of files waiting between two stages
+        :param seqscape_batch_size: the maximum number of files to fetch the Sequencescape metadata for together
+        :param connection_provider: SeqscapeConnectionProvider shared by the Sequencescape workers (each of them
+                                    with its own connection), if missing one is created from the config
+                                    when the pipeline is run
+        :param run_stats: RunStatistics to be updated with the counters of the stages (optional)
+        :param on_result: function called with (fpath, check_results) as soon as the checks of a file are done (optional)
+        :param header_timeout: the maximum number of seconds to wait for the header of one file (None = no limit)
+        :param header_cache: SAMFileHeaderMetadataCache shared by the header workers (optional)
+        """
+        self.header_workers = header_workers
+        self.seqscape_workers = seqscape_workers
+        self.comparison_workers = comparison_workers
+        self.queue_size = queue_size
+        self.seqscape_batch_size = seqscape_batch_size
+        self.connection_provider = connection_provider
+        self.run_stats = run_stats
+        self.on_result = on_result
+        self.header_timeout = header_timeout
+        self.header_cache = header_cache
+
+    def check_header(self, item: FileCheckItem):
+        # The files whose iRODS metadata couldn't be fetched go through the stages without being checked:
+        if item.irods_metadata is None:
+            return
+        checksums_by_path = None
+        if self.header_cache:
+            checksums_by_path = {item.fpath: MetadataSelfChecks.get_content_checksum(item.irods_metadata)}
+        header_metadata_dict = MetadataSelfChecks.fetch_and_preprocess_header_metadata([item.fpath],
+                                                                                       {item.fpath: item.check_results},
+                                                                                       timeout=self.header_timeout,
+                                                                                       run_stats=self.run_stats,
+                                                                                       cache=self.header_cache,
+                                                                                       checksums_by_path=checksums_by_path)
+        item.header_metadata = header_metadata_dict.get(item.fpath)
+
+    def check_seqscape(self, items: List[FileCheckItem]):
+        items = [item for item in items if item.irods_metadata is not None]
+        if not items:
+            return
+        irods_metadata_dict = {item.fpath: item.irods_metadata for item in items}
+        issues_dict = {item.fpath: item.check_results for item in items}
+        seqscape_metadata_dict = MetadataSelfChecks.fetch_and_preprocess_seqscape_metadata(irods_metadata_dict,
+                                                                                           issues_dict,
+                                                                                           self.connection_provider,
+                                                                                           batched=True,
+                                                                                           run_stats=self.run_stats)
+        for item in items:
+            item.seqscape_metadata = seqscape_metadata_dict.get(item.fpath)
+
+    @staticmethod
+    def check_across_sources(item: FileCheckItem):
+        if item.irods_metadata is None:
+            return
+        header_metadata_dict = {item.fpath: item.header_metadata} if item.header_metadata else {}
+        seqscape_metadata_dict = {item.fpath: item.seqscape_metadata} if item.seqscape_metadata else {}
+        FileMetadataComparison.check_metadata_across_different_sources({item.fpath: item.irods_metadata},
+                                                                       header_metadata_dict,
+                                                                       seqscape_metadata_dict,
+                                                                       {item.fpath: item.check_results})
+
+    @staticmethod
+    def _feed(irods_items: Iterable, output_queue: queue.Queue, stop_event: threading.Event, failures: List):
+        try:
+            for fpath, irods_metadata, check_results in irods_items:
+                put_in_queue(output_queue, FileCheckItem(fpath, irods_metadata, check_results), stop_event)
+            put_in_queue(output_queue, _END, stop_event)
+        except _PipelineStopped:
+            return
+        except BaseException as e:
+            failures.append(e)
+            stop_event.set()
+
+    def run(self, irods_items: Iterable):
+        """
+        Runs the checks of the files given as parameter through the pipeline.
+        :param irods_items: iterable of tuples (fpath, IrodsSeqFileMetadata, list of the iRODS CheckResults)
+        :return: generator of tuples (fpath, list[CheckResult]), in the order in which the files' checks are done
+        """
+        if not self.connection_provider:
+            self.connection_provider = SeqscapeConnectionProvider.from_config()
+        stop_event = threading.Event()
+        failures = []
+        irods_queue = queue.Queue(self.queue_size)
+        header_queue = queue.Queue(self.queue_size)
+        seqscape_queue = queue.Queue(self.queue_size)
+        results_queue = queue.Queue(self.queue_size)
+        stages = [PipelineStage('header', self.check_header, irods_queue, header_queue, stop_event,
+                                failures, self.header_workers),
+                  PipelineStage('seqscape', self.check_seqscape, header_queue, seqscape_queue, stop_event,
+                                failures, self.seqscape_workers, self.seqscape_batch_size),
+                  PipelineStage('comparison', self.check_across_sources, seqscape_queue, results_queue, stop_event,
+                                failures, self.comparison_workers)]
+        feeder = threading.Thread(target=self._feed, args=(irods_items, irods_queue, stop_event, failures),
+                                  name='irods', daemon=True)
+        feeder.start()
+        for stage in stages:
+            stage.start()
+        files = 0
+        try:
+            while True:
+                try:
+                    item = results_queue.get(timeout=0.1)
+                except queue.Empty:
+                    item = None
+                if failures:
+                    raise failures[0]
+                if item is None:
+                    continue
+                if item is _END:
+                    break
+                files += 1
+                if self.on_result:
+                    self.on_result(item.fpath, item.check_results)
+                yield item.fpath, item.check_results
+        finally:
+            # Makes the stages exit if the caller stops early or one of the stages has failed:
+            stop_event.set()
+            if self.run_stats is not None:
+                self.run_stats.increment('pipeline', 'files', files)
+                self.run_stats.add_counters('seqscape_connection', self.connection_provider.get_stats())
+                if self.header_cache:
+                    self.run_stats.add_counters('header_cache', self.header_cache.get_stats())
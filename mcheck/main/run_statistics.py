@@ -0,0 +1,97 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+"""
+
+import threading
+from collections import Counter, OrderedDict
+
+
+class RunStatistics:
+    """
+    This class gathers the counters reported by the different components used during a run
+    (e.g. how many connections were opened to Sequencescape), so that they can be reported at the end of the run.
+    The counters can be updated from different threads.
+    The ratios in RATIOS are worked out from the counters only when reporting them, so that the counters
+    of different shards can be added up.
+    """
+    # key = name of the component (or the last part of it, after the shard prefix),
+    # value = dict of key = ratio name, value = (numerator counter, denominator counter)
+    RATIOS = {'seqscape_dedup': {'dedup_ratio': ('files', 'distinct_id_sets')}}
+
+    def __init__(self):
+        self._counters_by_component = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get_counters(self, component: str) -> Counter:
+        with self._lock:
+            if component not in self._counters_by_component:
+                self._counters_by_component[component] = Counter()
+            return self._counters_by_component[component]
+
+    def increment(self, component: str, counter: str, value: int=1):
+        with self._lock:
+            self.get_counters(component)[counter] += value
+
+    def set_value(self, component: str, counter: str, value):
+        with self._lock:
+            self.get_counters(component)[counter] = value
+
+    def add_counters(self, component: str, counters):
+        """
+        Adds the counters given as parameter to the counters already recorded for this component.
+        :param component: str - the name of the component that reports the counters
+        :param counters: dict of key = counter name, value = int
+        """
+        with self._lock:
+            self.get_counters(component).update(counters)
+
+    @classmethod
+    def _with_ratios(cls, component: str, counters) -> dict:
+        counters = dict(counters)
+        ratios = cls.RATIOS.get(component.rsplit('.', 1)[-1], {})
+        for ratio_name, (numerator, denominator) in ratios.items():
+            if counters.get(denominator):
+                counters[ratio_name] = round(counters.get(numerator, 0) / counters[denominator], 2)
+        return counters
+
+    def to_dict(self, with_ratios: bool=True):
+        """
+        :param with_ratios: if False, only the counters are returned, e.g. for adding them to the counters of another run
+        :return: OrderedDict of key = component, value = dict of key = counter name, value = counter value
+        """
+        with self._lock:
+            if not with_ratios:
+                return OrderedDict((component, dict(counters))
+                                   for component, counters in self._counters_by_component.items())
+            return OrderedDict((component, self._with_ratios(component, counters))
+                               for component, counters in self._counters_by_component.items())
+
+    def format_as_text(self) -> str:
+        lines = []
+        for component, counters in self.to_dict().items():
+            counters_as_text = ', '.join("%s = %s" % (name, value) for name, value in sorted(counters.items()))
+            lines.append("%s: %s" % (component, counters_as_text))
+        return '\n'.join(lines)
+
+    def __str__(self):
+        return self.format_as_text()
+
+    def __repr__(self):
+        return self.__str__()
@@ -0,0 +1,166 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+
+Sharding module
+===============
+
+This module runs the checks of a list of files in several processes, by splitting the list into contiguous shards,
+one for each process. Each process creates its own connections to iRODS and Sequencescape. The results of the shards
+are merged back in the order of the shards, so the order of the files in the result is the same as in the input.
+When the files come as a stream instead, they are read and sent to the processes in chunks of a bounded size,
+a few chunks ahead of the results merged, so that the whole input is never held in memory.
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, List
+
+from mcheck.com.profiling import PROFILER
+from mcheck.main.run_statistics import RunStatistics
+from mcheck.results.results_store import CheckResultsStore
+
+
+def split_in_shards(items: List, shards: int) -> List[List]:
+    """
+    Splits the list given as parameter into (at most) shards contiguous lists of almost equal length.
+    :param items: list of items
+    :param shards: the number of lists to split the items into
+    :return: list of lists, none of them empty
+    """
+    shards = max(1, min(shards, len(items)))
+    shard_size, remainder = divmod(len(items), shards)
+    result = []
+    start = 0
+    for shard_nr in range(shards):
+        end = start + shard_size + (1 if shard_nr < remainder else 0)
+        result.append(items[start:end])
+        start = end
+    return [shard for shard in result if shard]
+
+
+def iter_chunks(items: Iterable, chunk_size: int):
+    """
+    Reads the items given as parameter in consecutive lists of chunk_size items (the last one can be shorter).
+    :param items: iterable of items
+    :param chunk_size: the maximum number of items in a chunk
+    :return: generator of lists, none of them empty
+    """
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _run_shard(check_function: Callable, shard: List, kwargs: Dict, profile: bool=False):
+    run_stats = RunStatistics()
+    # A forked process starts with a copy of the parent's timings, which the parent already has:
+    PROFILER.reset()
+    if profile:
+        PROFILER.enable()
+    check_results_by_path = check_function(shard, run_stats=run_stats, **kwargs)
+    return CheckResultsStore.from_dict(check_results_by_path), run_stats.to_dict(with_ratios=False), PROFILER.to_raw()
+
+
+def _report_results(check_results_by_path, on_result: Callable=None):
+    if on_result:
+        for fpath, check_results in check_results_by_path.items():
+            on_result(fpath, check_results)
+
+
+def run_in_shards(check_function: Callable, items: List, workers: int, run_stats: RunStatistics=None,
+                  on_result: Callable=None, **kwargs):
+    """
+    Runs check_function on the items given as parameter, split into shards, each in its own process.
+    :param check_function: a function that takes a list of items, a run_stats keyword argument and kwargs,
+                           and returns a dict of key = file path, value = list[CheckResult].
+                           It must be defined at module level, so that it can be sent to the other processes.
+    :param items: list of items to split between the processes
+    :param workers: the number of processes
+    :param run_stats: RunStatistics to be updated with the counters of each shard (optional)
+    :param on_result: function called with (fpath, check_results) for each file of a shard, as soon as the results
+                      of the shard are merged (optional)
+    :param kwargs: the other arguments of check_function, the same for each shard
+    :return: CheckResultsStore of key = file path, value = list[CheckResult], in the order of items
+    """
+    shards = split_in_shards(items, workers)
+    check_results_by_path = CheckResultsStore()
+    with ProcessPoolExecutor(max_workers=len(shards) or 1) as executor:
+        futures = [executor.submit(_run_shard, check_function, shard, kwargs, PROFILER.enabled) for shard in shards]
+        # The results are merged in the order of the shards, whichever shard finishes first:
+        for shard_nr, future in enumerate(futures):
+            shard_results, shard_stats, shard_timings = future.result()
+            PROFILER.merge(shard_timings)
+            check_results_by_path.update(shard_results)
+            _report_results(shard_results, on_result)
+            if run_stats is not None:
+                for component, counters in shard_stats.items():
+                    run_stats.add_counters('shard_%s.%s' % (shard_nr, component), counters)
+    if run_stats is not None:
+        run_stats.add_counters('sharding', {'shards': len(shards), 'files': len(check_results_by_path)})
+    return check_results_by_path
+
+
+def run_in_chunks(check_function: Callable, items: Iterable, workers: int, chunk_size: int,
+                  run_stats: RunStatistics=None, on_result: Callable=None, **kwargs):
+    """
+    Runs check_function on the items given as parameter, read in chunks of chunk_size items, each chunk in one of
+    the worker processes. Chunks are read from items only while fewer than 2 * workers of them wait for their results
+    to be merged, so at most that many chunks are held in memory.
+    :param check_function: a function that takes a list of items, a run_stats keyword argument and kwargs,
+                           and returns a dict of key = file path, value = list[CheckResult].
+                           It must be defined at module level, so that it can be sent to the other processes.
+    :param items: iterable of items, read only once
+    :param workers: the number of processes
+    :param chunk_size: the maximum number of items sent to a process at a time
+    :param run_stats: RunStatistics to which the counters of each chunk are added (optional)
+    :param on_result: function called with (fpath, check_results) for each file of a chunk, as soon as the results
+                      of the chunk are merged (optional)
+    :param kwargs: the other arguments of check_function, the same for each chunk
+    :return: CheckResultsStore of key = file path, value = list[CheckResult], in the order of items
+    """
+    check_results_by_path = CheckResultsStore()
+    chunks = 0
+
+    def merge_chunk_results(future):
+        chunk_results, chunk_stats, chunk_timings = future.result()
+        PROFILER.merge(chunk_timings)
+        check_results_by_path.update(chunk_results)
+        _report_results(chunk_results, on_result)
+        if run_stats is not None:
+            for component, counters in chunk_stats.items():
+                run_stats.add_counters(component, counters)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = deque()
+        for chunk in iter_chunks(items, chunk_size):
+            futures.append(executor.submit(_run_shard, check_function, chunk, kwargs, PROFILER.enabled))
+            chunks += 1
+            # The results are merged in the order of the chunks, whichever chunk finishes first:
+            if len(futures) >= 2 * workers:
+                merge_chunk_results(futures.popleft())
+        while futures:
+            merge_chunk_results(futures.popleft())
+    if run_stats is not None:
+        run_stats.add_counters('sharding', {'chunks': chunks, 'files': len(check_results_by_path)})
+    return check_results_by_path
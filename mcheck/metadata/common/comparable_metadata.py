@@ -21,6 +21,8 @@ This file has been created on Jun 13, 2016.
 
 
 class ComparableMetadata:
+    __slots__ = ('samples', 'libraries', 'studies')
+
     def __init__(self, samples, libraries, studies):
         self.samples = samples
         self.studies = studies
@@ -0,0 +1,126 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict
+
+from mcheck.metadata.file_header_metadata.header_metadata import SAMFileHeaderMetadata
+
+
+class SAMFileHeaderMetadataCache:
+    """
+    This class keeps the header metadata of the files checked in an SQLite database on disk, so that the header
+    of a file isn't fetched again on the next runs, as long as the file's checksum is the same.
+    The cache holds at most max_entries headers; when there are more, the ones used least recently are evicted.
+    """
+    DEFAULT_MAX_ENTRIES = 100000
+    EVICTION_INTERVAL = 100
+
+    def __init__(self, db_path: str, max_entries: int=DEFAULT_MAX_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._puts_since_eviction = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        # Lets several processes checking files at the same time read the cache while one of them writes to it:
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        with self._lock, self._connection:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS headers (fpath TEXT NOT NULL, md5 TEXT NOT NULL, "
+                                     "header TEXT NOT NULL, last_used REAL NOT NULL, PRIMARY KEY (fpath, md5))")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS headers_last_used ON headers (last_used)")
+            self._evict()
+
+    @staticmethod
+    def _to_json(header_metadata: SAMFileHeaderMetadata) -> str:
+        def ids_to_lists(ids_by_type):
+            return {id_type: sorted(ids) for id_type, ids in (ids_by_type or {}).items()}
+        return json.dumps({'samples': ids_to_lists(header_metadata.samples),
+                           'libraries': ids_to_lists(header_metadata.libraries),
+                           'platforms': list(header_metadata.platforms) if header_metadata.platforms else None})
+
+    @staticmethod
+    def _from_json(fpath: str, header_as_json: str) -> SAMFileHeaderMetadata:
+        header = json.loads(header_as_json)
+        return SAMFileHeaderMetadata(fpath=fpath,
+                                     samples={id_type: set(ids) for id_type, ids in header['samples'].items()},
+                                     libraries={id_type: set(ids) for id_type, ids in header['libraries'].items()},
+                                     studies={},
+                                     platforms=header['platforms'])
+
+    def get(self, fpath: str, md5: str):
+        """
+        :param fpath: the path of the file
+        :param md5: the checksum of the file's content
+        :return: the SAMFileHeaderMetadata of the file, if it is in the cache with this checksum, None otherwise
+        """
+        with self._lock, self._connection:
+            row = self._connection.execute("SELECT header FROM headers WHERE fpath = ? AND md5 = ?",
+                                           (fpath, md5)).fetchone()
+            if not row:
+                self.misses += 1
+                return None
+            self._connection.execute("UPDATE headers SET last_used = ? WHERE fpath = ? AND md5 = ?",
+                                     (time.time(), fpath, md5))
+            self.hits += 1
+        return self._from_json(fpath, row[0])
+
+    def put(self, header_metadata: SAMFileHeaderMetadata, md5: str):
+        """
+        Adds the header metadata to the cache. It must be the header as fetched, before it is fixed.
+        :param header_metadata: SAMFileHeaderMetadata of the file
+        :param md5: the checksum of the file's content
+        """
+        with self._lock, self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO headers (fpath, md5, header, last_used) VALUES (?, ?, ?, ?)",
+                                     (header_metadata.fpath, md5, self._to_json(header_metadata), time.time()))
+            self._puts_since_eviction += 1
+            if self._puts_since_eviction >= self.EVICTION_INTERVAL:
+                self._evict()
+
+    def _evict(self):
+        # Counting the entries is a scan of the table, so it is done only every EVICTION_INTERVAL insertions:
+        self._puts_since_eviction = 0
+        entries = self._connection.execute("SELECT COUNT(*) FROM headers").fetchone()[0]
+        if entries > self.max_entries:
+            self._connection.execute("DELETE FROM headers WHERE rowid IN "
+                                     "(SELECT rowid FROM headers ORDER BY last_used LIMIT ?)",
+                                     (entries - self.max_entries,))
+            self.evictions += entries - self.max_entries
+
+    def get_stats(self) -> Dict:
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+    def close(self):
+        with self._lock, self._connection:
+            self._evict()
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -19,7 +19,14 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 This file has been created on Nov 16, 2015.
 """
 
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Tuple
+
 import mcheck.com.utils as common_utils
+from mcheck.com.profiling import profiled
 from mcheck.metadata.common.identifiers import EntityIdentifier
 from mcheck.metadata.file_header_metadata.header_metadata import SAMFileHeaderMetadata
 
@@ -28,6 +35,14 @@ from sam.header_parser import SAMFileHeaderParser, SAMFileRGTagParser
 
 
 class SAMFileHeaderMetadataProvider:
+    # The errors of samtools and of the header parsing, reported for the file instead of being raised
+    # (TimeoutError is an OSError). Anything else is a bug and is raised:
+    FETCH_ERRORS = (OSError, ValueError, subprocess.SubprocessError)
+
+    # The number of header fetches running in the background, including the ones that have timed out
+    # and are left running, so that these still count against the number of workers:
+    _calls_running = 0
+    _calls_running_changed = threading.Condition()
 
     @classmethod
     def fetch_metadata(cls, fpath, irods=False):
@@ -41,10 +56,77 @@ class SAMFileHeaderMetadataProvider:
         libraries = EntityIdentifier.separate_identifiers_by_type(rg_tags_parsed.libraries)
         return SAMFileHeaderMetadata(fpath=fpath, samples=samples, libraries=libraries, platforms=rg_tags_parsed.platforms)
 
+    @classmethod
+    def _call_with_timeout(cls, function, timeout, max_running, *args):
+        """
+        Calls the function in a separate thread and waits for it at most timeout seconds.
+        A call that times out is left running in the background, as there is no way of stopping it from here,
+        but it keeps counting against max_running until it ends: a new call waits for one of the max_running
+        calls running to end first, within the same timeout.
+        """
+        if timeout is None:
+            return function(*args)
+        deadline = time.monotonic() + timeout
+        with cls._calls_running_changed:
+            if not cls._calls_running_changed.wait_for(lambda: cls._calls_running < max_running, timeout):
+                raise TimeoutError("Fetching the header couldn't start in %s seconds, as %s header fetches "
+                                   "(including the ones that timed out) are still running" %
+                                   (timeout, cls._calls_running))
+            cls._calls_running += 1
+        outcome = {}
+
+        def call():
+            try:
+                outcome['result'] = function(*args)
+            except Exception as e:
+                outcome['error'] = e
+            finally:
+                with cls._calls_running_changed:
+                    cls._calls_running -= 1
+                    cls._calls_running_changed.notify()
+
+        thread = threading.Thread(target=call, daemon=True)
+        thread.start()
+        thread.join(max(0, deadline - time.monotonic()))
+        if thread.is_alive():
+            raise TimeoutError("Fetching the header took longer than %s seconds" % timeout)
+        if 'error' in outcome:
+            raise outcome['error']
+        return outcome['result']
 
+    @classmethod
+    @profiled('header_fetch')
+    def _fetch_metadata_or_error(cls, fpath, irods, timeout, workers=1):
+        try:
+            return fpath, cls._call_with_timeout(cls.fetch_metadata, timeout, max(workers, 1), fpath, irods), None
+        except cls.FETCH_ERRORS as e:
+            return fpath, None, e
 
-
-
-
-
-
+    @classmethod
+    def fetch_metadata_for_paths(cls, fpaths: List[str], irods=False, workers: int=1,
+                                 timeout: float=None) -> Iterable[Tuple]:
+        """
+        This method fetches the header metadata of each of the files given as parameter,
+        for up to workers files at a time, each of them in at most timeout seconds.
+        The fetches that time out keep counting against workers until they end, across the calls of this method.
+        The errors of samtools, of the parsing and the timeouts (FETCH_ERRORS) are caught for each file
+        and returned with its result instead of being raised. Any other error is raised.
+        :param fpaths: list of file paths
+        :param irods: True if the files are in iRODS, False if they are on a local file system
+        :param workers: the maximum number of headers fetched at the same time
+        :param timeout: the maximum number of seconds to wait for the header of one file (None = no limit)
+        :return: generator of tuples (fpath, SAMFileHeaderMetadata or None, Exception or None), in the order of fpaths
+        """
+        if workers <= 1:
+            for fpath in fpaths:
+                yield cls._fetch_metadata_or_error(fpath, irods, timeout)
+            return
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(cls._fetch_metadata_or_error, fpath, irods, timeout, workers)
+                       for fpath in fpaths]
+            try:
+                for future in futures:
+                    yield future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
@@ -19,19 +19,23 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 This file has been created on Nov 30, 2015.
 """
 
-import re
-
 import mcheck.metadata.irods_metadata.constants as irods_consts
+from mcheck.metadata.irods_metadata import interning, validators
 from mcheck.results.checks_results import CheckResult
 from mcheck.results.constants import SEVERITY, RESULT
 from mcheck.check_names import CHECK_NAMES
 
 
 class IrodsACL:
+    """
+    The ACLs are immutable, and the access group and zone names, repeated across most of the files, are interned.
+    """
+    __slots__ = ('access_group', 'zone', 'permission')
+
     def __init__(self, access_group: str, zone: str, permission: str):
-        self.access_group = access_group
-        self.zone = zone
-        self.permission = permission
+        object.__setattr__(self, 'access_group', interning.intern_string(access_group))
+        object.__setattr__(self, 'zone', interning.intern_string(zone))
+        object.__setattr__(self, 'permission', permission)
         # TODO: this should be self._is_permission_valid()
         # try:
         #     print("PERMISSION before except : %s " % permission)
@@ -61,10 +65,7 @@ class IrodsACL:
         return self.access_group.startswith(irods_consts.IrodsGroups.PUBLIC.value)
 
     def provides_access_for_ss_group(self):
-        r = re.compile(irods_consts.IrodsGroups.SS_GROUP_REGEX.value)
-        if r.match(self.access_group):
-            return True
-        return False
+        return validators.is_ss_group(self.access_group)
 
     def provides_read_permission(self):
         return irods_consts.IrodsPermission(self.permission) == irods_consts.IrodsPermission.READ
@@ -77,45 +78,20 @@ class IrodsACL:
 
     @staticmethod
     def _is_permission_valid(permission: str):
-        # if permission and not type(permission) in [enum, str]:
-        #     raise TypeError("This permission is not a string, it is a %s" % str(type(permission)))
-        try:
-            irods_consts.IrodsPermission(permission)
-        except KeyError:
-            raise TypeError("This permission is not correct: " + str(permission))
-        except ValueError:
-            return False
-        else:
-            return True
+        return validators.is_permission_valid(permission)
 
     @staticmethod
     def _is_irods_zone_valid(zone):
-        # Dirty hack to get over the issue of not getting the zone from baton
-        if not zone:
-            return True
-        if zone and not type(zone) is str:
-            raise TypeError("This zone is not a string, it is a: %s " % str(type(zone)))
-        try:
-            irods_consts.IrodsZones(zone)
-        except ValueError:
-            return False
-        else:
-            return True
+        return validators.is_irods_zone_valid(zone)
 
     def validate_fields(self):
-        check_results = []
-        zone_check_result = CheckResult(check_name=CHECK_NAMES.check_irods_zone_within_acl, severity=SEVERITY.WARNING)
-        if not self._is_irods_zone_valid(self.zone):
-            zone_check_result.result = RESULT.FAILURE
-            zone_check_result.error_message="The iRODS zone seems wrong: " + str(self.zone) + " in acl = " + str(self)
-        check_results.append(zone_check_result)
-
-        permission_check_result = CheckResult(check_name=CHECK_NAMES.check_irods_permission_within_acl, severity=SEVERITY.WARNING)
-        if not self._is_permission_valid(self.permission):
-            permission_check_result.result = RESULT.FAILURE
-            permission_check_result.error_message = "The iRODS permission seems wrong: " + str(self.permission) + " in  acl = " + str(self)
-        check_results.append(permission_check_result)
-        return check_results
+        return validators.validate_acls([self])
+
+    def __setattr__(self, name, value):
+        raise AttributeError("IrodsACL can't be modified.")
+
+    def __reduce__(self):
+        return IrodsACL, (self.access_group, self.zone, self.permission)
 
     def __eq__(self, other):
         return self.access_group == other.access_group and self.zone == other.zone and \
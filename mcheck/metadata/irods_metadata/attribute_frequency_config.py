@@ -0,0 +1,114 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+"""
+
+import os
+import threading
+import time
+from types import MappingProxyType
+from typing import Dict
+
+
+class AttributeFrequencyRules:
+    """
+    This class holds the number of values each attribute must have in iRODS, as read from a config file.
+    It is immutable, so the same rules can be shared by all the files and threads of a run.
+    """
+    __slots__ = ('frequencies',)
+
+    def __init__(self, frequencies: Dict[str, int]):
+        object.__setattr__(self, 'frequencies', MappingProxyType(dict(frequencies)))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("AttributeFrequencyRules can't be modified.")
+
+    def find_differences(self, avus) -> list:
+        """
+        :param avus: dict of key = attribute, value = set of values of the attribute
+        :return: list of error messages, one for each attribute missing or having a different number of values
+        """
+        errors = []
+        for attribute, frequency in self.frequencies.items():
+            values = avus.get(attribute)
+            if values is None:
+                errors.append('Missing attribute %s' % attribute)
+            elif len(values) != frequency:
+                errors.append("Attribute %s should appear %s times and instead appears %s times" %
+                              (attribute, frequency, len(values)))
+        return errors
+
+
+def parse_attribute_frequencies_config(path: str) -> Dict[str, int]:
+    """
+    Parses a config file with one attribute and its frequency per line, separated by whitespace.
+    :param path: the path of the config file
+    :return: dict of key = attribute, value = frequency
+    :raises ValueError: if a line doesn't consist of an attribute and an integer
+    """
+    attributes_frequency = {}
+    with open(path) as config_file:
+        for line in config_file:
+            line = line.strip()
+            tokens = line.split()
+            if len(tokens) != 2:
+                raise ValueError(
+                    "Non standard config file - each line must have 2 items. This line looks like:" + str(line))
+            attribute = tokens[0]
+            if not tokens[1].isdigit():
+                raise ValueError("The config file doesn't contain integers as frequencies" + str(line))
+            attributes_frequency[attribute] = int(tokens[1])
+    return attributes_frequency
+
+
+class AttributeFrequencyConfigRegistry:
+    """
+    This class keeps the rules parsed from each attribute frequency config file, so that a config file is parsed
+    once per process instead of once per file checked. A config file is parsed again only if it has been modified
+    since it was last parsed. The modification time is checked at most every MTIME_CHECK_INTERVAL seconds.
+    """
+    MTIME_CHECK_INTERVAL = 1.0
+    _entries_by_path = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_rules(cls, path: str) -> AttributeFrequencyRules:
+        """
+        :param path: the path of the config file
+        :return: AttributeFrequencyRules parsed from the config file
+        """
+        now = time.monotonic()
+        entry = cls._entries_by_path.get(path)
+        if entry and now - entry[2] < cls.MTIME_CHECK_INTERVAL:
+            return entry[0]
+        mtime = os.stat(path).st_mtime_ns
+        with cls._lock:
+            entry = cls._entries_by_path.get(path)
+            if entry and entry[1] == mtime:
+                rules = entry[0]
+            else:
+                rules = AttributeFrequencyRules(parse_attribute_frequencies_config(path))
+            # Each entry is a tuple (rules, mtime, time of the last mtime check), replaced as a whole:
+            cls._entries_by_path[path] = (rules, mtime, now)
+            return rules
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._entries_by_path = {}
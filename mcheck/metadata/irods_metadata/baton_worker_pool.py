@@ -0,0 +1,229 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+"""
+
+import json
+import os
+import queue
+import subprocess
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List
+
+import config
+
+
+class BatonWorker:
+    """
+    This class wraps a long-lived baton process, which reads one JSON request per line on its stdin
+    and writes the JSON response for it on one line of its stdout. The process is started on the first request.
+    Its stdout is read by a thread of its own, so that a request can give up on a process that doesn't answer
+    within timeout seconds. A process that doesn't answer in time, or answers with something else than
+    a JSON object, is killed, as its next answers couldn't be matched to the requests any more,
+    and it is started again on the next request.
+    """
+    DEFAULT_TIMEOUT = 300
+
+    def __init__(self, command: List[str], worker_id: int=0, timeout: float=DEFAULT_TIMEOUT):
+        self.command = command
+        self.worker_id = worker_id
+        self.timeout = timeout
+        self._process = None
+        self._stderr = None
+        self._stdout_lines = None
+        self.requests = 0
+        self.failures = 0
+        self.restarts = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def is_alive(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def start(self):
+        if self._process is not None:
+            self.close()
+            self.restarts += 1
+        self._stderr = tempfile.TemporaryFile(mode='w+')
+        self._process = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                         stderr=self._stderr, universal_newlines=True, bufsize=1)
+        self._stdout_lines = queue.Queue()
+        threading.Thread(target=self._read_stdout, args=(self._process.stdout, self._stdout_lines),
+                         name='baton_worker_%s_stdout' % self.worker_id, daemon=True).start()
+
+    @staticmethod
+    def _read_stdout(stdout, stdout_lines: queue.Queue):
+        try:
+            for line in stdout:
+                stdout_lines.put(line)
+        except (OSError, ValueError):
+            # The stdout has been closed, as the process has been killed:
+            pass
+        finally:
+            stdout.close()
+        stdout_lines.put(None)
+
+    def close(self):
+        if self._process is None:
+            return
+        try:
+            self._process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self._process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+        self._stderr.close()
+
+    def kill(self):
+        if self.is_alive():
+            self._process.kill()
+            self._process.wait()
+
+    def _read_errors(self) -> str:
+        self._stderr.seek(0)
+        return self._stderr.read()
+
+    def _clear_errors(self):
+        # The process shares the file offset of its stderr with us, so its next errors are written from the start:
+        self._stderr.seek(0)
+        self._stderr.truncate()
+
+    def _raise_exited(self):
+        self._process.wait()
+        errors = self._read_errors()
+        if errors.find('KRB_ERROR_ACQUIRING_CREDS') != -1:
+            raise OSError("ERROR: you need to log into iRODS and aquire the KERBEROS credentials.")
+        raise OSError("baton worker %s exited with status %s: %s" % (self.worker_id, self._process.returncode, errors))
+
+    def request(self, json_request: Dict) -> Dict:
+        """
+        Sends a request to the baton process and waits for its response.
+        :param json_request: dict - the JSON object to send to baton (e.g. {"collection": ..., "data_object": ...})
+        :return: dict - the JSON object returned by baton
+        :raises OSError: if the baton process has died or has answered with something else than a JSON object
+        :raises TimeoutError: if the baton process hasn't answered within timeout seconds
+        """
+        if not self.is_alive():
+            self.start()
+        started = time.monotonic()
+        self.requests += 1
+        try:
+            try:
+                self._process.stdin.write(json.dumps(json_request) + '\n')
+                self._process.stdin.flush()
+            except BrokenPipeError:
+                self._raise_exited()
+            try:
+                line = self._stdout_lines.get(timeout=self.timeout)
+            except queue.Empty:
+                self.kill()
+                raise TimeoutError("baton worker %s didn't answer within %s seconds" % (self.worker_id, self.timeout))
+            if line is None:
+                self._raise_exited()
+            try:
+                response = json.loads(line)
+            except ValueError:
+                response = None
+            if not isinstance(response, dict):
+                self.kill()
+                raise OSError("baton worker %s answered with something else than a JSON object: %s" %
+                              (self.worker_id, line[:200]))
+            self._clear_errors()
+            return response
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            latency = time.monotonic() - started
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def get_stats(self) -> Dict:
+        mean_latency = self.total_latency / self.requests if self.requests else 0
+        return {'requests': self.requests,
+                'failures': self.failures,
+                'restarts': self.restarts,
+                'mean_latency_ms': round(mean_latency * 1000, 2),
+                'max_latency_ms': round(self.max_latency * 1000, 2)}
+
+
+class BatonWorkerPool:
+    """
+    This class holds a fixed number of baton workers, shared by all the threads fetching metadata from iRODS
+    during a run, so that a baton process isn't started for each file. A worker whose process has died
+    is restarted and the request is retried once on it, unless it has been given up on
+    for not answering in time.
+    """
+    BATON_LIST_BIN = 'baton-list'
+    BATON_LIST_ARGS = ['--avu', '--acl', '--replicate', '--unbuffered']
+
+    def __init__(self, size: int, command: List[str]=None, timeout: float=BatonWorker.DEFAULT_TIMEOUT):
+        if size < 1:
+            raise ValueError("The baton worker pool needs at least one worker, got: %s" % size)
+        if not command:
+            command = [os.path.join(config.BATON_BIN, self.BATON_LIST_BIN)] + self.BATON_LIST_ARGS
+        self.workers = [BatonWorker(command, worker_id, timeout) for worker_id in range(size)]
+        self._idle_workers = queue.Queue()
+        for worker in self.workers:
+            self._idle_workers.put(worker)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @property
+    def size(self) -> int:
+        return len(self.workers)
+
+    def request(self, json_request: Dict) -> Dict:
+        if self._closed:
+            raise ValueError("The baton worker pool has been closed.")
+        worker = self._idle_workers.get()
+        try:
+            try:
+                return worker.request(json_request)
+            except TimeoutError:
+                raise
+            except OSError:
+                if worker.is_alive():
+                    raise
+                return worker.request(json_request)
+        finally:
+            self._idle_workers.put(worker)
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        for worker in self.workers:
+            worker.close()
+
+    def get_stats(self) -> Dict:
+        return OrderedDict(('baton_worker_%s' % worker.worker_id, worker.get_stats()) for worker in self.workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -28,6 +28,11 @@ LANE_ID_REGEX = '^[0-9]{1}$'
 NPG_QC_REGEX = '^0|1$'
 TARGET_REGEX = '^0|1|library$'
 
+# The attributes whose values are the same for many files (e.g. all the files of a study or of a run):
+SHARED_VALUES_ATTRIBUTES = ('study', 'study_id', 'study_accession_number', 'study_title', 'reference', 'type',
+                            'target', 'manual_qc', 'alignment', 'sample_common_name', 'id_run', 'lane', 'tag_index',
+                            'library_type', 'is_paired_read', 'total_reads', 'ebi_run_acc', 'ebi_sub_md5')
+
 ######################## CONSTANTS ###############################
 
 class IrodsZones(Enum):
@@ -19,7 +19,6 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 This file has been created on Jun 23, 2015.
 """
 
-import re
 import os
 from collections import defaultdict, Iterable
 from typing import List, Dict, Union, Set
@@ -31,19 +30,26 @@ from mcheck.metadata.common.attribute_count import AttributeCount
 from mcheck.metadata.irods_metadata import constants as irods_consts, avu
 from mcheck.results.checks_results import CheckResult
 from mcheck.com import utils as common_utils
+from mcheck.com.profiling import profiled
 from mcheck.results.constants import SEVERITY, RESULT
 from mcheck.metadata.irods_metadata.acl import IrodsACL
+from mcheck.metadata.irods_metadata.attribute_frequency_config import AttributeFrequencyConfigRegistry, \
+    parse_attribute_frequencies_config
 from mcheck.metadata.irods_metadata.file_replica import IrodsFileReplica
+from mcheck.metadata.irods_metadata import interning, validators
 from mcheck.check_names import CHECK_NAMES
 
 
 class IrodsRawFileMetadata(ComparableMetadata):
+    # A run can hold the metadata of tens of thousands of files, hence the slots and the interned AVUs:
+    __slots__ = ('fpath', 'file_replicas', 'acls', 'avus')
+
     def __init__(self, fpath: str, file_replicas: List[IrodsFileReplica]=None,
                  acls: List[IrodsACL]=None, avus: Dict[str, Set]=None):
         self.fpath = fpath
         self.file_replicas = file_replicas if file_replicas else []
         self.acls = acls if acls else []
-        self.avus = avus if avus else defaultdict(set)
+        self.avus = interning.intern_avus(avus) if avus else defaultdict(set)
 
     @classmethod
     def from_baton_wrapper(cls, data_object):
@@ -69,7 +75,7 @@ class IrodsRawFileMetadata(ComparableMetadata):
         avus_grouped = defaultdict(set)
         for avu in avus_list:
             avus_grouped[avu.attribute].add(avu.value)
-        self.avus = avus_grouped
+        self.avus = interning.intern_avus(avus_grouped)
 
     def get_values_for_attribute(self, attribute: str) -> list:
         found = self.avus.get(attribute)
@@ -89,6 +95,7 @@ class IrodsRawFileMetadata(ComparableMetadata):
         else:
             raise ValueError("Operator not defined: %s. It needs to be one of: <>=" % str(operator))
 
+    @profiled('check.attribute_count')
     def check_attribute_count(self, avu_counts: List[AttributeCount]) -> List[CheckResult]:
         check_result = CheckResult(check_name=CHECK_NAMES.check_attribute_count,
                                    severity=SEVERITY.IMPORTANT)
@@ -109,10 +116,7 @@ class IrodsRawFileMetadata(ComparableMetadata):
 
         @classmethod
         def validate_replicas_individually(cls, replicas):
-            check_results = []
-            for replica in replicas:
-                check_results.extend(replica.validate_fields())
-            return check_results
+            return validators.validate_replicas(replicas)
 
         @classmethod
         def check_all_replicas_have_same_checksum(cls, replicas) -> CheckResult:
@@ -143,6 +147,7 @@ class IrodsRawFileMetadata(ComparableMetadata):
             return check_result
 
         @classmethod
+        @profiled('check.replicas')
         def check(cls, replicas):
             check_results = []
             check_results.extend(cls.validate_replicas_individually(replicas))
@@ -152,6 +157,11 @@ class IrodsRawFileMetadata(ComparableMetadata):
 
 
     class ACLsChecks:
+        # Most of the files of a run share one of a handful of ACL lists, so the results of checking a list of ACLs
+        # are kept by the list's (access group, zone, permission) values and reused for the next files having it:
+        MAX_CACHED_ACL_LISTS = 10000
+        _check_results_by_acls = {}
+
         @classmethod
         def check_non_public_acls(cls, acls) -> List[CheckResult]:
             """
@@ -200,69 +210,58 @@ class IrodsRawFileMetadata(ComparableMetadata):
 
         @classmethod
         def check_acls_individually(cls, acls):
-            check_results = []
-            for acl in acls:
-                check_results.extend(acl.validate_fields())
-            return check_results
+            return validators.validate_acls(acls)
 
         @classmethod
-        def check(cls, acls):
+        def _check_acls(cls, acls):
             check_results = []
             check_results.extend(cls.check_acls_individually(acls))
             check_results.append(cls.check_non_public_acls(acls))
             check_results.extend(cls.check_read_permission_exists_for_ss_group(acls))
             return check_results
 
-
-    class CompleteMetadataChecks:
-        GENERAL_ATTRIBUTE_FREQUENCY_CONFIG_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)),
-                                                               'conf_files/general.conf')
         @classmethod
-        def read_and_parse_config_file(cls, path):
-            attributes_frequency = {}
-            config_file = open(path)
-            for line in config_file:
-                line = line.strip()
-                tokens = line.split()
-                if len(tokens) != 2:
-                    raise ValueError(
-                        "Non standard config file - each line must have 2 items. This line looks like:" + str(line))
-                attribute = tokens[0]
-                if not tokens[1].isdigit():
-                    raise ValueError("The config file doesn't contain integers as frequencies" + str(line))
-                freq = int(tokens[1])
-                attributes_frequency[attribute] = freq
-            return attributes_frequency
-
+        def clear_cache(cls):
+            cls._check_results_by_acls.clear()
 
         @classmethod
-        def build_freq_dict_from_avus_list(cls, avus_list):
-            freq_dict = {}
-            for attribute, values in avus_list.items():
-                freq_dict[attribute] = len(values)
-            return freq_dict
+        @profiled('check.acls')
+        def check(cls, acls):
+            # The key is ordered, as the checks report the first public or ss group ACL found:
+            acls_key = tuple((acl.access_group, acl.zone, acl.permission) for acl in acls)
+            try:
+                check_results = cls._check_results_by_acls.get(acls_key)
+            except TypeError:   # unhashable values, can't be cached
+                return cls._check_acls(acls)
+            if check_results is None:
+                check_results = cls._check_acls(acls)
+                if len(cls._check_results_by_acls) < cls.MAX_CACHED_ACL_LISTS:
+                    cls._check_results_by_acls[acls_key] = check_results
+            # Each file gets its own copies of the results, in case they are changed later on:
+            return [CheckResult(check_name=check_result.check_name, executed=check_result.executed,
+                                result=check_result.result, severity=check_result.severity,
+                                error_message=check_result.error_message) for check_result in check_results]
 
 
+    class CompleteMetadataChecks:
+        GENERAL_ATTRIBUTE_FREQUENCY_CONFIG_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                                                               'conf_files/general.conf')
         @classmethod
-        def check_attributes_have_the_right_frequency(cls, standard_attr_dict, actual_attr_dict):
-            check_result = CheckResult(check_name=CHECK_NAMES.check_attribute_count, executed=True, result=RESULT.SUCCESS, error_message=[])
-            for attr, freq in standard_attr_dict.items():
-                if not attr in actual_attr_dict:
-                    check_result.result = RESULT.FAILURE
-                    check_result.error_message.append('Missing attribute %s' % attr)
-                elif freq != actual_attr_dict[attr]:
-                    check_result.result = RESULT.FAILURE
-                    check_result.error_message.append("Attribute %s should appear %s times and instead appears %s times" % (attr, freq, actual_attr_dict[attr]))
-            return check_result
+        def read_and_parse_config_file(cls, path):
+            return parse_attribute_frequencies_config(path)
 
 
         @classmethod
+        @profiled('check.attribute_frequencies')
         def check_attribute_frequencies(cls, avus, config_fpath=None):
             if not config_fpath:
                 config_fpath = cls.GENERAL_ATTRIBUTE_FREQUENCY_CONFIG_FILE
-            general_attribute_frequencies = cls.read_and_parse_config_file(config_fpath)
-            crt_attribute_frequencies = cls.build_freq_dict_from_avus_list(avus)
-            attr_freq_check_result = cls.check_attributes_have_the_right_frequency(general_attribute_frequencies, crt_attribute_frequencies)
+            # The config file is parsed only once, not for every file checked:
+            rules = AttributeFrequencyConfigRegistry.get_rules(config_fpath)
+            attr_freq_check_result = CheckResult(check_name=CHECK_NAMES.check_attribute_count, executed=True,
+                                                 result=RESULT.SUCCESS, error_message=rules.find_differences(avus))
+            if attr_freq_check_result.error_message:
+                attr_freq_check_result.result = RESULT.FAILURE
             return attr_freq_check_result
 
 
@@ -284,6 +283,9 @@ class IrodsRawFileMetadata(ComparableMetadata):
 
 
 class IrodsSeqFileMetadata(IrodsRawFileMetadata):
+    __slots__ = ('checksum_in_meta', 'checksum_at_upload', '_reference_paths', 'run_ids', 'lane_ids',
+                 '_npg_qc_values', '_target_values')
+
     def __init__(self, fpath: str, samples=None, libraries=None, studies=None,
                  checksum_in_meta:str=None, checksum_at_upload:str=None, references:List[str]=None,
                  run_ids:List[str]=None, lane_ids:List[str]=None, npg_qc:str=None, target:str=None, file_replicas=None,
@@ -381,18 +383,12 @@ class IrodsSeqFileMetadata(IrodsRawFileMetadata):
 
     @staticmethod
     def _is_npg_qc_valid(npg_qc):
-        if not type(npg_qc) in [str, int]:
-            return False
-        r = re.compile(irods_consts.NPG_QC_REGEX)
-        return True if r.match(str(npg_qc)) else False
+        return validators.is_npg_qc_valid(npg_qc)
 
 
     @staticmethod
     def _is_target_valid(target):
-        if not type(target) in [str, int]:
-            return False
-        r = re.compile(irods_consts.TARGET_REGEX)
-        return True if r.match(str(target)) else False
+        return validators.is_target_valid(target)
 
 
     def check_npg_qc_field(self):
@@ -458,6 +454,7 @@ class IrodsSeqFileMetadata(IrodsRawFileMetadata):
         return check_result
 
 
+    @profiled('check.fields')
     def validate_fields(self) -> List:
         check_results = []
         upl_checksum_check = self.check_checksum_at_upload_present()
@@ -487,6 +484,7 @@ class IrodsSeqFileMetadata(IrodsRawFileMetadata):
         return check_results
 
 
+    @profiled('check.reference')
     def check_reference(self, desired_ref_name: str) -> List[CheckResult]:
         check_result = CheckResult(check_name=CHECK_NAMES.check_desired_reference)
         check_result.error_message = []
@@ -513,7 +511,7 @@ class IrodsSeqFileMetadata(IrodsRawFileMetadata):
                                                                'conf_files/library_cram.conf')
         @classmethod
         def check_attribute_frequencies(cls, avus, config_file=None):
-            if 'target' in avus and len(avus['target']) == 1 and avus['target'] == 'library':
+            if set(avus.get('target', ())) == {'library'}:
                 res = super().check_attribute_frequencies(avus, cls.LIBRARY_ATTRIBUTE_FREQUENCY_CONFIG_FILE)
             else:
                 res = super().check_attribute_frequencies(avus)
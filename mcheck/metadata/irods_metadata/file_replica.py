@@ -19,20 +19,18 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 This file has been created on Nov 30, 2015.
 """
 
-import re
-
-import mcheck.metadata.irods_metadata.constants as irods_consts
-from mcheck.results.checks_results import CheckResult
-from mcheck.results.constants import SEVERITY, RESULT
-from mcheck.com import utils
-from mcheck.check_names import CHECK_NAMES
-
+from mcheck.metadata.irods_metadata import interning, validators
 
 
 class IrodsFileReplica:
+    """
+    The replicas are immutable. The checksum is interned, as all the replicas of a file usually have the same one.
+    """
+    __slots__ = ('checksum', 'replica_nr')
+
     def __init__(self, checksum: str, replica_nr: int):
-        self.checksum = checksum
-        self.replica_nr = replica_nr
+        object.__setattr__(self, 'checksum', interning.intern_string(checksum))
+        object.__setattr__(self, 'replica_nr', replica_nr)
 
     @staticmethod
     def from_baton_wrapper(replica):
@@ -40,45 +38,20 @@ class IrodsFileReplica:
 
     @staticmethod
     def _is_replica_nr_valid(replica_nr):
-        if not type(replica_nr) in [str, int]:
-            raise TypeError("WRONG type of parameter: replica_nr should be a digit and is: " + str(replica_nr))
-        if type(replica_nr) is str:
-            if not replica_nr.isdigit():
-                return False
-        if int(replica_nr) >= 0:
-            return True
-        return False
+        return validators.is_replica_nr_valid(replica_nr)
 
     @staticmethod
     def _is_checksum_valid(checksum):
-        if not checksum:
-            return False
-        if not type(checksum) is str:
-            raise TypeError("WRONG TYPE: the checksum must be a string, and is: " + str(type(checksum)))
-        return utils.is_hexadecimal_string(checksum)
+        return validators.is_checksum_valid(checksum)
 
     def validate_fields(self):
-        check_results = []
-        checksum_check_result = CheckResult(check_name=CHECK_NAMES.check_replica_checksum_valid,
-                                            severity=SEVERITY.IMPORTANT)
-        try:
-            is_valid_checksum = self._is_checksum_valid(self.checksum)
-            if not is_valid_checksum:
-                checksum_check_result.result = RESULT.FAILURE
-                checksum_check_result.error_message = "The checksum looks invalid: " + str(self.checksum)
-        except TypeError as e:
-            checksum_check_result.result = RESULT.FAILURE
-            checksum_check_result.error_message = "The checksum looks invalid: " + str(self.checksum)
-
-        valid_replicas_check_result = CheckResult(check_name=CHECK_NAMES.check_replica_number,
-                                                  severity=SEVERITY.WARNING)
-        if not self._is_replica_nr_valid(self.replica_nr):
-            valid_replicas_check_result.result = RESULT.FAILURE
-            valid_replicas_check_result.error_message = "The replica number looks invalid: " + str(self.replica_nr)
-
-        check_results.append(checksum_check_result)
-        check_results.append(valid_replicas_check_result)
-        return check_results
+        return validators.validate_replicas([self])
+
+    def __setattr__(self, name, value):
+        raise AttributeError("IrodsFileReplica can't be modified.")
+
+    def __reduce__(self):
+        return IrodsFileReplica, (self.checksum, self.replica_nr)
 
     def __eq__(self, other):
         return self.checksum == other.checksum and self.replica_nr == other.replica_nr
@@ -0,0 +1,85 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+
+Interning module
+================
+
+The metadata of the files of a study repeats the same strings over and over: attribute names, ACL owners and zones,
+study names, reference paths... This module keeps a single copy of each of them, shared by all the files:
+the strings are interned, and the values of the attributes in constants.SHARED_VALUES_ATTRIBUTES are kept
+as shared frozensets.
+"""
+
+import sys
+import threading
+from collections import defaultdict
+from typing import Dict, Set
+
+from mcheck.metadata.irods_metadata import constants as irods_consts
+
+# Past this number of distinct frozensets of values, the new ones aren't shared anymore,
+# so that a run with unusually diverse values doesn't keep all of them alive:
+MAX_SHARED_VALUES = 100000
+
+_SHARED_VALUES_ATTRIBUTES = frozenset(irods_consts.SHARED_VALUES_ATTRIBUTES)
+_shared_values = {}
+_lock = threading.Lock()
+
+
+def intern_string(value):
+    """
+    :return: the interned string, if value is a string, otherwise the value as it is
+    """
+    return sys.intern(value) if type(value) is str else value
+
+
+def get_shared_values(values) -> frozenset:
+    """
+    :param values: the values of an attribute
+    :return: frozenset of the values, the same object for all the attributes having the same values
+    """
+    values = frozenset(intern_string(value) for value in values)
+    shared = _shared_values.get(values)
+    if shared is not None:
+        return shared
+    with _lock:
+        if len(_shared_values) >= MAX_SHARED_VALUES:
+            return values
+        return _shared_values.setdefault(values, values)
+
+
+def intern_avus(avus: Dict[str, Set]) -> Dict[str, Set]:
+    """
+    :param avus: dict of key = attribute, value = set of values of the attribute
+    :return: dict of the same type, with the attribute names interned and the values of the attributes shared
+             by many files replaced by shared frozensets
+    """
+    interned = defaultdict(avus.default_factory) if isinstance(avus, defaultdict) else {}
+    for attribute, values in avus.items():
+        attribute = intern_string(attribute)
+        if attribute in _SHARED_VALUES_ATTRIBUTES and isinstance(values, (set, frozenset)):
+            values = get_shared_values(values)
+        interned[attribute] = values
+    return interned
+
+
+def clear_shared_values():
+    with _lock:
+        _shared_values.clear()
@@ -0,0 +1,136 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Dict, Tuple
+
+from mcheck.metadata.irods_metadata import constants as irods_consts
+from mcheck.metadata.irods_metadata.acl import IrodsACL
+from mcheck.metadata.irods_metadata.file_metadata import IrodsRawFileMetadata
+from mcheck.metadata.irods_metadata.file_replica import IrodsFileReplica
+
+
+class CachedIrodsMetadata:
+    def __init__(self, raw_metadata: IrodsRawFileMetadata, fetched_at: float):
+        self.raw_metadata = raw_metadata
+        self.fetched_at = fetched_at
+
+
+class IrodsRawFileMetadataCache:
+    """
+    This class keeps the iRODS metadata (AVUs, ACLs and replicas) of the files checked in an SQLite database on disk,
+    together with the time when it was fetched. An entry younger than ttl seconds is used as it is, without
+    checking iRODS. An older one is expired: the metadata of the file is fetched again in full.
+    The entries aren't revalidated: iRODS doesn't change anything cheap to query about a data object
+    (e.g. its modify time or its replica checksums) when its AVUs or ACLs change, so there is no key
+    that would tell which files have changed short of fetching their metadata again.
+    """
+    DEFAULT_TTL = 24 * 60 * 60
+
+    FRESH_HIT = 'fresh_hits'
+    EXPIRED = 'expired'
+    MISS = 'misses'
+
+    def __init__(self, db_path: str, ttl: float=DEFAULT_TTL):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        with self._lock, self._connection:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS irods_metadata (fpath TEXT PRIMARY KEY, "
+                                     "metadata TEXT NOT NULL, fetched_at REAL NOT NULL)")
+
+    @staticmethod
+    def _to_json(raw_metadata: IrodsRawFileMetadata) -> str:
+        def permission_to_str(permission):
+            return permission.value if isinstance(permission, irods_consts.IrodsPermission) else permission
+        return json.dumps({'replicas': [[replica.checksum, replica.replica_nr]
+                                        for replica in raw_metadata.file_replicas],
+                           'acls': [[acl.access_group, acl.zone, permission_to_str(acl.permission)]
+                                    for acl in raw_metadata.acls],
+                           'avus': {attribute: sorted(values) for attribute, values in raw_metadata.avus.items()}})
+
+    @staticmethod
+    def _from_json(fpath: str, metadata_as_json: str) -> IrodsRawFileMetadata:
+        metadata = json.loads(metadata_as_json)
+        return IrodsRawFileMetadata(fpath=fpath,
+                                    file_replicas=[IrodsFileReplica(checksum, replica_nr)
+                                                   for checksum, replica_nr in metadata['replicas']],
+                                    acls=[IrodsACL(access_group, zone, irods_consts.IrodsPermission(permission))
+                                          for access_group, zone, permission in metadata['acls']],
+                                    avus={attribute: set(values) for attribute, values in metadata['avus'].items()})
+
+    def get(self, fpath: str):
+        """
+        :param fpath: the iRODS path of the file
+        :return: CachedIrodsMetadata or None if the file isn't in the cache
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT metadata, fetched_at FROM irods_metadata WHERE fpath = ?",
+                                           (fpath,)).fetchone()
+        if not row:
+            return None
+        return CachedIrodsMetadata(self._from_json(fpath, row[0]), row[1])
+
+    def is_fresh(self, cached_metadata: CachedIrodsMetadata) -> bool:
+        return time.time() - cached_metadata.fetched_at < self.ttl
+
+    def lookup(self, fpath: str) -> Tuple[str, IrodsRawFileMetadata]:
+        """
+        Looks the file up in the cache and counts the outcome in the stats.
+        :param fpath: the iRODS path of the file
+        :return: tuple (FRESH_HIT, the cached metadata) if the file's entry is fresh,
+                 (EXPIRED, None) if it is older than the TTL, (MISS, None) if the file isn't in the cache
+        """
+        cached_metadata = self.get(fpath)
+        if not cached_metadata:
+            outcome, raw_metadata = self.MISS, None
+        elif self.is_fresh(cached_metadata):
+            outcome, raw_metadata = self.FRESH_HIT, cached_metadata.raw_metadata
+        else:
+            outcome, raw_metadata = self.EXPIRED, None
+        with self._lock:
+            self.stats[outcome] += 1
+        return outcome, raw_metadata
+
+    def put(self, raw_metadata: IrodsRawFileMetadata):
+        with self._lock, self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO irods_metadata (fpath, metadata, fetched_at) "
+                                     "VALUES (?, ?, ?)", (raw_metadata.fpath, self._to_json(raw_metadata), time.time()))
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self.stats)
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
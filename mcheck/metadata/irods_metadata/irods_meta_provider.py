@@ -19,15 +19,28 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 This file has been created on Nov 16, 2015.
 """
 
+import functools
+import json
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from mcheck.metadata.irods_metadata.file_metadata import IrodsRawFileMetadata
+from mcheck.metadata.irods_metadata.baton_worker_pool import BatonWorkerPool
+from mcheck.metadata.irods_metadata.irods_meta_cache import IrodsRawFileMetadataCache
+from mcheck.com.profiling import PROFILER, profiled
 
 import config
 from baton.api import connect_to_irods_with_baton
 from baton.models import SearchCriterion
-from typing import List, Tuple
+from baton._baton.json import DataObjectJSONDecoder
+from typing import Dict, List, Tuple, Iterable
 
+# Building the decoder's deserializer is expensive, so it is done only once:
+_DATA_OBJECT_DECODER = DataObjectJSONDecoder()
 
 class iRODSMetadataProvider:
+    BATON_LIST_BIN = 'baton-list'
+    BATON_LIST_ARGS = ['--avu', '--acl', '--replicate']
 
     @classmethod
     def convert_to_irods_fields(cls, filter_by_npg_qc=None, filter_by_target=None, filter_by_file_types=None,
@@ -65,6 +78,190 @@ class iRODSMetadataProvider:
             return None
 
 
+    @classmethod
+    @profiled('irods_fetch')
+    def _fetch_raw_file_metadata_or_error(cls, fpath):
+        try:
+            return cls.fetch_raw_file_metadata_by_path(fpath), None
+        except Exception as e:
+            return None, e
+
+    @classmethod
+    def _fetch_raw_file_metadata_in_chunk(cls, fpaths):
+        return [(fpath,) + cls._fetch_raw_file_metadata_or_error(fpath) for fpath in fpaths]
+
+    @staticmethod
+    def _to_baton_target(fpath: str) -> Dict:
+        fpath = os.path.normpath(fpath)
+        return {'collection': os.path.dirname(fpath), 'data_object': os.path.basename(fpath)}
+
+    @staticmethod
+    def _convert_baton_object(baton_object: Dict) -> Tuple:
+        """
+        Converts a data object, as returned by baton in JSON format, into the file's raw metadata.
+        :param baton_object: dict - the JSON object returned by baton for one data object
+        :return: tuple (IrodsRawFileMetadata or None, Exception or None)
+        """
+        fpath = os.path.join(baton_object.get('collection', ''), baton_object.get('data_object', ''))
+        if 'error' in baton_object:
+            return None, OSError("baton error for %s: %s" % (fpath, baton_object['error'].get('message')))
+        try:
+            # The baton output has already been parsed, so it is only mapped onto a DataObject, not decoded again:
+            data_object = _DATA_OBJECT_DECODER.decode_parsed(baton_object)
+            return IrodsRawFileMetadata.from_baton_wrapper(data_object), None
+        except (ValueError, KeyError, TypeError) as e:
+            return None, ValueError("Invalid metadata returned by baton for %s: %s" % (fpath, e))
+
+    @classmethod
+    def _fetch_raw_files_metadata_with_worker_pool(cls, fpaths: List[str], worker_pool: BatonWorkerPool) -> List[Tuple]:
+        results = []
+        for fpath in fpaths:
+            try:
+                with PROFILER.profile('irods_fetch'):
+                    baton_object = worker_pool.request(cls._to_baton_target(fpath))
+            except Exception as e:
+                results.append((fpath, None, e))
+            else:
+                results.append((fpath,) + cls._convert_baton_object(baton_object))
+        return results
+
+    @classmethod
+    def _run_baton_list(cls, fpaths: List[str], baton_args: List[str]=None) -> str:
+        targets = ''.join(json.dumps(cls._to_baton_target(fpath)) + '\n' for fpath in fpaths)
+        baton_args = baton_args if baton_args is not None else cls.BATON_LIST_ARGS
+        process = subprocess.Popen([os.path.join(config.BATON_BIN, cls.BATON_LIST_BIN)] + baton_args,
+                                   stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   universal_newlines=True)
+        output, errors = process.communicate(targets)
+        if errors.find('KRB_ERROR_ACQUIRING_CREDS') != -1:
+            raise OSError("ERROR: you need to log into iRODS and aquire the KERBEROS credentials.")
+        if process.returncode != 0 and not output:
+            raise RuntimeError("%s exited with status %s: %s" % (cls.BATON_LIST_BIN, process.returncode, errors))
+        return output
+
+    @staticmethod
+    def _split_json_objects(json_objects_as_string: str) -> Tuple[List, Exception]:
+        """
+        Parses the JSON objects output by baton, one after the other.
+        :param json_objects_as_string: the output of baton
+        :return: tuple (list of the JSON objects parsed, ValueError or None) - if the output is invalid
+                 (e.g. truncated), the objects before the invalid part are returned along with the error
+        """
+        decoder = json.JSONDecoder()
+        json_objects = []
+        position = 0
+        while True:
+            while position < len(json_objects_as_string) and json_objects_as_string[position].isspace():
+                position += 1
+            if position == len(json_objects_as_string):
+                return json_objects, None
+            try:
+                json_object, position = decoder.raw_decode(json_objects_as_string, position)
+            except ValueError as e:
+                return json_objects, ValueError("Invalid output from %s: %s" %
+                                                (iRODSMetadataProvider.BATON_LIST_BIN, e))
+            if not isinstance(json_object, dict):
+                return json_objects, ValueError("Invalid output from %s, not a JSON object: %s" %
+                                                (iRODSMetadataProvider.BATON_LIST_BIN, json_object))
+            json_objects.append(json_object)
+
+    @classmethod
+    @profiled('irods_fetch', count_files=lambda cls, fpaths: len(fpaths))
+    def _fetch_raw_files_metadata_in_bulk(cls, fpaths: List[str]) -> List[Tuple]:
+        """
+        This method sends all the paths given as parameter to a single baton-list process and then
+        matches its output back to each of the paths.
+        :param fpaths: list of iRODS file paths
+        :return: list of tuples (fpath, IrodsRawFileMetadata or None, Exception or None), in the order of fpaths
+        """
+        try:
+            baton_output = cls._run_baton_list(fpaths)
+        except Exception as e:
+            return [(fpath, None, e) for fpath in fpaths]
+        baton_objects, output_error = cls._split_json_objects(baton_output)
+        results_by_path = {}
+        for baton_object in baton_objects:
+            fpath = os.path.join(baton_object.get('collection', ''), baton_object.get('data_object', ''))
+            results_by_path[os.path.normpath(fpath)] = cls._convert_baton_object(baton_object)
+        results = []
+        for fpath in fpaths:
+            result = results_by_path.get(os.path.normpath(fpath))
+            if not result:
+                # The paths after an invalid part of the output get the error, as they can't be matched:
+                result = None, output_error or OSError("No metadata returned by baton for: %s" % fpath)
+            results.append((fpath,) + result)
+        return results
+
+    @classmethod
+    def _fetch_raw_files_metadata_with_cache(cls, fpaths: List[str], cache: IrodsRawFileMetadataCache,
+                                             **fetch_args) -> Iterable[Tuple]:
+        cached_metadata_by_path = {}
+        for fpath in fpaths:
+            # An expired entry is fetched again in full, see IrodsRawFileMetadataCache:
+            outcome, raw_metadata = cache.lookup(fpath)
+            if outcome == cache.FRESH_HIT:
+                cached_metadata_by_path[fpath] = raw_metadata
+
+        fpaths_to_fetch = [fpath for fpath in fpaths if fpath not in cached_metadata_by_path]
+        fetched_metadata = cls._fetch_raw_files_metadata_by_paths(fpaths_to_fetch, **fetch_args)
+        for fpath in fpaths:
+            if fpath in cached_metadata_by_path:
+                yield fpath, cached_metadata_by_path[fpath], None
+            else:
+                fetched_fpath, raw_metadata, error = next(fetched_metadata)
+                if raw_metadata:
+                    cache.put(raw_metadata)
+                yield fetched_fpath, raw_metadata, error
+
+    @classmethod
+    def fetch_raw_files_metadata_by_paths(cls, fpaths: List[str], workers: int=1, chunk_size: int=None,
+                                          worker_pool: BatonWorkerPool=None,
+                                          cache: IrodsRawFileMetadataCache=None) -> Iterable[Tuple]:
+        """
+        This method fetches the metadata of each of the paths given as parameter, using up to workers threads
+        at a time, so that the baton calls for different paths run concurrently.
+        If a chunk_size is given, the paths are sent chunk_size at a time to a single baton-list process,
+        instead of starting a baton process for each path.
+        If a worker_pool is given, the paths are sent one by one to its long-lived baton workers instead.
+        The errors are caught for each path and returned with its result instead of being raised.
+        :param fpaths: list of iRODS file paths
+        :param workers: the maximum number of paths (or chunks of paths) fetched at the same time
+        :param chunk_size: the number of paths to fetch with one baton-list process
+        :param worker_pool: BatonWorkerPool shared by all the calls of this run (optional)
+        :param cache: IrodsRawFileMetadataCache to take the metadata of the files that haven't changed from (optional)
+        :return: generator of tuples (fpath, IrodsRawFileMetadata or None, Exception or None), in the order of fpaths
+        """
+        if cache:
+            return cls._fetch_raw_files_metadata_with_cache(fpaths, cache, workers=workers, chunk_size=chunk_size,
+                                                            worker_pool=worker_pool)
+        return cls._fetch_raw_files_metadata_by_paths(fpaths, workers, chunk_size, worker_pool)
+
+    @classmethod
+    def _fetch_raw_files_metadata_by_paths(cls, fpaths: List[str], workers: int=1, chunk_size: int=None,
+                                           worker_pool: BatonWorkerPool=None) -> Iterable[Tuple]:
+        if worker_pool:
+            fetch_chunk = functools.partial(cls._fetch_raw_files_metadata_with_worker_pool, worker_pool=worker_pool)
+            chunk_size = 1
+        elif chunk_size:
+            fetch_chunk = cls._fetch_raw_files_metadata_in_bulk
+        else:
+            fetch_chunk = cls._fetch_raw_file_metadata_in_chunk
+            chunk_size = 1
+        chunks = [fpaths[i:i + chunk_size] for i in range(0, len(fpaths), chunk_size)]
+        if workers <= 1:
+            for chunk in chunks:
+                yield from fetch_chunk(chunk)
+            return
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(fetch_chunk, chunk) for chunk in chunks]
+            try:
+                for future in futures:
+                    yield from future.result()
+            finally:
+                # If the caller stops early, the paths not fetched yet are dropped:
+                for future in futures:
+                    future.cancel()
+
     @classmethod
     def retrieve_raw_files_metadata_by_metadata(cls, search_criteria_list: List[Tuple], zone=None):
         search_criteria_objs = []
@@ -74,8 +271,10 @@ class iRODSMetadataProvider:
 
         # Getting metadata from iRODS:
         try:
-            connection = connect_to_irods_with_baton(config.BATON_BIN)  # skip_baton_binaries_validation=True) # type: Connection
-            list_of_data_objs_and_metadata = connection.data_object.get_by_metadata(search_criteria_objs, zone=zone)
+            with PROFILER.profile('irods_fetch', files=0) as stage:
+                connection = connect_to_irods_with_baton(config.BATON_BIN)  # skip_baton_binaries_validation=True) # type: Connection
+                list_of_data_objs_and_metadata = connection.data_object.get_by_metadata(search_criteria_objs, zone=zone)
+                stage.files = len(list_of_data_objs_and_metadata)
         except RuntimeError as e:
             if str(e).find('KRB_ERROR_ACQUIRING_CREDS') != -1:
                 raise OSError("ERROR: you need to log into iRODS and aquire the KERBEROS credentials.") from None
@@ -0,0 +1,176 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+
+Validators module
+=================
+
+This module holds the validation of the fields of the iRODS metadata (replicas, ACLs, npg_qc, target, ...).
+The regexes in irods_metadata/constants.py are compiled once, when the module is imported, and the fields
+of all the replicas or ACLs of a file are validated in one pass over them.
+"""
+
+import re
+from typing import Iterable, List
+
+import mcheck.metadata.irods_metadata.constants as irods_consts
+from mcheck.check_names import CHECK_NAMES
+from mcheck.com.utils import is_hexadecimal_string
+from mcheck.results.checks_results import CheckResult
+from mcheck.results.constants import RESULT, SEVERITY
+
+LANELET_NAME_REGEX = re.compile(irods_consts.LANLET_NAME_REGEX)
+IRODS_SEQ_LANELET_PATH_REGEX = re.compile(irods_consts.IRODS_SEQ_LANELET_PATH_REGEX)
+RUN_ID_REGEX = re.compile(irods_consts.RUN_ID_REGEX)
+LANE_ID_REGEX = re.compile(irods_consts.LANE_ID_REGEX)
+NPG_QC_REGEX = re.compile(irods_consts.NPG_QC_REGEX)
+TARGET_REGEX = re.compile(irods_consts.TARGET_REGEX)
+SS_GROUP_REGEX = re.compile(irods_consts.IrodsGroups.SS_GROUP_REGEX.value)
+
+_IRODS_ZONES = frozenset(zone.value for zone in irods_consts.IrodsZones)
+_IRODS_PERMISSIONS = frozenset(irods_consts.IrodsPermission) | \
+                     frozenset(permission.value for permission in irods_consts.IrodsPermission)
+
+
+def is_checksum_valid(checksum) -> bool:
+    """
+    :raises TypeError: if the checksum is not a string
+    """
+    if not checksum:
+        return False
+    if not type(checksum) is str:
+        raise TypeError("WRONG TYPE: the checksum must be a string, and is: " + str(type(checksum)))
+    return is_hexadecimal_string(checksum)
+
+
+def _is_checksum_string_valid(checksum) -> bool:
+    # Unlike is_checksum_valid, a checksum that isn't a string is reported as invalid instead of raising:
+    return bool(checksum) and type(checksum) is str and is_hexadecimal_string(checksum)
+
+
+def is_replica_nr_valid(replica_nr) -> bool:
+    """
+    :raises TypeError: if the replica number is neither a string nor an int
+    """
+    if not type(replica_nr) in (str, int):
+        raise TypeError("WRONG type of parameter: replica_nr should be a digit and is: " + str(replica_nr))
+    if type(replica_nr) is str:
+        return replica_nr.isdigit()
+    return replica_nr >= 0
+
+
+def is_irods_zone_valid(zone) -> bool:
+    """
+    :raises TypeError: if the zone is not a string
+    """
+    # Dirty hack to get over the issue of not getting the zone from baton
+    if not zone:
+        return True
+    if not type(zone) is str:
+        raise TypeError("This zone is not a string, it is a: %s " % str(type(zone)))
+    return zone in _IRODS_ZONES
+
+
+def is_permission_valid(permission) -> bool:
+    try:
+        return permission in _IRODS_PERMISSIONS
+    except TypeError:   # unhashable, so not a permission
+        return False
+
+
+def is_npg_qc_valid(npg_qc) -> bool:
+    if not type(npg_qc) in (str, int):
+        return False
+    return NPG_QC_REGEX.match(str(npg_qc)) is not None
+
+
+def is_target_valid(target) -> bool:
+    if not type(target) in (str, int):
+        return False
+    return TARGET_REGEX.match(str(target)) is not None
+
+
+def is_ss_group(access_group: str) -> bool:
+    return SS_GROUP_REGEX.match(access_group) is not None
+
+
+def are_checksums_valid(checksums: Iterable) -> List[bool]:
+    """
+    :return: list of booleans, one per checksum - the checksums that aren't strings are invalid
+    """
+    return [_is_checksum_string_valid(checksum) for checksum in checksums]
+
+
+def are_replica_nrs_valid(replica_nrs: Iterable) -> List[bool]:
+    return [is_replica_nr_valid(replica_nr) for replica_nr in replica_nrs]
+
+
+def are_irods_zones_valid(zones: Iterable) -> List[bool]:
+    return [is_irods_zone_valid(zone) for zone in zones]
+
+
+def are_permissions_valid(permissions: Iterable) -> List[bool]:
+    return [is_permission_valid(permission) for permission in permissions]
+
+
+def validate_replicas(replicas) -> List[CheckResult]:
+    """
+    Validates the checksum and the number of each replica.
+    :param replicas: list of IrodsFileReplica
+    :return: list of CheckResult - for each replica, the checksum check followed by the replica number check
+    """
+    check_results = []
+    for replica in replicas:
+        checksum_check_result = CheckResult(check_name=CHECK_NAMES.check_replica_checksum_valid,
+                                            severity=SEVERITY.IMPORTANT)
+        if not _is_checksum_string_valid(replica.checksum):
+            checksum_check_result.result = RESULT.FAILURE
+            checksum_check_result.error_message = "The checksum looks invalid: " + str(replica.checksum)
+        replica_nr_check_result = CheckResult(check_name=CHECK_NAMES.check_replica_number,
+                                              severity=SEVERITY.WARNING)
+        if not is_replica_nr_valid(replica.replica_nr):
+            replica_nr_check_result.result = RESULT.FAILURE
+            replica_nr_check_result.error_message = "The replica number looks invalid: " + str(replica.replica_nr)
+        check_results.append(checksum_check_result)
+        check_results.append(replica_nr_check_result)
+    return check_results
+
+
+def validate_acls(acls) -> List[CheckResult]:
+    """
+    Validates the zone and the permission of each ACL.
+    :param acls: list of IrodsACL
+    :return: list of CheckResult - for each ACL, the zone check followed by the permission check
+    """
+    check_results = []
+    for acl in acls:
+        zone_check_result = CheckResult(check_name=CHECK_NAMES.check_irods_zone_within_acl,
+                                        severity=SEVERITY.WARNING)
+        if not is_irods_zone_valid(acl.zone):
+            zone_check_result.result = RESULT.FAILURE
+            zone_check_result.error_message = "The iRODS zone seems wrong: " + str(acl.zone) + " in acl = " + str(acl)
+        permission_check_result = CheckResult(check_name=CHECK_NAMES.check_irods_permission_within_acl,
+                                              severity=SEVERITY.WARNING)
+        if not is_permission_valid(acl.permission):
+            permission_check_result.result = RESULT.FAILURE
+            permission_check_result.error_message = "The iRODS permission seems wrong: " + str(acl.permission) + \
+                                                    " in  acl = " + str(acl)
+        check_results.append(zone_check_result)
+        check_results.append(permission_check_result)
+    return check_results
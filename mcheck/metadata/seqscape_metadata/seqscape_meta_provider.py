@@ -19,13 +19,19 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 This file has been created on Nov 16, 2015.
 """
 
+import threading
+import time
 import typing
+from collections import defaultdict, OrderedDict
 from sequencescape import connect_to_sequencescape, Sample, Study, Library
+from sqlalchemy.exc import InterfaceError, OperationalError
 from mcheck.metadata.seqscape_metadata.seqscape_metadata import SeqscapeRawMetadata, SeqscapeEntityQueryAndResults
 import config
 
 
 class SeqscapeRawMetadataProvider:
+    QUERY_CHUNK_SIZE = 500
+
     @classmethod
     def _get_connection(cls, host, port, db_name, user):
         return connect_to_sequencescape("mysql://" + user + ":@" + host + ":" + str(port) + "/" + db_name)
@@ -33,11 +39,11 @@ class SeqscapeRawMetadataProvider:
     @classmethod
     def _fetch_samples(cls, ss_connection, sample_names: typing.Set[str], sample_ids: typing.Set[str],
                        sample_accession_nrs: typing.Set[str]):
-        if sample_names and type(sample_names) is not set:
+        if sample_names and type(sample_names) not in (set, frozenset):
             raise ValueError("Sample_names parameter should be a list, and is a %s" % str(type(sample_names)))
-        if sample_ids and type(sample_ids) is not set:
+        if sample_ids and type(sample_ids) not in (set, frozenset):
             raise ValueError("Sample_ids parameter should be a list and is a %s" % str(type(sample_ids)))
-        if sample_accession_nrs and type(sample_accession_nrs) is not set:
+        if sample_accession_nrs and type(sample_accession_nrs) not in (set, frozenset):
             raise ValueError(
                 "Sample_accession_numbers parameter should be a list and is a %s" % str(type(sample_accession_nrs)))
 
@@ -77,11 +83,11 @@ class SeqscapeRawMetadataProvider:
     @classmethod
     def _fetch_studies(cls, ss_connection, study_names: typing.List[str], study_ids: typing.List[str],
                        study_accession_nrs: typing.List[str]) -> typing.Tuple:
-        if study_names and type(study_names) is not set:
+        if study_names and type(study_names) not in (set, frozenset):
             raise ValueError("Study_names parameter should be a list and it is a %s." % str(type(study_names)))
-        if study_ids and type(study_ids) is not set:
+        if study_ids and type(study_ids) not in (set, frozenset):
             raise ValueError("Study_ids parameter should be a list and it is a %s" % str(type(study_ids)))
-        if study_accession_nrs and type(study_accession_nrs) is not set:
+        if study_accession_nrs and type(study_accession_nrs) not in (set, frozenset):
             raise ValueError(
                 "Study_accession_nrs parameter should be a list and it is a %s" % str(type(study_accession_nrs)))
 
@@ -122,9 +128,9 @@ class SeqscapeRawMetadataProvider:
 
     @classmethod
     def _fetch_libraries(cls, ss_connection, library_names: typing.Set[str], library_ids: typing.Set[str]):
-        if library_names and type(library_names) is not set:
+        if library_names and type(library_names) not in (set, frozenset):
             raise ValueError("Library_names parameter should be a list and it is a %s" % str(type(library_names)))
-        if library_ids and type(library_ids) is not set:
+        if library_ids and type(library_ids) not in (set, frozenset):
             raise ValueError("Library_ids parameter should be a list and it is a %s" % str(type(library_ids)))
 
         library_names = list(library_names)
@@ -173,17 +179,117 @@ class SeqscapeRawMetadataProvider:
         return None
 
     @classmethod
-    def fetch_raw_metadata(cls, samples: typing.Mapping, libraries: typing.Mapping, studies: typing.Mapping) -> SeqscapeRawMetadata:
+    def fetch_raw_metadata(cls, samples: typing.Mapping, libraries: typing.Mapping, studies: typing.Mapping,
+                           connection_provider=None) -> SeqscapeRawMetadata:
         """
-
+        This method fetches from Sequencescape all the entities identified by the ids given as parameter.
+        If a connection_provider is given, its connection is reused and it is reopened once if the queries fail
+        because of the connection (OperationalError or InterfaceError from the database driver),
+        otherwise a new connection is opened for this call only.
         :param samples: a dict containing: key = name of the identifier type, value = set of identifier values
         :param libraries: same
         :param studies: same
-        :return:
+        :param connection_provider: SeqscapeConnectionProvider that owns the connection for the whole run
+        :return: SeqscapeRawMetadata
+        """
+        if not connection_provider:
+            ss_connection = cls._get_connection(config.SEQSC_HOST, config.SEQSC_PORT, config.SEQSC_DB_NAME,
+                                                config.SEQSC_USER)
+            return cls._fetch_raw_metadata(ss_connection, samples, libraries, studies)
+        try:
+            return cls._fetch_raw_metadata(connection_provider.get_connection(), samples, libraries, studies)
+        except (OperationalError, InterfaceError):
+            # The connection might have gone stale between two files, so it gets one more try on a new one:
+            return cls._fetch_raw_metadata(connection_provider.reconnect(), samples, libraries, studies)
+
+    @classmethod
+    def _collect_ids_by_id_type(cls, entities_ids_list: typing.Iterable[typing.Mapping]) -> typing.Dict[str, typing.Set]:
+        ids_by_id_type = defaultdict(set)
+        for entities_ids in entities_ids_list:
+            if not entities_ids:
+                continue
+            for id_type in PrefetchedEntityMapper.QUERY_METHOD_BY_ID_TYPE:
+                if entities_ids.get(id_type):
+                    ids_by_id_type[id_type].update(entities_ids.get(id_type))
+        return ids_by_id_type
+
+    @classmethod
+    def prefetch_entities(cls, ss_connection, samples_list: typing.Iterable[typing.Mapping],
+                          libraries_list: typing.Iterable[typing.Mapping],
+                          studies_list: typing.Iterable[typing.Mapping]):
+        """
+        This method fetches in chunked queries all the entities identified by the union of the ids given as parameter.
+        :param ss_connection: the connection to Sequencescape
+        :param samples_list: list of dicts of key = name of the identifier type, value = set of identifier values
+        :param libraries_list: same
+        :param studies_list: same
+        :return: PrefetchedSeqscapeConnection - answering the queries for these ids from the entities already fetched
+        """
+        prefetched_connection = PrefetchedSeqscapeConnection(ss_connection, cls.QUERY_CHUNK_SIZE)
+        for id_type, ids in cls._collect_ids_by_id_type(samples_list).items():
+            prefetched_connection.sample.prefetch(id_type, ids)
+        for id_type, ids in cls._collect_ids_by_id_type(studies_list).items():
+            prefetched_connection.study.prefetch(id_type, ids)
+
+        libraries_ids = cls._collect_ids_by_id_type(libraries_list)
+        if libraries_ids.get('name'):
+            prefetched_connection.library.prefetch('name', libraries_ids['name'])
+        if libraries_ids.get('internal_id'):
+            # The ids that aren't libraries can be wells or multiplexed libraries - see _fetch_libraries:
+            library_ids = libraries_ids['internal_id']
+            prefetched_connection.library.prefetch('internal_id', library_ids)
+            well_ids = prefetched_connection.library.get_ids_not_found('internal_id', library_ids)
+            prefetched_connection.well.prefetch('internal_id', well_ids)
+            multiplexed_library_ids = prefetched_connection.well.get_ids_not_found('internal_id', well_ids)
+            prefetched_connection.multiplexed_library.prefetch('internal_id', multiplexed_library_ids)
+        return prefetched_connection
+
+    @classmethod
+    def fetch_raw_metadata_in_batch(cls, entities_ids_by_fpath: typing.Mapping,
+                                    connection_provider=None) -> typing.Dict[str, SeqscapeRawMetadata]:
+        """
+        This method fetches the Sequencescape metadata of many files at once. Instead of querying Sequencescape
+        for each file, it gathers the ids of all the files, fetches the entities for all of them in a few chunked
+        queries and then builds each file's SeqscapeRawMetadata from the entities fetched.
+        The result for each file is the same as the one returned by fetch_raw_metadata.
+        As in fetch_raw_metadata, the connection is reopened once if the queries fail because of the connection,
+        and so is the connection of the sample <-> study associations queried later on by the checks.
+        :param entities_ids_by_fpath: dict of key = fpath, value = tuple of (samples, libraries, studies),
+                                      each of them being a dict as the ones given to fetch_raw_metadata
+        :param connection_provider: SeqscapeConnectionProvider that owns the connection for the whole run
+        :return: dict of key = fpath, value = SeqscapeRawMetadata
         """
+        if not connection_provider:
+            connection_provider = SeqscapeConnectionProvider.from_config()
+        try:
+            return cls._fetch_raw_metadata_in_batch(connection_provider.get_connection(), entities_ids_by_fpath,
+                                                    connection_provider)
+        except (OperationalError, InterfaceError):
+            # The connection might have gone stale since the last batch, so it gets one more try on a new one:
+            return cls._fetch_raw_metadata_in_batch(connection_provider.reconnect(), entities_ids_by_fpath,
+                                                    connection_provider)
+
+    @classmethod
+    def _fetch_raw_metadata_in_batch(cls, ss_connection, entities_ids_by_fpath: typing.Mapping,
+                                     connection_provider) -> typing.Dict[str, SeqscapeRawMetadata]:
+        prefetched_connection = cls.prefetch_entities(ss_connection,
+                                                      [samples for samples, _, _ in entities_ids_by_fpath.values()],
+                                                      [libraries for _, libraries, _ in entities_ids_by_fpath.values()],
+                                                      [studies for _, _, studies in entities_ids_by_fpath.values()])
+        association_index = SampleStudyAssociationIndex(prefetched_connection, cls.QUERY_CHUNK_SIZE,
+                                                        connection_provider)
+        raw_metadata_by_fpath = {}
+        for fpath, (samples, libraries, studies) in entities_ids_by_fpath.items():
+            raw_metadata_by_fpath[fpath] = cls._fetch_raw_metadata(prefetched_connection, samples, libraries, studies,
+                                                                   association_index)
+        return raw_metadata_by_fpath
+
+    @classmethod
+    def _fetch_raw_metadata(cls, ss_connection, samples: typing.Mapping, libraries: typing.Mapping,
+                            studies: typing.Mapping, association_index=None) -> SeqscapeRawMetadata:
         raw_meta = SeqscapeRawMetadata()
-        ss_connection = cls._get_connection(config.SEQSC_HOST, config.SEQSC_PORT, config.SEQSC_DB_NAME,
-                                            config.SEQSC_USER)
+        if association_index:
+            raw_meta.set_association_index(association_index)
         if samples:
             samples_fetched_by_names, samples_fetched_by_ids, samples_fetched_by_accession_nrs = \
                 cls._fetch_samples(ss_connection, samples.get('name'), samples.get('internal_id'), samples.get('accession_number'))
@@ -191,9 +297,10 @@ class SeqscapeRawMetadataProvider:
             raw_meta.add_fetched_entities(samples_fetched_by_accession_nrs)
             raw_meta.add_fetched_entities(samples_fetched_by_ids)
 
-            samples_set = raw_meta.get_entities_without_duplicates_by_entity_type('sample')
-            studies_for_samples = cls._fetch_studies_for_samples(ss_connection, samples_set)
-            raw_meta.add_fetched_entities_by_association(studies_for_samples)
+            if not association_index:
+                samples_set = raw_meta.get_entities_without_duplicates_by_entity_type('sample')
+                studies_for_samples = cls._fetch_studies_for_samples(ss_connection, samples_set)
+                raw_meta.add_fetched_entities_by_association(studies_for_samples)
 
         if studies:
             studies_fetched_by_names, studies_fetched_by_ids, studies_fetched_by_accession_nrs = \
@@ -203,13 +310,228 @@ class SeqscapeRawMetadataProvider:
             raw_meta.add_fetched_entities(studies_fetched_by_names)
 
             # Getting the sample-study associations:
-            studies_set = raw_meta.get_entities_without_duplicates_by_entity_type('study')
-            samples_for_study = cls._fetch_samples_for_studies(ss_connection, studies_set)
-            raw_meta.add_fetched_entities_by_association(samples_for_study)
+            if not association_index:
+                studies_set = raw_meta.get_entities_without_duplicates_by_entity_type('study')
+                samples_for_study = cls._fetch_samples_for_studies(ss_connection, studies_set)
+                raw_meta.add_fetched_entities_by_association(samples_for_study)
 
         if libraries:
             libraries_fetched_by_names, libraries_fetched_by_ids = \
                 cls._fetch_libraries(ss_connection, libraries.get('name'), libraries.get('internal_id'))
             raw_meta.add_fetched_entities(libraries_fetched_by_names)
             raw_meta.add_fetched_entities(libraries_fetched_by_ids)
-        return raw_meta
\ No newline at end of file
+        return raw_meta
+
+class PrefetchedEntityMapper:
+    """
+    This class answers the queries by name, internal_id or accession_number for one type of entity
+    from entities fetched beforehand in chunks, so that many files can share the same few queries.
+    All the other queries are passed on to the Sequencescape mapper it wraps.
+    """
+    QUERY_METHOD_BY_ID_TYPE = {'name': 'get_by_name',
+                               'internal_id': 'get_by_id',
+                               'accession_number': 'get_by_accession_number'
+                               }
+
+    def __init__(self, mapper, chunk_size: int):
+        self._mapper = mapper
+        self.chunk_size = chunk_size
+        self._entities_by_id_type = defaultdict(lambda: defaultdict(list))
+        self._prefetched_ids_by_id_type = defaultdict(set)
+        self.queries = 0
+
+    def prefetch(self, id_type: str, ids: typing.Iterable):
+        ids_to_fetch = sorted({str(id) for id in ids}.difference(self._prefetched_ids_by_id_type[id_type]))
+        query = getattr(self._mapper, self.QUERY_METHOD_BY_ID_TYPE[id_type])
+        entities_by_id = self._entities_by_id_type[id_type]
+        for i in range(0, len(ids_to_fetch), self.chunk_size):
+            entities = query(ids_to_fetch[i:i + self.chunk_size])
+            self.queries += 1
+            if not entities:
+                continue
+            if type(entities) is not list:
+                entities = [entities]
+            for entity in entities:
+                entities_by_id[str(getattr(entity, id_type))].append(entity)
+        self._prefetched_ids_by_id_type[id_type].update(ids_to_fetch)
+
+    def get_ids_not_found(self, id_type: str, ids: typing.Iterable) -> typing.Set[str]:
+        return {str(id) for id in ids if str(id) not in self._entities_by_id_type[id_type]}
+
+    def _get_prefetched(self, id_type: str, ids: typing.Iterable) -> typing.List:
+        ids = [str(id) for id in ids]
+        if not self._prefetched_ids_by_id_type[id_type].issuperset(ids):
+            self.prefetch(id_type, ids)
+        entities_by_id = self._entities_by_id_type[id_type]
+        entities = []
+        for id in OrderedDict.fromkeys(ids):
+            entities.extend(entities_by_id.get(id, []))
+        return entities
+
+    def get_by_name(self, names):
+        return self._get_prefetched('name', names)
+
+    def get_by_id(self, internal_ids):
+        return self._get_prefetched('internal_id', internal_ids)
+
+    def get_by_accession_number(self, accession_numbers):
+        return self._get_prefetched('accession_number', accession_numbers)
+
+    def __getattr__(self, name):
+        return getattr(self._mapper, name)
+
+
+class PrefetchedSeqscapeConnection:
+    """
+    This class stands in for a Sequencescape connection, but answers the queries by id from prefetched entities.
+    """
+    def __init__(self, ss_connection, chunk_size: int):
+        self.sample = PrefetchedEntityMapper(ss_connection.sample, chunk_size)
+        self.study = PrefetchedEntityMapper(ss_connection.study, chunk_size)
+        self.library = PrefetchedEntityMapper(ss_connection.library, chunk_size)
+        self.well = PrefetchedEntityMapper(ss_connection.well, chunk_size)
+        self.multiplexed_library = PrefetchedEntityMapper(ss_connection.multiplexed_library, chunk_size)
+
+    @property
+    def queries(self):
+        return sum(mapper.queries for mapper in
+                   [self.sample, self.study, self.library, self.well, self.multiplexed_library])
+
+
+class SampleStudyAssociationIndex:
+    """
+    This class keeps in memory the sample <-> study associations fetched from Sequencescape during a run.
+    The checks only need all the samples associated with the studies of a file (and all the studies associated
+    with its samples), which is what a get_associated_with_* query returns for a list of entities.
+    So the entities of a file are queried together, in chunks of at most chunk_size entities, and the answer
+    is kept by set of entities, so that all the files of a run referring to the same studies (or samples)
+    get it by a lookup. The answers for single entities are also used for any set made only of such entities.
+    If a connection_provider is given, a query failing because of the connection is retried once on a new one.
+    """
+    def __init__(self, ss_connection, chunk_size: int=SeqscapeRawMetadataProvider.QUERY_CHUNK_SIZE,
+                 connection_provider=None):
+        self._ss_connection = ss_connection
+        self.chunk_size = chunk_size
+        self._connection_provider = connection_provider
+        self._samples_by_studies = {}
+        self._studies_by_samples = {}
+        self.queries = 0
+
+    def _query(self, mapper_name: str, query_name: str, entities: typing.List):
+        self.queries += 1
+        try:
+            return getattr(getattr(self._ss_connection, mapper_name), query_name)(entities)
+        except (OperationalError, InterfaceError):
+            if not self._connection_provider:
+                raise
+            self._ss_connection = self._connection_provider.reconnect()
+            return getattr(getattr(self._ss_connection, mapper_name), query_name)(entities)
+
+    def _get_associated_entities(self, mapper_name: str, query_name: str, entities: typing.Iterable,
+                                 associated_by_entities) -> typing.Set:
+        entities = frozenset(entities)
+        if not entities:
+            return set()
+        if entities not in associated_by_entities:
+            if all(frozenset([entity]) in associated_by_entities for entity in entities):
+                associated = set()
+                for entity in entities:
+                    associated.update(associated_by_entities[frozenset([entity])])
+                return associated
+            entities_list = list(entities)
+            associated = set()
+            for i in range(0, len(entities_list), self.chunk_size):
+                associated_entities = self._query(mapper_name, query_name, entities_list[i:i + self.chunk_size])
+                if not associated_entities:
+                    continue
+                if type(associated_entities) is not list:
+                    associated_entities = [associated_entities]
+                associated.update(associated_entities)
+            associated_by_entities[entities] = frozenset(associated)
+        return set(associated_by_entities[entities])
+
+    def get_samples_for_studies(self, studies: typing.Iterable) -> typing.Set:
+        return self._get_associated_entities('sample', 'get_associated_with_study', studies, self._samples_by_studies)
+
+    def get_studies_for_samples(self, samples: typing.Iterable) -> typing.Set:
+        return self._get_associated_entities('study', 'get_associated_with_sample', samples, self._studies_by_samples)
+
+
+class SeqscapeConnectionProvider:
+    """
+    This class owns a connection to SequencescapeDB for the lifetime of a run, so that the connection
+    (and its underlying pool) is reused for all the files checked instead of being rebuilt for each file.
+    A connection that has been idle for longer than health_check_interval seconds is checked before being
+    handed out again and it is reopened if the check fails.
+    The connection (and the ORM session behind it) isn't thread-safe, so each thread using the provider
+    gets a connection of its own, e.g. each of the Sequencescape workers of a pipeline.
+    """
+    HEALTH_CHECK_STUDY_ID = '0'
+
+    def __init__(self, host, port, db_name, user, health_check_interval: float=60):
+        self.host = host
+        self.port = port
+        self.db_name = db_name
+        self.user = user
+        self.health_check_interval = health_check_interval
+        self._thread_state = threading.local()
+        self._stats_lock = threading.Lock()
+        self.connections_opened = 0
+        self.reconnections = 0
+        self.health_checks = 0
+        self.failed_health_checks = 0
+
+    @property
+    def _connection(self):
+        return getattr(self._thread_state, 'connection', None)
+
+    @property
+    def _last_used(self):
+        return getattr(self._thread_state, 'last_used', None)
+
+    def _increment(self, counter: str):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    @classmethod
+    def from_config(cls):
+        return cls(config.SEQSC_HOST, config.SEQSC_PORT, config.SEQSC_DB_NAME, config.SEQSC_USER)
+
+    def _open_connection(self):
+        self._thread_state.connection = SeqscapeRawMetadataProvider._get_connection(self.host, self.port,
+                                                                                     self.db_name, self.user)
+        self._increment('connections_opened')
+        return self._connection
+
+    def _is_connection_alive(self) -> bool:
+        self._increment('health_checks')
+        try:
+            self._connection.study.get_by_id([self.HEALTH_CHECK_STUDY_ID])
+        except Exception:
+            self._increment('failed_health_checks')
+            return False
+        return True
+
+    def _needs_health_check(self) -> bool:
+        return self._last_used is not None and time.monotonic() - self._last_used > self.health_check_interval
+
+    def get_connection(self):
+        if self._connection is None:
+            self._open_connection()
+        elif self._needs_health_check() and not self._is_connection_alive():
+            self.reconnect()
+        self._thread_state.last_used = time.monotonic()
+        return self._connection
+
+    def reconnect(self):
+        self._increment('reconnections')
+        self._thread_state.last_used = time.monotonic()
+        return self._open_connection()
+
+    def get_stats(self):
+        with self._stats_lock:
+            return {'connections_opened': self.connections_opened,
+                    'reconnections': self.reconnections,
+                    'health_checks': self.health_checks,
+                    'failed_health_checks': self.failed_health_checks
+                    }
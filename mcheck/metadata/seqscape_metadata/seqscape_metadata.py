@@ -25,6 +25,7 @@ from typing import List, Dict, Union
 
 from sequencescape import NamedModel, Sample, Study, Library
 from mcheck.results.checks_results import CheckResult
+from mcheck.results.error_details import ErrorDetails, ListedItems
 from mcheck.results.constants import SEVERITY, RESULT
 from mcheck.check_names import CHECK_NAMES
 from mcheck.metadata.common.comparable_metadata import ComparableMetadata
@@ -110,6 +111,7 @@ class SeqscapeRawMetadata(object):
         self._entities_dict_by_type = defaultdict(list)
         self._entities_fetched_by_association = defaultdict(
             list)  # key: tuple(entity_queried_type, entity_fetched_type)
+        self._association_index = None
 
     def add_fetched_entities(self, query_results: SeqscapeEntityQueryAndResults):
         """
@@ -138,6 +140,15 @@ class SeqscapeRawMetadata(object):
             entity_type = (query_results.query_entity_type, query_results.fetched_entity_type)
             self._entities_fetched_by_association[entity_type].append(query_results)
 
+    def set_association_index(self, association_index) -> None:
+        """
+        Sets the sample-study association index shared by all the files of a run. Once it is set,
+        the studies of the samples and the samples of the studies are looked up in it, instead of being
+        taken from the entities fetched by association.
+        :param association_index: SampleStudyAssociationIndex
+        """
+        self._association_index = association_index
+
     def get_fetched_entities_by_type(self, entity_type: str):
         return list(set(self._entities_dict_by_type[entity_type]))
 
@@ -188,6 +199,25 @@ class SeqscapeRawMetadata(object):
         return res
 
 
+    def get_studies_associated_with_samples(self) -> set:
+        if self._association_index:
+            return self._association_index.get_studies_for_samples(self.get_entities_by_type('sample'))
+        return set(self.get_all_entities_by_association_by_type('sample', 'study'))
+
+    def get_samples_associated_with_studies(self) -> set:
+        if self._association_index:
+            return self._association_index.get_samples_for_studies(self.get_entities_by_type('study'))
+        return set(self.get_all_entities_by_association_by_type('study', 'sample'))
+
+    @staticmethod
+    def _get_entity_ids(entity) -> tuple:
+        """
+        :return: the name of the entity and its accession number (or internal id, if it has none), listed
+                 in the error messages instead of the whole entity
+        """
+        accession_number = getattr(entity, 'accession_number', None)
+        return entity.name, accession_number if accession_number is not None else getattr(entity, 'internal_id', None)
+
     @classmethod
     def _check_by_comparison_entities_fetched_by_different_id_types(cls, query_results: List[
         SeqscapeEntityQueryAndResults]) -> List:
@@ -201,13 +231,15 @@ class SeqscapeRawMetadata(object):
                 id_type_2 = entities_2.query_id_type
                 diff_1 = set(entities_1.entities_fetched).difference(set(entities_2.entities_fetched))
                 diff_2 = set(entities_2.entities_fetched).difference(set(entities_1.entities_fetched))
-                error_message = ""
+                error_message = ErrorDetails()
                 if diff_1:
-                    error_message = "Extra %s found when querying by %s compared to %s: %s." % (
-                        entities_1.query_entity_type, id_type_1, id_type_2, diff_1)
+                    error_message.append("Extra %s found when querying by %s compared to %s: %s.",
+                                         entities_1.query_entity_type, id_type_1, id_type_2,
+                                         ListedItems(cls._get_entity_ids(entity) for entity in diff_1))
                 if diff_2:
-                    error_message += "Extra %s found when querying by %s compared to %s: %s." % (
-                        entities_2.query_entity_type, id_type_2, id_type_1, diff_2)
+                    error_message.append("Extra %s found when querying by %s compared to %s: %s.",
+                                         entities_2.query_entity_type, id_type_2, id_type_1,
+                                         ListedItems(cls._get_entity_ids(entity) for entity in diff_2))
                 if not diff_2 and not diff_1:
                     raise ValueError("Somehow the entity sets are different, but I can't detect any difference.")
 
@@ -235,22 +267,22 @@ class SeqscapeRawMetadata(object):
             # check_results.append(check_for_samples_in_more_studies)
             check_results.append(same_study_for_samples_check)
             return check_results
-        studies_by_samples_set = set(self.get_all_entities_by_association_by_type('sample', 'study'))
+        studies_by_samples_set = self.get_studies_associated_with_samples()
         studies_set = set(self.get_entities_by_type('study'))
 
-        studies_set_names = [study.name for study in studies_set]
-        studies_by_samples_set_names = [study.name for study in studies_by_samples_set]
-
-        sample_set_ids = [(sample.name, sample.accession_number) for sample in self.get_entities_by_type('sample')]
+        # The names are only gathered when the check fails, and listed when the error message is written out:
+        samples_nr = len(self.get_entities_by_type('sample'))
         if not studies_set.issubset(studies_by_samples_set):
-            error_msg = "For the %s given seqscape samples, the studies in iRODS: %s and the studies in Seqscape DISAGREE: %s" % (str(len(sample_set_ids)), studies_set_names, studies_by_samples_set_names)
+            error_msg = ErrorDetails("For the %s given seqscape samples, the studies in iRODS: %s and the studies in Seqscape DISAGREE: %s",
+                                     str(samples_nr), ListedItems(study.name for study in studies_set),
+                                     ListedItems(study.name for study in studies_by_samples_set))
             same_study_for_samples_check.result = RESULT.FAILURE
             same_study_for_samples_check.error_message=error_msg
         else:
             diff_wrong_studies_for_samples_in_irods = studies_set.difference(studies_by_samples_set)
             if diff_wrong_studies_for_samples_in_irods:
-                error_msg = "Studies in Seqscape and in iRODS for %s samples don't agree. Studies in iRODS and not in Seqscape: %s" % (
-                    str(len(sample_set_ids)), diff_wrong_studies_for_samples_in_irods)
+                error_msg = ErrorDetails("Studies in Seqscape and in iRODS for %s samples don't agree. Studies in iRODS and not in Seqscape: %s",
+                                         str(samples_nr), ListedItems(study.name for study in diff_wrong_studies_for_samples_in_irods))
                 same_study_for_samples_check.result = RESULT.FAILURE
                 same_study_for_samples_check.error_message = error_msg
         check_results.append(same_study_for_samples_check)
@@ -274,15 +306,15 @@ class SeqscapeRawMetadata(object):
             check_result.executed = False
             check_result.result = None
             return check_result
-        samples_by_studies_set = set(self.get_all_entities_by_association_by_type('study', 'sample'))
+        samples_by_studies_set = self.get_samples_associated_with_studies()
         samples_set = set(self.get_entities_by_type('sample'))
         if not samples_set.issubset(samples_by_studies_set):
             diff_samples_wrong_study = samples_set.difference(samples_by_studies_set)
-            error_msg = "Some samples don't appear under study(s): %s in Sequencescape, " \
-                        "but they appear under this study in iRODS. Number of samples: %s, " \
-                        "and ids: %s" % ([study.name for study in self.get_entities_by_type('study')],
-                                         str(len(diff_samples_wrong_study)),
-                                         [(s.name, s.accession_number) for s in diff_samples_wrong_study])
+            error_msg = ErrorDetails("Some samples don't appear under study(s): %s in Sequencescape, "
+                                     "but they appear under this study in iRODS. Number of samples: %s, "
+                                     "and ids: %s", ListedItems(study.name for study in self.get_entities_by_type('study')),
+                                     str(len(diff_samples_wrong_study)),
+                                     ListedItems((s.name, s.accession_number) for s in diff_samples_wrong_study))
             check_result.error_message = error_msg
             check_result.result = RESULT.FAILURE
         return check_result
@@ -19,11 +19,57 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 This file has been created on Nov 27, 2015.
 """
 
+import threading
+
 from hgijson import JsonPropertyMapping
+from mcheck.check_names import CHECK_NAMES
 from mcheck.results.constants import SEVERITY, RESULT
+from mcheck.results.error_details import render_error_message
+
+
+class CodeTable:
+    """
+    This class encodes each of a set of values (e.g. the check names) as a small integer, the first time it is seen,
+    and decodes the integers back. The values known in advance are encoded in a fixed order, so they have
+    the same code in all the processes of a run.
+    """
+
+    def __init__(self, values=()):
+        self._values = []
+        self._codes = {}
+        self._lock = threading.Lock()
+        for value in values:
+            self.encode(value)
+
+    def encode(self, value) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            with self._lock:
+                code = self._codes.get(value)
+                if code is None:
+                    code = len(self._values)
+                    self._values.append(value)
+                    self._codes[value] = code
+        return code
+
+    def decode(self, code: int):
+        return self._values[code]
+
+    def __len__(self):
+        return len(self._values)
+
+
+CHECK_NAME_CODES = CodeTable(sorted(CHECK_NAMES.get_check_names()))
+SEVERITY_CODES = CodeTable([None, SEVERITY.INFO, SEVERITY.WARNING, SEVERITY.IMPORTANT, SEVERITY.CRITICAL])
+RESULT_CODES = CodeTable([None, RESULT.SUCCESS, RESULT.FAILURE])
 
 
 class CheckResult:
+    """
+    Each file gets tens of check results, so they are kept compact: the check name, severity and result
+    are held as integer codes (see CodeTable) and turned back into strings only when read.
+    """
+    __slots__ = ('check_code', 'severity_code', 'result_code', 'executed', 'error_message')
 
     def __init__(self, check_name, executed=True, result=RESULT.SUCCESS, severity=SEVERITY.IMPORTANT, error_message=None):
         self.check_name = check_name
@@ -32,6 +78,44 @@ class CheckResult:
         self.executed = executed
         self.result = result        # Can be: FAILURE, SUCCESSFUL, NONE - if the test wasn't executed
 
+    @classmethod
+    def from_codes(cls, check_code: int, executed, result_code: int, severity_code: int, error_message=None):
+        check_result = cls.__new__(cls)
+        check_result.check_code = check_code
+        check_result.executed = executed
+        check_result.result_code = result_code
+        check_result.severity_code = severity_code
+        check_result.error_message = error_message
+        return check_result
+
+    @property
+    def check_name(self):
+        return CHECK_NAME_CODES.decode(self.check_code)
+
+    @check_name.setter
+    def check_name(self, check_name):
+        self.check_code = CHECK_NAME_CODES.encode(check_name)
+
+    @property
+    def severity(self):
+        return SEVERITY_CODES.decode(self.severity_code)
+
+    @severity.setter
+    def severity(self, severity):
+        self.severity_code = SEVERITY_CODES.encode(severity)
+
+    @property
+    def result(self):
+        return RESULT_CODES.decode(self.result_code)
+
+    @result.setter
+    def result(self, result):
+        self.result_code = RESULT_CODES.encode(result)
+
+    def __reduce__(self):
+        # The codes of the values not known in advance can differ between processes, so the values are sent:
+        return CheckResult, (self.check_name, self.executed, self.result, self.severity, self.error_message)
+
     def __str__(self):
         msg = "Check name: " + str(self.check_name) + ", severity = " + str(self.severity) + ", "
         msg = msg + " executed: " + str(self.executed) + ", result = "
@@ -48,15 +132,19 @@ class CheckResult:
     def __eq__(self, other):
         if not type(other) == type(self):
             return False
-        return self.check_name == other.check_name and self.error_message == other.error_message and \
-               self.severity == other.severity and self.executed == other.executed and self.result == other.result
+        return self.check_code == other.check_code and self.error_message == other.error_message and \
+               self.severity_code == other.severity_code and self.executed == other.executed and \
+               self.result_code == other.result_code
 
     @classmethod
     def to_json_mapping(cls):
         return [
         JsonPropertyMapping("check_name", "check_name", "check_name"),
         JsonPropertyMapping("severity", "severity", optional=True),
-        JsonPropertyMapping("error_message", "error_message", optional=True),
+        JsonPropertyMapping("error_message", object_property_getter=lambda check_result:
+                            render_error_message(check_result.error_message),
+                            object_property_setter=lambda check_result, error_message:
+                            setattr(check_result, 'error_message', error_message), optional=True),
         JsonPropertyMapping("executed", "executed", optional=True),
         JsonPropertyMapping("result", "result", optional=True)
     ]
@@ -0,0 +1,133 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+
+Error details module
+====================
+
+Some checks find problems with many entities at once (e.g. thousands of samples not found under a study).
+Instead of formatting all of them into the error message of each file, these checks keep the error as ErrorDetails:
+a message template and its arguments, with the collections of ids kept as ListedItems. The message is only rendered
+when it is written out, listing at most MAX_LISTED_ITEMS ids of each collection, or all of them on demand.
+"""
+
+import heapq
+
+# The maximum number of ids of a collection listed in an error message (None = all of them):
+MAX_LISTED_ITEMS = 20
+
+
+def set_max_listed_items(max_items):
+    global MAX_LISTED_ITEMS
+    MAX_LISTED_ITEMS = max_items
+
+
+class ListedItems:
+    """
+    This class holds a collection of ids (or tuples of ids) to be listed in an error message.
+    """
+    __slots__ = ('items',)
+
+    def __init__(self, items):
+        self.items = tuple(items)
+
+    def render(self, max_items=None) -> str:
+        """
+        :param max_items: the maximum number of items to list (None = all of them)
+        :return: the items, in order, as a list - followed by the number of items left out, if any
+        """
+        if max_items is None or len(self.items) <= max_items:
+            return '[' + ', '.join(str(item) for item in sorted(self.items, key=str)) + ']'
+        listed = heapq.nsmallest(max_items, self.items, key=str)
+        return '[' + ', '.join(str(item) for item in listed) + \
+               ', ... (%s more, %s in total)]' % (len(self.items) - max_items, len(self.items))
+
+    def __len__(self):
+        return len(self.items)
+
+    def __eq__(self, other):
+        return type(other) is ListedItems and sorted(self.items, key=str) == sorted(other.items, key=str)
+
+    def __hash__(self):
+        return hash(frozenset(self.items))
+
+
+class ErrorDetails:
+    """
+    This class holds an error message as one or more parts, each of them a %-template and its arguments,
+    some of which can be ListedItems. It is rendered by str() with the configured limit of items listed,
+    or by render(max_items=None) with all of them.
+    """
+    __slots__ = ('parts',)
+
+    def __init__(self, template: str=None, *args):
+        self.parts = []
+        if template is not None:
+            self.append(template, *args)
+
+    def append(self, template: str, *args) -> 'ErrorDetails':
+        self.parts.append((template, args))
+        return self
+
+    def copy(self) -> 'ErrorDetails':
+        """
+        :return: ErrorDetails with the same parts, which can be appended to without changing this one
+        """
+        error_details = ErrorDetails()
+        error_details.parts = list(self.parts)
+        return error_details
+
+    def render(self, max_items=None) -> str:
+        return ''.join(template % tuple(arg.render(max_items) if isinstance(arg, ListedItems) else arg
+                                        for arg in args)
+                       for template, args in self.parts)
+
+    def __bool__(self):
+        return bool(self.parts)
+
+    def __str__(self):
+        return self.render(MAX_LISTED_ITEMS)
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __eq__(self, other):
+        return type(other) is ErrorDetails and self.parts == other.parts
+
+    def __hash__(self):
+        # Hashed without rendering, so that identical error details can be grouped cheaply:
+        return hash(tuple(self.parts))
+
+
+def render_error_message(error_message):
+    """
+    :return: the error message given as parameter, rendered as a string if it is ErrorDetails
+    """
+    if isinstance(error_message, ErrorDetails):
+        return str(error_message)
+    return error_message
+
+
+def copy_error_message(error_message):
+    """
+    :return: a copy of the error message given as parameter if it is ErrorDetails, the error message itself otherwise
+    """
+    if isinstance(error_message, ErrorDetails):
+        return error_message.copy()
+    return error_message
@@ -0,0 +1,185 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+
+Results database module
+=======================
+
+This module keeps the check results of each run in an SQLite database on disk, one row for each check of each file,
+so that they can be grouped and counted by SQL queries over millions of rows, instead of over lists of CheckResults.
+The rows are inserted in batches, each in its own transaction, and the database is in WAL mode so that it can be
+queried while a run is writing to it.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Dict, List
+
+from mcheck.results.checks_results import CheckResult
+from mcheck.results.constants import RESULT
+from mcheck.results.error_details import render_error_message
+
+
+class CheckResultsDatabase:
+    """
+    This class writes the check results of a run to an SQLite database and runs the groupings of
+    CheckResultsProcessing on them as SQL. Each run gets its own run_id, unless the run_id of an earlier run
+    is given, in which case the results of that run are queried (and added to).
+    The check names are stored as integer codes, the names themselves being kept in the check_names table.
+    """
+    BATCH_SIZE = 10000
+
+    def __init__(self, db_path: str, run_id: int=None, batch_size: int=BATCH_SIZE):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._rows = []
+        self._connection = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._lock, self._connection:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS runs (run_id INTEGER PRIMARY KEY, "
+                                     "started_at REAL NOT NULL)")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS check_names (check_code INTEGER PRIMARY KEY, "
+                                     "check_name TEXT NOT NULL UNIQUE)")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS check_results (run_id INTEGER NOT NULL, "
+                                     "fpath TEXT NOT NULL, check_code INTEGER NOT NULL, severity TEXT, "
+                                     "result TEXT, executed INTEGER, message TEXT)")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS check_results_by_check "
+                                     "ON check_results (run_id, check_code, result)")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS check_results_by_fpath "
+                                     "ON check_results (run_id, fpath)")
+            if run_id is None:
+                run_id = self._connection.execute("INSERT INTO runs (started_at) VALUES (?)",
+                                                  (time.time(),)).lastrowid
+        self.run_id = run_id
+        self._check_codes = {check_name: check_code for check_code, check_name in
+                             self._connection.execute("SELECT check_code, check_name FROM check_names")}
+
+    def _get_check_code(self, check_name: str) -> int:
+        check_code = self._check_codes.get(check_name)
+        if check_code is None:
+            self._connection.execute("INSERT OR IGNORE INTO check_names (check_name) VALUES (?)", (check_name,))
+            check_code = self._connection.execute("SELECT check_code FROM check_names WHERE check_name = ?",
+                                                  (check_name,)).fetchone()[0]
+            self._check_codes[check_name] = check_code
+        return check_code
+
+    @staticmethod
+    def _to_message(error_message):
+        error_message = render_error_message(error_message)
+        if error_message is None or isinstance(error_message, str):
+            return error_message
+        return json.dumps(error_message, default=str)
+
+    def add(self, fpath: str, check_results: List[CheckResult]):
+        """
+        Adds the check results of a file to the current run. They are written to the database in batches,
+        all of them being written at the latest by flush() or close().
+        """
+        with self._lock:
+            for check_result in check_results:
+                executed = check_result.executed
+                self._rows.append((self.run_id, fpath, check_result.check_name, check_result.severity,
+                                   check_result.result, None if executed is None else int(executed),
+                                   self._to_message(check_result.error_message)))
+            if len(self._rows) >= self.batch_size:
+                self._flush()
+
+    def add_all(self, check_results_by_path: Dict):
+        for fpath, check_results in check_results_by_path.items():
+            self.add(fpath, check_results)
+        self.flush()
+
+    def _flush(self):
+        if not self._rows:
+            return
+        with self._connection:
+            self._connection.executemany("INSERT INTO check_results (run_id, fpath, check_code, severity, result, "
+                                         "executed, message) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                         [(run_id, fpath, self._get_check_code(check_name), severity, result,
+                                           executed, message)
+                                          for run_id, fpath, check_name, severity, result, executed, message
+                                          in self._rows])
+        self._rows = []
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _query(self, sql: str, params=()):
+        self.flush()
+        with self._lock:
+            return self._connection.execute(sql, params).fetchall()
+
+    def count_files_by_failed_check(self) -> Counter:
+        """
+        :return: Counter of key = check name, value = the number of files failing that check in this run
+        """
+        return Counter(dict(self._query("SELECT check_names.check_name, COUNT(DISTINCT check_results.fpath) "
+                                        "FROM check_results JOIN check_names USING (check_code) "
+                                        "WHERE run_id = ? AND result = ? GROUP BY check_code",
+                                        (self.run_id, RESULT.FAILURE))))
+
+    def count_by(self, column: str) -> Counter:
+        """
+        :param column: one of executed, severity or result
+        :return: Counter of key = the value of the column, value = the number of check results having it in this run
+        """
+        if column not in ('executed', 'severity', 'result'):
+            raise ValueError("The check results can't be grouped by %s" % column)
+        counts = Counter(dict(self._query("SELECT %s, COUNT(*) FROM check_results WHERE run_id = ? GROUP BY %s" %
+                                          (column, column), (self.run_id,))))
+        if column == 'executed':
+            counts = Counter({None if executed is None else bool(executed): count
+                              for executed, count in counts.items()})
+        return counts
+
+    def has_failures(self, ignored_check_names=()) -> bool:
+        self.flush()
+        ignored_codes = [self._check_codes[check_name] for check_name in ignored_check_names
+                         if check_name in self._check_codes]
+        sql = "SELECT 1 FROM check_results WHERE run_id = ? AND result = ?"
+        if ignored_codes:
+            sql += " AND check_code NOT IN (%s)" % ', '.join('?' * len(ignored_codes))
+        return bool(self._query(sql + " LIMIT 1", [self.run_id, RESULT.FAILURE] + ignored_codes))
+
+    def get_check_results(self, fpath: str) -> List[CheckResult]:
+        """
+        :return: the check results of this file in this run, with their error messages as stored (i.e. as strings)
+        """
+        return [CheckResult(check_name=check_name, severity=severity, result=result,
+                            executed=None if executed is None else bool(executed), error_message=message)
+                for check_name, severity, result, executed, message in
+                self._query("SELECT check_names.check_name, severity, result, executed, message "
+                            "FROM check_results JOIN check_names USING (check_code) "
+                            "WHERE run_id = ? AND fpath = ? ORDER BY check_results.rowid", (self.run_id, fpath))]
+
+    def close(self):
+        self.flush()
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -21,6 +21,8 @@ This file has been created on May 26, 2016.
 
 from mcheck.results.checks_results import RESULT, SEVERITY
 from mcheck.results.checks_results import CheckResult
+from mcheck.results.results_store import CheckResultsStore
+from mcheck.results.results_db import CheckResultsDatabase
 from collections import defaultdict, Counter
 
 class CheckResultsProcessing:
@@ -64,6 +66,8 @@ class CheckResultsProcessing:
 
     @staticmethod
     def failed_check_results_stats(checks_by_fpath):
+        if isinstance(checks_by_fpath, (CheckResultsStore, CheckResultsDatabase)):
+            return checks_by_fpath.count_files_by_failed_check()
         nr_files_per_failed_check = Counter()
         for fpath, check_results in checks_by_fpath.items():
             failed_checks_names = set()
@@ -0,0 +1,151 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+
+Results store module
+====================
+
+This module keeps the check results of all the files of a run in a compact form, so that the results of
+millions of files fit in memory: the check names, results and severities of all the files are held as integer codes
+in a few flat arrays (a struct of arrays), and only the error messages that are set are kept as objects.
+The store behaves as a read-only dict of key = file path, value = list[CheckResult], the CheckResult objects
+being built again when the results of a file are read.
+"""
+
+from array import array
+from collections import Counter
+from collections.abc import Mapping
+from typing import Dict, Iterable, List
+
+from mcheck.results.checks_results import CHECK_NAME_CODES, RESULT_CODES, SEVERITY_CODES, CheckResult
+from mcheck.results.constants import RESULT
+
+
+class CheckResultsStore(Mapping):
+
+    def __init__(self):
+        self._index_by_fpath = {}
+        self._starts = array('L')
+        self._ends = array('L')
+        self._check_codes = array('I')
+        self._executed = array('b')
+        self._result_codes = array('B')
+        self._severity_codes = array('B')
+        self._error_messages = {}   # key = index of the check result, for the ones having an error message
+        self._more_results_by_fpath = {}    # the results added again for a file (e.g. by another shard)
+
+    @classmethod
+    def from_dict(cls, check_results_by_path: Dict) -> 'CheckResultsStore':
+        if isinstance(check_results_by_path, CheckResultsStore):
+            return check_results_by_path
+        store = cls()
+        store.update(check_results_by_path)
+        return store
+
+    def add(self, fpath: str, check_results: Iterable[CheckResult]):
+        if fpath in self._index_by_fpath:
+            self._more_results_by_fpath.setdefault(fpath, []).extend(check_results)
+            return
+        start = len(self._check_codes)
+        for check_result in check_results:
+            if check_result.error_message is not None:
+                self._error_messages[len(self._check_codes)] = check_result.error_message
+            self._check_codes.append(check_result.check_code)
+            self._executed.append(-1 if check_result.executed is None else int(bool(check_result.executed)))
+            self._result_codes.append(check_result.result_code)
+            self._severity_codes.append(check_result.severity_code)
+        self._index_by_fpath[fpath] = len(self._starts)
+        self._starts.append(start)
+        self._ends.append(len(self._check_codes))
+
+    def update(self, check_results_by_path: Dict):
+        for fpath, check_results in check_results_by_path.items():
+            self.add(fpath, check_results)
+
+    def __getitem__(self, fpath: str) -> List[CheckResult]:
+        index = self._index_by_fpath[fpath]
+        error_messages = self._error_messages
+        check_results = [CheckResult.from_codes(self._check_codes[i],
+                                                None if self._executed[i] == -1 else bool(self._executed[i]),
+                                                self._result_codes[i], self._severity_codes[i],
+                                                error_messages.get(i))
+                         for i in range(self._starts[index], self._ends[index])]
+        check_results.extend(self._more_results_by_fpath.get(fpath, ()))
+        return check_results
+
+    def __iter__(self):
+        return iter(self._index_by_fpath)
+
+    def __len__(self):
+        return len(self._index_by_fpath)
+
+    def __contains__(self, fpath):
+        return fpath in self._index_by_fpath
+
+    def __getstate__(self):
+        # The codes of the values not known in advance can differ between processes (e.g. between shards),
+        # so the values the codes stand for are sent with the store:
+        state = self.__dict__.copy()
+        state['_code_tables'] = {name: [table.decode(code) for code in range(len(table))]
+                                 for name, table in self._get_code_tables().items()}
+        return state
+
+    def __setstate__(self, state):
+        code_tables = state.pop('_code_tables')
+        self.__dict__.update(state)
+        for name, table in self._get_code_tables().items():
+            local_codes = [table.encode(value) for value in code_tables[name]]
+            if local_codes != list(range(len(local_codes))):
+                codes = getattr(self, name)
+                setattr(self, name, array(codes.typecode, (local_codes[code] for code in codes)))
+
+    @staticmethod
+    def _get_code_tables():
+        return {'_check_codes': CHECK_NAME_CODES, '_result_codes': RESULT_CODES, '_severity_codes': SEVERITY_CODES}
+
+    def count_files_by_failed_check(self, excluded_check_names: Iterable[str]=()) -> Counter:
+        """
+        :param excluded_check_names: the names of the checks not to count
+        :return: Counter of key = check name, value = the number of files that failed the check
+        """
+        failure_code = RESULT_CODES.encode(RESULT.FAILURE)
+        excluded_codes = {CHECK_NAME_CODES.encode(check_name) for check_name in excluded_check_names}
+        result_codes, check_codes = self._result_codes, self._check_codes
+        files_by_check_code = Counter()
+        for fpath, index in self._index_by_fpath.items():
+            failed_codes = {check_codes[i] for i in range(self._starts[index], self._ends[index])
+                            if result_codes[i] == failure_code}
+            failed_codes.update(CHECK_NAME_CODES.encode(check_result.check_name)
+                                for check_result in self._more_results_by_fpath.get(fpath, ())
+                                if check_result.result == RESULT.FAILURE)
+            files_by_check_code.update(failed_codes - excluded_codes)
+        return Counter({CHECK_NAME_CODES.decode(code): files for code, files in files_by_check_code.items()})
+
+    def has_failures(self, excluded_check_names: Iterable[str]=()) -> bool:
+        """
+        :param excluded_check_names: the names of the checks whose failures don't count
+        :return: True if any check of any file, other than the excluded ones, has failed
+        """
+        failure_code = RESULT_CODES.encode(RESULT.FAILURE)
+        excluded_codes = {CHECK_NAME_CODES.encode(check_name) for check_name in excluded_check_names}
+        for check_code, result_code in zip(self._check_codes, self._result_codes):
+            if result_code == failure_code and check_code not in excluded_codes:
+                return True
+        return any(check_result.result == RESULT.FAILURE and check_result.check_name not in excluded_check_names
+                   for check_results in self._more_results_by_fpath.values() for check_result in check_results)
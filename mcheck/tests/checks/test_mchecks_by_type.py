@@ -0,0 +1,140 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+"""
+import unittest
+from unittest import mock
+
+from collections import defaultdict
+from mcheck.metadata.irods_metadata.file_metadata import IrodsSeqFileMetadata
+from mcheck.metadata.seqscape_metadata.seqscape_metadata import SeqscapeRawMetadata
+from mcheck.metadata.seqscape_metadata.seqscape_meta_provider import SeqscapeRawMetadataProvider
+from mcheck.checks.mchecks_by_type import MetadataSelfChecks
+from mcheck.metadata.irods_metadata.irods_meta_provider import iRODSMetadataProvider
+from mcheck.main.run_statistics import RunStatistics
+from mcheck.metadata.file_header_metadata.header_metadata import SAMFileHeaderMetadata
+from mcheck.metadata.file_header_metadata.header_meta_provider import SAMFileHeaderMetadataProvider
+from mcheck.check_names import CHECK_NAMES
+
+
+class FetchAndPreprocessSeqscapeMetadataTest(unittest.TestCase):
+
+    def setUp(self):
+        self.irods_metadata_dict = {}
+        for fpath, sample in [('/seq/1_1#1.cram', 'S1'), ('/seq/1_2#1.cram', 'S1'), ('/seq/1_3#2.cram', 'S2')]:
+            self.irods_metadata_dict[fpath] = IrodsSeqFileMetadata(fpath,
+                                                                   samples={'name': {sample}, 'accession_number': set(),
+                                                                            'internal_id': set()},
+                                                                   libraries={}, studies={})
+        self.connection_provider = mock.Mock()
+
+    def test_fingerprint_seqscape_ids_same_ids(self):
+        fingerprint1 = MetadataSelfChecks.fingerprint_seqscape_ids(self.irods_metadata_dict['/seq/1_1#1.cram'])
+        fingerprint2 = MetadataSelfChecks.fingerprint_seqscape_ids(self.irods_metadata_dict['/seq/1_2#1.cram'])
+        self.assertEqual(fingerprint1, fingerprint2)
+
+    def test_fingerprint_seqscape_ids_different_ids(self):
+        fingerprint1 = MetadataSelfChecks.fingerprint_seqscape_ids(self.irods_metadata_dict['/seq/1_1#1.cram'])
+        fingerprint2 = MetadataSelfChecks.fingerprint_seqscape_ids(self.irods_metadata_dict['/seq/1_3#2.cram'])
+        self.assertNotEqual(fingerprint1, fingerprint2)
+
+    @mock.patch.object(SeqscapeRawMetadataProvider, 'fetch_raw_metadata')
+    def test_fetch_and_checks_run_once_per_fingerprint(self, fetch_raw_metadata_mock):
+        fetch_raw_metadata_mock.side_effect = lambda *args: SeqscapeRawMetadata()
+        issues_dict = defaultdict(list)
+        run_stats = RunStatistics()
+        seqscape_metadata_dict = MetadataSelfChecks.fetch_and_preprocess_seqscape_metadata(
+            self.irods_metadata_dict, issues_dict, self.connection_provider, run_stats=run_stats)
+        self.assertEqual(fetch_raw_metadata_mock.call_count, 2)
+        self.assertEqual(set(seqscape_metadata_dict.keys()), set(self.irods_metadata_dict.keys()))
+        self.assertIsNot(seqscape_metadata_dict['/seq/1_1#1.cram'], seqscape_metadata_dict['/seq/1_2#1.cram'])
+        self.assertEqual(issues_dict['/seq/1_1#1.cram'], issues_dict['/seq/1_2#1.cram'])
+        for result_1, result_2 in zip(issues_dict['/seq/1_1#1.cram'], issues_dict['/seq/1_2#1.cram']):
+            self.assertIsNot(result_1, result_2)
+        self.assertEqual(run_stats.to_dict()['seqscape_dedup'], {'files': 3, 'distinct_id_sets': 2, 'dedup_ratio': 1.5})
+
+
+class IterIrodsMetadataByPathTest(unittest.TestCase):
+
+    @mock.patch.object(IrodsSeqFileMetadata, 'from_raw_metadata')
+    @mock.patch.object(iRODSMetadataProvider, 'fetch_raw_files_metadata_by_paths')
+    def test_fetch_error_recorded_as_not_executed(self, fetch_mock, from_raw_metadata_mock):
+        fetch_mock.return_value = iter([('/seq/1.cram', None, OSError("baton-list failed")),
+                                        ('/seq/2.cram', mock.Mock(), None)])
+        from_raw_metadata_mock.return_value.check_metadata.return_value = []
+        items = list(MetadataSelfChecks.iter_irods_metadata_by_path(['/seq/1.cram', '/seq/2.cram'], None))
+        self.assertEqual([fpath for fpath, _, _ in items], ['/seq/1.cram', '/seq/2.cram'])
+        fpath, irods_metadata, check_results = items[0]
+        self.assertIsNone(irods_metadata)
+        self.assertEqual(len(check_results), 1)
+        self.assertFalse(check_results[0].executed)
+        self.assertIsNone(check_results[0].result)
+        self.assertIn("baton-list failed", check_results[0].error_message[0])
+        self.assertIs(items[1][1], from_raw_metadata_mock.return_value)
+
+
+class FetchAndPreprocessHeaderMetadataTest(unittest.TestCase):
+
+    @staticmethod
+    def _fetch_metadata(fpath, irods):
+        if fpath.endswith('broken.cram'):
+            raise OSError("samtools failed")
+        return SAMFileHeaderMetadata(fpath, samples={'name': {'S1'}}, libraries={'internal_id': {'123'}})
+
+    @mock.patch.object(SAMFileHeaderMetadataProvider, 'fetch_metadata')
+    def test_header_failure_recorded_as_not_executed(self, fetch_metadata_mock):
+        fetch_metadata_mock.side_effect = self._fetch_metadata
+        issues_dict = defaultdict(list)
+        run_stats = RunStatistics()
+        header_metadata_dict = MetadataSelfChecks.fetch_and_preprocess_header_metadata(['/seq/1.cram', '/seq/broken.cram'],
+                                                                                       issues_dict, workers=2,
+                                                                                       run_stats=run_stats)
+        self.assertEqual(header_metadata_dict['/seq/1.cram'].samples, {'name': {'S1'}})
+        self.assertFalse(header_metadata_dict['/seq/broken.cram'].has_metadata())
+        self.assertEqual(len(issues_dict['/seq/broken.cram']), 1)
+        check_result = issues_dict['/seq/broken.cram'][0]
+        self.assertEqual(check_result.check_name, CHECK_NAMES.check_valid_ids)
+        self.assertFalse(check_result.executed)
+        self.assertIsNone(check_result.result)
+        self.assertIn("samtools failed", check_result.error_message[0])
+        self.assertEqual(run_stats.get_counters('header'), {'fetched': 1, 'failed': 1})
+
+    @mock.patch.object(SAMFileHeaderMetadataProvider, 'fetch_metadata')
+    def test_cached_headers_not_fetched(self, fetch_metadata_mock):
+        fetch_metadata_mock.side_effect = self._fetch_metadata
+        cache = mock.Mock()
+        cache.get.side_effect = lambda fpath, md5: self._fetch_metadata(fpath, True) if fpath == '/seq/1.cram' else None
+        checksums_by_path = {'/seq/1.cram': 'abc', '/seq/2.cram': 'def', '/seq/3.cram': None}
+        header_metadata_dict = MetadataSelfChecks.fetch_and_preprocess_header_metadata(sorted(checksums_by_path),
+                                                                                       defaultdict(list), cache=cache,
+                                                                                       checksums_by_path=checksums_by_path)
+        self.assertEqual(set(header_metadata_dict.keys()), set(checksums_by_path))
+        self.assertEqual([call[0][0] for call in fetch_metadata_mock.call_args_list], ['/seq/2.cram', '/seq/3.cram'])
+        # Only the file fetched that has a checksum is added to the cache:
+        cache.put.assert_called_once_with(header_metadata_dict['/seq/2.cram'], 'def')
+
+    def test_get_content_checksum(self):
+        irods_metadata = IrodsSeqFileMetadata('/seq/1.cram', checksum_at_upload={'abc'})
+        self.assertEqual(MetadataSelfChecks.get_content_checksum(irods_metadata), 'abc')
+        irods_metadata.checksum_at_upload = {'abc', 'def'}
+        self.assertIsNone(MetadataSelfChecks.get_content_checksum(irods_metadata))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+"""
+
+import unittest
+
+from mcheck.com.profiling import percentile, profiled, StageProfiler, PROFILER
+
+
+class TestPercentile(unittest.TestCase):
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertEqual(percentile([], 50), 0)
+
+
+class TestStageProfiler(unittest.TestCase):
+
+    def test_nothing_recorded_when_disabled(self):
+        profiler = StageProfiler()
+        with profiler.profile('irods_fetch'):
+            pass
+        self.assertEqual(profiler.get_report(), {})
+
+    def test_files_not_kept_when_disabled(self):
+        profiler = StageProfiler()
+        with profiler.profile('irods_fetch', files=0) as stage:
+            stage.files = 10
+        with profiler.profile('irods_fetch', files=0) as stage:
+            self.assertEqual(stage.files, 0)
+
+    def test_report(self):
+        profiler = StageProfiler()
+        profiler.record('header_fetch', 0.1, started_at=100)
+        profiler.record('header_fetch', 0.3, started_at=100.1)
+        profiler.record('seqscape_fetch', 1, files=10, started_at=100)
+        report = profiler.get_report()
+        self.assertEqual(report['header_fetch']['calls'], 2)
+        self.assertEqual(report['header_fetch']['wall_time_s'], 0.4)
+        self.assertEqual(report['header_fetch']['p50_ms'], 100)
+        self.assertEqual(report['header_fetch']['p99_ms'], 300)
+        self.assertEqual(report['header_fetch']['files_per_s'], 5)
+        self.assertEqual(report['seqscape_fetch']['files_per_s'], 10)
+
+    def test_merge(self):
+        profiler = StageProfiler()
+        profiler.record('comparison', 1, files=2, started_at=100)
+        other = StageProfiler()
+        other.record('comparison', 1, files=2, started_at=101)
+        profiler.merge(other.to_raw())
+        report = profiler.get_report()
+        self.assertEqual(report['comparison']['calls'], 2)
+        self.assertEqual(report['comparison']['wall_time_s'], 2)
+
+    def test_profiled_decorator(self):
+        @profiled('comparison', count_files=lambda items: len(items))
+        def compare(items):
+            return len(items)
+
+        PROFILER.enable()
+        try:
+            self.assertEqual(compare(['a', 'b', 'c']), 3)
+            self.assertEqual(PROFILER.get_report()['comparison']['files'], 3)
+        finally:
+            PROFILER.disable()
+            PROFILER.reset()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+"""
+
+import unittest
+
+from mcheck.com import wrappers
+
+
+@wrappers.check_args_not_none
+def join_two(first, second='default'):
+    return first + second
+
+
+class Identifiers:
+    @classmethod
+    @wrappers.check_args_not_none
+    def join(cls, first, second):
+        return first + second
+
+
+class TestCheckArgsNotNone(unittest.TestCase):
+
+    def test_positional_args(self):
+        self.assertEqual(join_two('a', 'b'), 'ab')
+        self.assertEqual(Identifiers.join('a', 'b'), 'ab')
+
+    def test_keyword_and_default_args(self):
+        self.assertEqual(join_two('a'), 'adefault')
+        self.assertEqual(join_two(second='b', first='a'), 'ab')
+
+    def test_none_positional_arg(self):
+        self.assertRaises(ValueError, join_two, 'a', None)
+        self.assertRaises(ValueError, Identifiers.join, None, 'b')
+
+    def test_none_keyword_arg(self):
+        self.assertRaises(ValueError, join_two, 'a', second=None)
+
+    def test_error_message_lists_the_args(self):
+        with self.assertRaises(ValueError) as context:
+            join_two(None, 'b')
+        self.assertEqual(str(context.exception),
+                         "None arguments have been provided for this function: {'first': None, 'second': 'b'}")
+
+    def test_wrong_call(self):
+        self.assertRaises(TypeError, join_two, 'a', 'b', 'c')
+        self.assertRaises(TypeError, join_two)
+
+
+if __name__ == "__main__":
+    unittest.main()
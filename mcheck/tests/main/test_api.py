@@ -0,0 +1,95 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+"""
+
+import unittest
+from unittest import mock
+
+from mcheck.check_names import CHECK_NAMES
+from mcheck.checks.mchecks_by_comparison import FileMetadataComparison
+from mcheck.checks.mchecks_by_type import MetadataSelfChecks
+from mcheck.main import api
+from mcheck.results.checks_results import CheckResult
+from mcheck.results.results_store import CheckResultsStore
+
+
+def _add_header_result(fpaths, issues_dict, *args):
+    for fpath in fpaths:
+        issues_dict[fpath].append(CheckResult(CHECK_NAMES.check_valid_ids))
+    return {}
+
+
+class CheckFetchedIrodsItemsTest(unittest.TestCase):
+
+    @mock.patch.object(FileMetadataComparison, 'check_metadata_across_different_sources')
+    @mock.patch.object(MetadataSelfChecks, 'fetch_and_preprocess_seqscape_metadata', return_value={})
+    @mock.patch.object(MetadataSelfChecks, 'fetch_and_preprocess_header_metadata', side_effect=_add_header_result)
+    @mock.patch.object(MetadataSelfChecks, 'get_content_checksum', return_value=None)
+    @mock.patch.object(api.SeqscapeConnectionProvider, 'from_config')
+    def test_results_packed_chunk_by_chunk(self, provider_mock, checksum_mock, header_mock, seqscape_mock,
+                                           comparison_mock):
+        irods_items = ((fpath, mock.Mock(), [CheckResult(CHECK_NAMES.check_all_id_types_present)])
+                       for fpath in ['/seq/1.cram', '/seq/2.cram', '/seq/3.cram'])
+        with mock.patch.object(CheckResultsStore, 'update', autospec=True,
+                               side_effect=CheckResultsStore.update) as update_mock:
+            results = api._check_fetched_irods_items(irods_items, chunk_size=2)
+        self.assertEqual([len(call[0][1]) for call in update_mock.call_args_list], [2, 1])
+        self.assertEqual(list(results), ['/seq/1.cram', '/seq/2.cram', '/seq/3.cram'])
+        self.assertEqual([check_result.check_name for check_result in results['/seq/3.cram']],
+                         [CHECK_NAMES.check_all_id_types_present, CHECK_NAMES.check_valid_ids])
+        self.assertEqual(header_mock.call_count, 2)
+
+    @mock.patch.object(FileMetadataComparison, 'check_metadata_across_different_sources')
+    @mock.patch.object(MetadataSelfChecks, 'fetch_and_preprocess_seqscape_metadata', return_value={})
+    @mock.patch.object(MetadataSelfChecks, 'get_content_checksum', return_value=None)
+    @mock.patch.object(api.SeqscapeConnectionProvider, 'from_config')
+    def test_results_reported_chunk_by_chunk(self, provider_mock, checksum_mock, seqscape_mock, comparison_mock):
+        written = []
+        written_before_chunk = []
+
+        def add_header_result(fpaths, issues_dict, *args):
+            written_before_chunk.append(list(written))
+            return _add_header_result(fpaths, issues_dict, *args)
+
+        irods_items = ((fpath, mock.Mock(), []) for fpath in ['/seq/1.cram', '/seq/2.cram', '/seq/3.cram'])
+        with mock.patch.object(MetadataSelfChecks, 'fetch_and_preprocess_header_metadata',
+                               side_effect=add_header_result):
+            api._check_fetched_irods_items(irods_items, chunk_size=2,
+                                           on_result=lambda fpath, check_results: written.append(fpath))
+        self.assertEqual(written_before_chunk, [[], ['/seq/1.cram', '/seq/2.cram']])
+        self.assertEqual(written, ['/seq/1.cram', '/seq/2.cram', '/seq/3.cram'])
+
+    @mock.patch.object(FileMetadataComparison, 'check_metadata_across_different_sources')
+    @mock.patch.object(MetadataSelfChecks, 'fetch_and_preprocess_seqscape_metadata', return_value={})
+    @mock.patch.object(MetadataSelfChecks, 'fetch_and_preprocess_header_metadata', side_effect=_add_header_result)
+    @mock.patch.object(MetadataSelfChecks, 'get_content_checksum', return_value=None)
+    @mock.patch.object(api.SeqscapeConnectionProvider, 'from_config')
+    def test_files_without_irods_metadata_only_get_their_results(self, provider_mock, checksum_mock, header_mock,
+                                                                  seqscape_mock, comparison_mock):
+        not_fetched = CheckResult(CHECK_NAMES.check_all_id_types_present, executed=False, result=None)
+        irods_items = [('/seq/1.cram', mock.Mock(), []), ('/seq/2.cram', None, [not_fetched])]
+        results = api._check_fetched_irods_items(irods_items)
+        self.assertEqual(list(header_mock.call_args[0][0]), ['/seq/1.cram'])
+        self.assertEqual(list(seqscape_mock.call_args[0][0]), ['/seq/1.cram'])
+        self.assertEqual([check_result.executed for check_result in results['/seq/2.cram']], [False])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,14 @@
+import io
 import json
 import unittest
+from unittest import mock
 
 from baton._baton.json import DataObjectJSONEncoder, DataObjectJSONDecoder
 from baton.collections import IrodsMetadata
 from baton.models import DataObject, DataObjectReplica
 from mcheck.main.input_parser import convert_data_object, IRODS_METADATA_LIBRARY_ID_PROPERTY, \
     IRODS_METADATA_LEGACY_LIBRARY_ID_PROPERTY, IRODS_METADATA_TARGET_PROPERTY, IRODS_METADATA_REFERENCE_PROPERTY, \
-    parse_data_objects
+    parse_data_objects, iter_json_objects_as_strings, iter_data_objects
 
 
 class ParseDataObjects(unittest.TestCase):
@@ -86,5 +88,58 @@ class TestConvertDataObject(unittest.TestCase):
         self.assertCountEqual(converted.libraries, libraries)
 
 
+class TestIterJsonObjectsAsStrings(unittest.TestCase):
+    OBJECTS = [{"collection": "/seq/1", "data_object": "1.cram", "avus": [{"attribute": "sample", "value": "S1"}]},
+               {"collection": "/seq/1", "data_object": "2.cram", "avus": []},
+               {"collection": "/seq/1", "data_object": "3.cram, ]{", "avus": []}]
+
+    def _parse(self, text, read_size=7):
+        return [json.loads(obj) for obj in iter_json_objects_as_strings(io.StringIO(text), read_size)]
+
+    def test_json_array(self):
+        self.assertEqual(self._parse(json.dumps(self.OBJECTS, indent=2)), self.OBJECTS)
+
+    def test_one_object_per_line(self):
+        self.assertEqual(self._parse('\n'.join(json.dumps(obj) for obj in self.OBJECTS) + '\n'), self.OBJECTS)
+
+    def test_single_object(self):
+        self.assertEqual(self._parse(json.dumps(self.OBJECTS[0]), read_size=1000), self.OBJECTS[:1])
+
+    def test_empty_input(self):
+        self.assertEqual(self._parse(''), [])
+        self.assertEqual(self._parse(' [ ] '), [])
+
+    def test_objects_yielded_before_the_end_of_the_stream(self):
+        objects = iter_json_objects_as_strings(io.StringIO(json.dumps(self.OBJECTS[0]) + '\n{"truncated": '), 7)
+        self.assertEqual(json.loads(next(objects)), self.OBJECTS[0])
+        self.assertRaises(ValueError, next, objects)
+
+    def test_unclosed_array(self):
+        self.assertRaises(ValueError, self._parse, json.dumps(self.OBJECTS)[:-1])
+
+    def test_data_after_the_array(self):
+        self.assertEqual(self._parse(json.dumps(self.OBJECTS) + ' \n '), self.OBJECTS)
+        self.assertRaises(ValueError, self._parse, json.dumps(self.OBJECTS) + '\n' + json.dumps(self.OBJECTS))
+        self.assertRaises(ValueError, self._parse, json.dumps(self.OBJECTS) + ' x')
+
+    @mock.patch('mcheck.main.input_parser._DATA_OBJECT_DECODER')
+    def test_data_objects_mapped_from_the_parsed_objects(self, decoder_mock):
+        decoder_mock.decode_parsed.side_effect = lambda json_object: json_object['data_object']
+        data_objects = list(iter_data_objects(io.StringIO(json.dumps(self.OBJECTS)), read_size=7))
+        self.assertEqual(data_objects, [obj['data_object'] for obj in self.OBJECTS])
+        decoder_mock.decode.assert_not_called()
+
+    def test_commas_between_the_elements_only(self):
+        for text in ['[,,{"a":1}{"b":2},]', '[{"a":1}{"b":2}]', '[{"a":1},,{"b":2}]', '[,{"a":1}]', '[{"a":1},]',
+                     '[,]', '{"a":1},{"b":2}']:
+            self.assertRaises(ValueError, self._parse, text)
+        self.assertEqual(self._parse('[ {"a":1} ,\n{"b":2} ]'), [{"a": 1}, {"b": 2}])
+
+    def test_elements_that_are_not_objects(self):
+        self.assertRaises(ValueError, self._parse, '[1, 2]')
+        self.assertRaises(ValueError, self._parse, '[[%s]]' % json.dumps(self.OBJECTS[0]))
+        self.assertRaises(ValueError, self._parse, json.dumps(self.OBJECTS[0]) + '\n"abc"')
+
+
 if __name__ == "__main__":
     unittest.main()
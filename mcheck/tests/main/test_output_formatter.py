@@ -0,0 +1,87 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+"""
+
+import io
+import json
+import unittest
+from collections import OrderedDict
+
+from mcheck.check_names import CHECK_NAMES
+from mcheck.main.output_formatter import format_output_as_json, format_output_as_tsv, JSONResultsWriter, \
+    NDJSONResultsWriter, TSVResultsWriter, DeduplicatedResultsWriter, read_deduplicated_results, ResultsWriter
+from mcheck.results.checks_results import CheckResult
+from mcheck.results.constants import RESULT
+
+
+class TestResultsWriters(unittest.TestCase):
+
+    def setUp(self):
+        self.check_results_by_path = OrderedDict([
+            ('/seq/1.cram', [CheckResult(CHECK_NAMES.check_all_id_types_present),
+                             CheckResult(CHECK_NAMES.check_desired_reference, result=RESULT.FAILURE,
+                                         error_message=["Wrong reference"])]),
+            ('/seq/2.cram', [CheckResult(CHECK_NAMES.check_all_id_types_present)])])
+
+    def _write(self, writer_class):
+        output = io.StringIO()
+        with writer_class(output) as writer:
+            writer.write_all(self.check_results_by_path)
+        return output.getvalue()
+
+    def test_tsv_one_line_per_check(self):
+        tsv = self._write(TSVResultsWriter)
+        self.assertEqual(tsv, format_output_as_tsv(self.check_results_by_path))
+        self.assertEqual(tsv.count('\n'), 3)
+        self.assertIn("/seq/1.cram\t%s\tTrue\tFAILURE\t['Wrong reference']\n" % CHECK_NAMES.check_desired_reference,
+                      tsv)
+
+    def test_json_same_as_whole_dict(self):
+        self.assertEqual(json.loads(self._write(JSONResultsWriter)),
+                         json.loads(format_output_as_json(self.check_results_by_path)))
+
+    def test_results_writer_is_abstract(self):
+        self.assertRaises(TypeError, ResultsWriter, io.StringIO())
+
+    def test_json_when_no_results(self):
+        output = io.StringIO()
+        JSONResultsWriter(output).close()
+        self.assertEqual(json.loads(output.getvalue()), {})
+
+    def test_ndjson_one_object_per_file(self):
+        lines = self._write(NDJSONResultsWriter).splitlines()
+        self.assertEqual([json.loads(line)['fpath'] for line in lines], ['/seq/1.cram', '/seq/2.cram'])
+        self.assertEqual(json.loads(lines[0])['check_results'][1]['error_message'], ["Wrong reference"])
+
+    def test_deduplicated_writes_each_check_result_once(self):
+        lines = self._write(DeduplicatedResultsWriter).splitlines()
+        # 2 distinct check results + 2 files:
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(json.loads(lines[-1]), {'fpath': '/seq/2.cram', 'message_ids': [0]})
+
+    def test_deduplicated_read_back(self):
+        report = self._write(DeduplicatedResultsWriter)
+        expected = [(fpath, check_results) for fpath, check_results in
+                    json.loads(format_output_as_json(self.check_results_by_path)).items()]
+        self.assertEqual(list(read_deduplicated_results(report.splitlines())), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
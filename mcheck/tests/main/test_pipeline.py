@@ -0,0 +1,131 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+"""
+
+import threading
+import unittest
+from unittest import mock
+
+from mcheck.main.pipeline import FileChecksPipeline
+from mcheck.main.run_statistics import RunStatistics
+
+
+def fake_fetch_header(fpaths, issues_dict, timeout=None, run_stats=None, cache=None, checksums_by_path=None):
+    for fpath in fpaths:
+        if fpath.endswith('broken'):
+            raise ValueError("Unexpected header in " + fpath)
+        issues_dict[fpath].append('header checked')
+    return {fpath: 'header of ' + fpath for fpath in fpaths}
+
+
+def fake_fetch_seqscape(irods_metadata_dict, issues_dict, connection_provider, batched, run_stats):
+    for fpath in irods_metadata_dict:
+        issues_dict[fpath].append('seqscape checked in batch of %s' % len(irods_metadata_dict))
+    return {fpath: 'seqscape of ' + fpath for fpath in irods_metadata_dict}
+
+
+def fake_compare(irods_metadata_dict, header_metadata_dict, seqsc_metadata_dict, issues_dict):
+    for fpath in irods_metadata_dict:
+        issues_dict[fpath].append('compared %s and %s' % (header_metadata_dict[fpath], seqsc_metadata_dict[fpath]))
+
+
+@mock.patch('mcheck.main.pipeline.FileMetadataComparison.check_metadata_across_different_sources', fake_compare)
+@mock.patch('mcheck.main.pipeline.MetadataSelfChecks.fetch_and_preprocess_seqscape_metadata', fake_fetch_seqscape)
+@mock.patch('mcheck.main.pipeline.MetadataSelfChecks.fetch_and_preprocess_header_metadata', fake_fetch_header)
+class FileChecksPipelineTest(unittest.TestCase):
+
+    @staticmethod
+    def _irods_items(fpaths):
+        for fpath in fpaths:
+            yield fpath, 'irods metadata of ' + fpath, ['irods checked']
+
+    def _make_pipeline(self, **kwargs):
+        connection_provider = mock.Mock()
+        connection_provider.get_stats.return_value = {'connections_opened': 1}
+        return FileChecksPipeline(connection_provider=connection_provider, **kwargs)
+
+    def test_all_stages_run_for_each_file(self):
+        pipeline = self._make_pipeline(header_workers=3, seqscape_workers=2, comparison_workers=2)
+        fpaths = ['/seq/%s.cram' % i for i in range(50)]
+        results = dict(pipeline.run(self._irods_items(fpaths)))
+        self.assertEqual(set(results.keys()), set(fpaths))
+        check_results = results['/seq/7.cram']
+        self.assertEqual(check_results[0], 'irods checked')
+        self.assertEqual(check_results[1], 'header checked')
+        self.assertTrue(check_results[2].startswith('seqscape checked'))
+        self.assertEqual(check_results[3], 'compared header of /seq/7.cram and seqscape of /seq/7.cram')
+
+    def test_results_emitted_before_the_input_is_exhausted(self):
+        pipeline = self._make_pipeline()
+        first_file_checked = threading.Event()
+
+        def irods_items():
+            yield '/seq/1.cram', 'irods metadata', []
+            # The second file is only fetched from iRODS once the first one has gone through all the stages:
+            self.assertTrue(first_file_checked.wait(timeout=5))
+            yield '/seq/2.cram', 'irods metadata', []
+
+        results = []
+        for fpath, _ in pipeline.run(irods_items()):
+            results.append(fpath)
+            first_file_checked.set()
+        self.assertEqual(results, ['/seq/1.cram', '/seq/2.cram'])
+
+    def test_seqscape_batch_size(self):
+        pipeline = self._make_pipeline(seqscape_batch_size=4)
+        results = dict(pipeline.run(self._irods_items(['/seq/%s.cram' % i for i in range(20)])))
+        batch_sizes = [int(check_results[2].rsplit(' ', 1)[1]) for check_results in results.values()]
+        self.assertTrue(all(batch_size <= 4 for batch_size in batch_sizes))
+
+    def test_file_without_irods_metadata_not_checked(self):
+        def irods_items():
+            yield '/seq/1.cram', 'irods metadata', ['irods checked']
+            yield '/seq/2.cram', None, ['irods not fetched']
+
+        results = dict(self._make_pipeline().run(irods_items()))
+        self.assertEqual(len(results['/seq/1.cram']), 4)
+        self.assertEqual(results['/seq/2.cram'], ['irods not fetched'])
+
+    def test_stage_error_raised_to_caller(self):
+        pipeline = self._make_pipeline(header_workers=2)
+        fpaths = ['/seq/1.cram', '/seq/2.broken', '/seq/3.cram']
+        self.assertRaises(ValueError, list, pipeline.run(self._irods_items(fpaths)))
+
+    def test_irods_error_raised_to_caller(self):
+        def irods_items():
+            yield '/seq/1.cram', 'irods metadata', []
+            raise OSError("ERROR: you need to log into iRODS and aquire the KERBEROS credentials.")
+
+        pipeline = self._make_pipeline()
+        self.assertRaises(OSError, list, pipeline.run(irods_items()))
+
+    def test_on_result_and_run_stats(self):
+        run_stats = RunStatistics()
+        checked_fpaths = []
+        pipeline = self._make_pipeline(run_stats=run_stats,
+                                       on_result=lambda fpath, check_results: checked_fpaths.append(fpath))
+        results = list(pipeline.run(self._irods_items(['/seq/1.cram', '/seq/2.cram'])))
+        self.assertEqual(checked_fpaths, [fpath for fpath, _ in results])
+        self.assertEqual(run_stats.get_counters('pipeline')['files'], 2)
+        self.assertEqual(run_stats.get_counters('seqscape_connection')['connections_opened'], 1)
+
+    def test_no_files(self):
+        pipeline = self._make_pipeline()
+        self.assertEqual(list(pipeline.run(iter([]))), [])
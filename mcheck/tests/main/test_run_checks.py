@@ -25,6 +25,7 @@ from mcheck.check_names import CHECK_NAMES
 from run_checks import decide_exit_status
 from mcheck.results.checks_results import CheckResult
 from mcheck.results.constants import RESULT
+from mcheck.results.results_store import CheckResultsStore
 
 class TestRunChecks(unittest.TestCase):
 
@@ -41,8 +42,9 @@ class TestRunChecks(unittest.TestCase):
         results = {'path': [CheckResult(CHECK_NAMES.check_all_id_types_present), CheckResult(CHECK_NAMES.check_for_samples_in_more_studies, result=RESULT.FAILURE)]}
         self.assertEqual(decide_exit_status(results), 0)
 
-
-
-
-
-
+    def test_decide_exit_status_when_results_store(self):
+        results = {'path': [CheckResult(CHECK_NAMES.check_all_id_types_present),
+                            CheckResult(CHECK_NAMES.check_for_samples_in_more_studies, result=RESULT.FAILURE)]}
+        self.assertEqual(decide_exit_status(CheckResultsStore.from_dict(results)), 0)
+        results['other_path'] = [CheckResult(CHECK_NAMES.check_all_id_types_present, result=RESULT.FAILURE)]
+        self.assertEqual(decide_exit_status(CheckResultsStore.from_dict(results)), 1)
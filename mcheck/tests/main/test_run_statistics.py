@@ -0,0 +1,67 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+"""
+
+import unittest
+
+from mcheck.main.run_statistics import RunStatistics
+
+
+class TestRunStatistics(unittest.TestCase):
+
+    def setUp(self):
+        self.run_stats = RunStatistics()
+
+    def test_add_counters_accumulates(self):
+        self.run_stats.add_counters('seqscape_connection', {'connections_opened': 1})
+        self.run_stats.add_counters('seqscape_connection', {'connections_opened': 2, 'reconnections': 1})
+        self.assertEqual(self.run_stats.to_dict(), {'seqscape_connection': {'connections_opened': 3, 'reconnections': 1}})
+
+    def test_increment(self):
+        self.run_stats.increment('irods', 'files')
+        self.run_stats.increment('irods', 'files', 2)
+        self.assertEqual(self.run_stats.get_counters('irods')['files'], 3)
+
+    def test_set_value(self):
+        self.run_stats.set_value('pipeline', 'queue_size', 10)
+        self.run_stats.set_value('pipeline', 'queue_size', 20)
+        self.assertEqual(self.run_stats.get_counters('pipeline')['queue_size'], 20)
+
+    def test_ratio_computed_from_added_counters(self):
+        self.run_stats.add_counters('seqscape_dedup', {'files': 3, 'distinct_id_sets': 2})
+        self.run_stats.add_counters('seqscape_dedup', {'files': 5, 'distinct_id_sets': 2})
+        self.assertEqual(self.run_stats.to_dict()['seqscape_dedup'], {'files': 8, 'distinct_id_sets': 4, 'dedup_ratio': 2})
+        self.assertEqual(self.run_stats.to_dict(with_ratios=False)['seqscape_dedup'], {'files': 8, 'distinct_id_sets': 4})
+
+    def test_ratio_computed_for_shard_components(self):
+        self.run_stats.add_counters('shard_0.seqscape_dedup', {'files': 3, 'distinct_id_sets': 2})
+        self.assertEqual(self.run_stats.format_as_text(),
+                         "shard_0.seqscape_dedup: dedup_ratio = 1.5, distinct_id_sets = 2, files = 3")
+
+    def test_format_as_text(self):
+        self.run_stats.add_counters('seqscape_connection', {'reconnections': 0, 'connections_opened': 1})
+        self.assertEqual(self.run_stats.format_as_text(), "seqscape_connection: connections_opened = 1, reconnections = 0")
+
+    def test_format_as_text_when_empty(self):
+        self.assertEqual(self.run_stats.format_as_text(), '')
+
+
+if __name__ == "__main__":
+    unittest.main()
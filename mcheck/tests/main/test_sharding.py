@@ -0,0 +1,127 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+
+"""
+import os
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from mcheck.check_names import CHECK_NAMES
+from mcheck.main.run_statistics import RunStatistics
+from mcheck.main.sharding import iter_chunks, split_in_shards, run_in_chunks, run_in_shards
+from mcheck.results.checks_results import CheckResult
+from mcheck.results.constants import RESULT
+
+
+def check_fpaths(fpaths, run_stats=None, failing_fpath=None):
+    # The first shards take the longest, so that they finish last:
+    time.sleep(0.05 / int(fpaths[0].rsplit('/', 1)[1]))
+    run_stats.increment('checks', 'files', len(fpaths))
+    run_stats.set_value('checks', 'pid', os.getpid())
+    return {fpath: [CheckResult(CHECK_NAMES.check_all_id_types_present,
+                                result=RESULT.FAILURE if fpath == failing_fpath else RESULT.SUCCESS)]
+            for fpath in fpaths}
+
+
+class SplitInShardsTest(unittest.TestCase):
+
+    def test_split_in_contiguous_shards(self):
+        self.assertEqual(split_in_shards([1, 2, 3, 4, 5], 2), [[1, 2, 3], [4, 5]])
+
+    def test_split_in_more_shards_than_items(self):
+        self.assertEqual(split_in_shards([1, 2], 4), [[1], [2]])
+
+    def test_split_empty_list(self):
+        self.assertEqual(split_in_shards([], 3), [])
+
+
+class IterChunksTest(unittest.TestCase):
+
+    def test_iter_chunks_of_a_generator(self):
+        self.assertEqual(list(iter_chunks((i for i in range(1, 6)), 2)), [[1, 2], [3, 4], [5]])
+
+    def test_iter_chunks_of_empty_input(self):
+        self.assertEqual(list(iter_chunks(iter([]), 2)), [])
+
+
+class RunInShardsTest(unittest.TestCase):
+
+    def test_results_keep_input_order(self):
+        fpaths = ['/seq/%s' % i for i in range(1, 11)]
+        results = run_in_shards(check_fpaths, fpaths, 3, failing_fpath='/seq/5')
+        self.assertEqual(list(results.keys()), fpaths)
+        self.assertEqual(results['/seq/5'][0].result, RESULT.FAILURE)
+        self.assertEqual(results['/seq/6'][0].result, RESULT.SUCCESS)
+
+    def test_shards_run_in_other_processes(self):
+        run_stats = RunStatistics()
+        run_in_shards(check_fpaths, ['/seq/1', '/seq/2', '/seq/3'], 2, run_stats)
+        stats = run_stats.to_dict()
+        self.assertEqual(stats['shard_0.checks']['files'], 2)
+        self.assertEqual(stats['shard_1.checks']['files'], 1)
+        self.assertNotEqual(stats['shard_0.checks']['pid'], os.getpid())
+        self.assertEqual(stats['sharding'], {'shards': 2, 'files': 3})
+
+
+class RunInChunksTest(unittest.TestCase):
+
+    def test_results_keep_input_order(self):
+        fpaths = ['/seq/%s' % i for i in range(1, 11)]
+        results = run_in_chunks(check_fpaths, (fpath for fpath in fpaths), 2, 3, failing_fpath='/seq/5')
+        self.assertEqual(list(results.keys()), fpaths)
+        self.assertEqual(results['/seq/5'][0].result, RESULT.FAILURE)
+        self.assertEqual(results['/seq/6'][0].result, RESULT.SUCCESS)
+
+    def test_input_is_read_a_bounded_number_of_chunks_ahead(self):
+        checked_chunks = []
+        chunks_checked_when_read = []
+
+        def check_and_record(fpaths, run_stats=None):
+            results = check_fpaths(fpaths, run_stats)
+            checked_chunks.append(fpaths)
+            return results
+
+        def iter_fpaths():
+            for i in range(1, 21):
+                chunks_checked_when_read.append(len(checked_chunks))
+                yield '/seq/%s' % i
+
+        run_stats = RunStatistics()
+        # Threads instead of processes, so that the checked chunks can be seen from here:
+        with mock.patch('mcheck.main.sharding.ProcessPoolExecutor', ThreadPoolExecutor):
+            run_in_chunks(check_and_record, iter_fpaths(), 1, 2, run_stats)
+        # With 1 worker, at most 2 chunks wait for their results, so the chunk k is read after the chunk k - 2 is done:
+        for i, chunks_checked in enumerate(chunks_checked_when_read):
+            self.assertGreaterEqual(chunks_checked, i // 2 - 1)
+        stats = run_stats.to_dict()
+        self.assertEqual(stats['checks']['files'], 20)
+        self.assertEqual(stats['sharding'], {'chunks': 10, 'files': 20})
+
+    def test_results_reported_in_input_order(self):
+        fpaths = ['/seq/%s' % i for i in range(1, 11)]
+        reported = []
+        run_in_chunks(check_fpaths, iter(fpaths), 3, 2,
+                      on_result=lambda fpath, check_results: reported.append((fpath, len(check_results))))
+        self.assertEqual(reported, [(fpath, 1) for fpath in fpaths])
+
+    def test_empty_input(self):
+        self.assertEqual(len(run_in_chunks(check_fpaths, iter([]), 2, 3)), 0)
@@ -0,0 +1,69 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from mcheck.metadata.file_header_metadata.header_cache import SAMFileHeaderMetadataCache
+from mcheck.metadata.file_header_metadata.header_metadata import SAMFileHeaderMetadata
+
+
+class TestSAMFileHeaderMetadataCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, 'headers.db')
+        self.header = SAMFileHeaderMetadata('/seq/1.cram', samples={'name': {'S1', 'S2'}, 'internal_id': set()},
+                                            libraries={'internal_id': {'123'}}, studies={}, platforms=['ILLUMINA'])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_get_after_put(self):
+        with SAMFileHeaderMetadataCache(self.db_path) as cache:
+            cache.put(self.header, 'abc')
+            self.assertEqual(cache.get('/seq/1.cram', 'abc'), self.header)
+            self.assertEqual(cache.get_stats(), {'hits': 1, 'misses': 0, 'evictions': 0})
+
+    def test_kept_between_runs(self):
+        with SAMFileHeaderMetadataCache(self.db_path) as cache:
+            cache.put(self.header, 'abc')
+        with SAMFileHeaderMetadataCache(self.db_path) as cache:
+            self.assertEqual(cache.get('/seq/1.cram', 'abc'), self.header)
+
+    def test_miss_when_checksum_changed(self):
+        with SAMFileHeaderMetadataCache(self.db_path) as cache:
+            cache.put(self.header, 'abc')
+            self.assertIsNone(cache.get('/seq/1.cram', 'def'))
+            self.assertEqual(cache.get_stats()['misses'], 1)
+
+    def test_least_recently_used_evicted(self):
+        with SAMFileHeaderMetadataCache(self.db_path, max_entries=2) as cache:
+            for fpath in ['/seq/1.cram', '/seq/2.cram', '/seq/3.cram']:
+                cache.put(SAMFileHeaderMetadata(fpath, samples={}, libraries={}, studies={}), 'abc')
+                # The first file is used again after each insertion, so it is never the least recently used:
+                cache.get('/seq/1.cram', 'abc')
+        with SAMFileHeaderMetadataCache(self.db_path, max_entries=2) as cache:
+            self.assertIsNotNone(cache.get('/seq/1.cram', 'abc'))
+            self.assertIsNone(cache.get('/seq/2.cram', 'abc'))
+            self.assertIsNotNone(cache.get('/seq/3.cram', 'abc'))
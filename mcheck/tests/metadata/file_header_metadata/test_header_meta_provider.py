@@ -19,7 +19,9 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 This file has been created on Apr 12, 2016.
 """
 
+import time
 import unittest
+from unittest import mock
 from mcheck.metadata.file_header_metadata.header_meta_provider import SAMFileHeaderMetadataProvider
 from mcheck.metadata.file_header_metadata.header_metadata import SAMFileHeaderMetadata
 
@@ -39,3 +41,56 @@ class TestSAMFileHeaderMetadataProvider(unittest.TestCase):
         self.assertEqual(result, expected)
 
 
+class TestFetchMetadataForPaths(unittest.TestCase):
+
+    def tearDown(self):
+        # Waits for the slow fetches left running by the timeouts:
+        with SAMFileHeaderMetadataProvider._calls_running_changed:
+            SAMFileHeaderMetadataProvider._calls_running_changed.wait_for(
+                lambda: SAMFileHeaderMetadataProvider._calls_running == 0, 5)
+
+    @staticmethod
+    def _fetch_metadata(fpath, irods):
+        if fpath.endswith('slow.cram'):
+            time.sleep(1)
+        if fpath.endswith('broken.cram'):
+            raise OSError("samtools failed")
+        return "header of " + fpath
+
+    @mock.patch.object(SAMFileHeaderMetadataProvider, 'fetch_metadata')
+    def test_results_keep_input_order(self, fetch_metadata_mock):
+        fetch_metadata_mock.side_effect = self._fetch_metadata
+        fpaths = ['/seq/1.cram', '/seq/broken.cram', '/seq/3.cram']
+        results = list(SAMFileHeaderMetadataProvider.fetch_metadata_for_paths(fpaths, irods=True, workers=3))
+        self.assertEqual([fpath for fpath, _, _ in results], fpaths)
+        self.assertEqual(results[0], ('/seq/1.cram', "header of /seq/1.cram", None))
+        self.assertIsNone(results[1][1])
+        self.assertIsInstance(results[1][2], OSError)
+
+    @mock.patch.object(SAMFileHeaderMetadataProvider, 'fetch_metadata')
+    def test_parsing_error_returned_other_errors_raised(self, fetch_metadata_mock):
+        fetch_metadata_mock.side_effect = ValueError("Invalid RG tag")
+        results = list(SAMFileHeaderMetadataProvider.fetch_metadata_for_paths(['/seq/1.cram'], irods=True))
+        self.assertIsInstance(results[0][2], ValueError)
+        fetch_metadata_mock.side_effect = AttributeError("'NoneType' object has no attribute 'rg_tags'")
+        self.assertRaises(AttributeError, list,
+                          SAMFileHeaderMetadataProvider.fetch_metadata_for_paths(['/seq/1.cram', '/seq/2.cram'],
+                                                                                 irods=True, workers=2, timeout=5))
+
+    @mock.patch.object(SAMFileHeaderMetadataProvider, 'fetch_metadata')
+    def test_timeout(self, fetch_metadata_mock):
+        fetch_metadata_mock.side_effect = self._fetch_metadata
+        results = list(SAMFileHeaderMetadataProvider.fetch_metadata_for_paths(['/seq/slow.cram', '/seq/2.cram'],
+                                                                              irods=True, workers=2, timeout=0.1))
+        self.assertIsInstance(results[0][2], TimeoutError)
+        self.assertEqual(results[1], ('/seq/2.cram', "header of /seq/2.cram", None))
+
+    @mock.patch.object(SAMFileHeaderMetadataProvider, 'fetch_metadata')
+    def test_timed_out_fetches_count_against_workers(self, fetch_metadata_mock):
+        fetch_metadata_mock.side_effect = self._fetch_metadata
+        # The slow fetch is still running, so the next one can't start within its timeout:
+        results = list(SAMFileHeaderMetadataProvider.fetch_metadata_for_paths(['/seq/slow.cram', '/seq/2.cram'],
+                                                                              irods=True, workers=1, timeout=0.1))
+        self.assertIsInstance(results[0][2], TimeoutError)
+        self.assertIsInstance(results[1][2], TimeoutError)
+        self.assertEqual(fetch_metadata_mock.call_count, 1)
@@ -0,0 +1,85 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from mcheck.metadata.irods_metadata.attribute_frequency_config import AttributeFrequencyConfigRegistry, \
+    AttributeFrequencyRules
+
+
+class TestAttributeFrequencyRules(unittest.TestCase):
+
+    def test_find_differences(self):
+        rules = AttributeFrequencyRules({'sample': 1, 'study': 1, 'md5': 1})
+        errors = rules.find_differences({'sample': {'S1', 'S2'}, 'md5': {'abc'}, 'extra': {'x'}})
+        self.assertEqual(errors, ["Attribute sample should appear 1 times and instead appears 2 times",
+                                  "Missing attribute study"])
+
+    def test_immutable(self):
+        rules = AttributeFrequencyRules({'sample': 1})
+        self.assertRaises(AttributeError, setattr, rules, 'frequencies', {})
+        with self.assertRaises(TypeError):
+            rules.frequencies['study'] = 1
+
+
+class TestAttributeFrequencyConfigRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.config_path = os.path.join(self.tmp_dir, 'test.conf')
+        with open(self.config_path, 'w') as config_file:
+            config_file.write("sample\t1\nstudy 1\n")
+        AttributeFrequencyConfigRegistry.clear()
+
+    def tearDown(self):
+        AttributeFrequencyConfigRegistry.clear()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_parsed_once(self):
+        rules = AttributeFrequencyConfigRegistry.get_rules(self.config_path)
+        self.assertEqual(dict(rules.frequencies), {'sample': 1, 'study': 1})
+        self.assertIs(AttributeFrequencyConfigRegistry.get_rules(self.config_path), rules)
+
+    def test_reloaded_when_modified(self):
+        AttributeFrequencyConfigRegistry.get_rules(self.config_path)
+        with open(self.config_path, 'w') as config_file:
+            config_file.write("sample 2\n")
+        stat = os.stat(self.config_path)
+        os.utime(self.config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        AttributeFrequencyConfigRegistry.clear()
+        AttributeFrequencyConfigRegistry.get_rules(self.config_path)
+        # Without clearing, the new modification time is seen once the check interval has passed:
+        entries = AttributeFrequencyConfigRegistry._entries_by_path
+        rules, mtime, _ = entries[self.config_path]
+        entries[self.config_path] = (AttributeFrequencyRules({'old': 1}), mtime - 1, 0)
+        self.assertEqual(dict(AttributeFrequencyConfigRegistry.get_rules(self.config_path).frequencies), {'sample': 2})
+
+    def test_invalid_config(self):
+        with open(self.config_path, 'w') as config_file:
+            config_file.write("sample one\n")
+        self.assertRaises(ValueError, AttributeFrequencyConfigRegistry.get_rules, self.config_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
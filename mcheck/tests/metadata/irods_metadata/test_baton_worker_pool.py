@@ -0,0 +1,125 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+"""
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from mcheck.metadata.irods_metadata.baton_worker_pool import BatonWorker, BatonWorkerPool
+
+# Stands in for baton: answers each JSON request line with the request plus some metadata,
+# and exits when asked for the data object called "die", hangs for "hang" and writes a stray line for "stray".
+FAKE_BATON_SCRIPT = """
+import json, sys, time
+for line in sys.stdin:
+    request = json.loads(line)
+    if request['data_object'] == 'die':
+        sys.exit(1)
+    if request['data_object'] == 'hang':
+        time.sleep(60)
+    if request['data_object'] == 'stray':
+        print('Not JSON')
+    sys.stderr.write('warning for %s\\n' % request['data_object'])
+    request['avus'] = [{'attribute': 'md5', 'value': '123'}]
+    print(json.dumps(request))
+    sys.stdout.flush()
+"""
+
+FAKE_BATON_COMMAND = [sys.executable, '-c', FAKE_BATON_SCRIPT]
+
+
+class BatonWorkerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.worker = BatonWorker(FAKE_BATON_COMMAND)
+
+    def tearDown(self):
+        self.worker.close()
+
+    def test_process_reused_between_requests(self):
+        response1 = self.worker.request({'collection': '/seq/1', 'data_object': '1.cram'})
+        process = self.worker._process
+        response2 = self.worker.request({'collection': '/seq/1', 'data_object': '2.cram'})
+        self.assertEqual(response1['data_object'], '1.cram')
+        self.assertEqual(response2['avus'], [{'attribute': 'md5', 'value': '123'}])
+        self.assertIs(self.worker._process, process)
+        self.assertEqual(self.worker.get_stats()['requests'], 2)
+        self.assertEqual(self.worker.get_stats()['restarts'], 0)
+
+    def test_dead_process_raises_error(self):
+        self.assertRaises(OSError, self.worker.request, {'collection': '/seq/1', 'data_object': 'die'})
+        self.assertFalse(self.worker.is_alive())
+        self.assertEqual(self.worker.get_stats()['failures'], 1)
+
+    def test_dead_process_restarted(self):
+        self.assertRaises(OSError, self.worker.request, {'collection': '/seq/1', 'data_object': 'die'})
+        response = self.worker.request({'collection': '/seq/1', 'data_object': '1.cram'})
+        self.assertEqual(response['data_object'], '1.cram')
+        self.assertEqual(self.worker.get_stats()['restarts'], 1)
+
+    def test_hung_process_killed_on_timeout(self):
+        self.worker.timeout = 0.5
+        self.assertRaises(TimeoutError, self.worker.request, {'collection': '/seq/1', 'data_object': 'hang'})
+        self.assertFalse(self.worker.is_alive())
+        response = self.worker.request({'collection': '/seq/1', 'data_object': '1.cram'})
+        self.assertEqual(response['data_object'], '1.cram')
+
+    def test_stray_output_restarts_process(self):
+        self.assertRaises(OSError, self.worker.request, {'collection': '/seq/1', 'data_object': 'stray'})
+        self.assertFalse(self.worker.is_alive())
+        # The answer to the next request isn't mixed up with the one left behind by the stray line:
+        response = self.worker.request({'collection': '/seq/1', 'data_object': '1.cram'})
+        self.assertEqual(response['data_object'], '1.cram')
+
+    def test_errors_cleared_after_each_request(self):
+        self.worker.request({'collection': '/seq/1', 'data_object': '1.cram'})
+        self.worker.request({'collection': '/seq/1', 'data_object': '2.cram'})
+        self.assertNotIn('1.cram', self.worker._read_errors())
+
+
+class BatonWorkerPoolTest(unittest.TestCase):
+
+    def test_requests_shared_between_workers(self):
+        with BatonWorkerPool(2, FAKE_BATON_COMMAND) as pool:
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                data_objects = ['%s.cram' % i for i in range(10)]
+                responses = list(executor.map(lambda name: pool.request({'collection': '/seq', 'data_object': name}),
+                                              data_objects))
+            stats = pool.get_stats()
+        self.assertEqual([response['data_object'] for response in responses], data_objects)
+        self.assertEqual(list(stats.keys()), ['baton_worker_0', 'baton_worker_1'])
+        self.assertEqual(sum(worker_stats['requests'] for worker_stats in stats.values()), 10)
+
+    def test_worker_killed_between_requests_is_restarted(self):
+        with BatonWorkerPool(1, FAKE_BATON_COMMAND) as pool:
+            pool.request({'collection': '/seq', 'data_object': '1.cram'})
+            pool.workers[0]._process.kill()
+            pool.workers[0]._process.wait()
+            response = pool.request({'collection': '/seq', 'data_object': '2.cram'})
+        self.assertEqual(response['data_object'], '2.cram')
+        self.assertEqual(pool.get_stats()['baton_worker_0']['restarts'], 1)
+
+    def test_no_workers(self):
+        self.assertRaises(ValueError, BatonWorkerPool, 0, FAKE_BATON_COMMAND)
+
+    def test_closed_pool(self):
+        pool = BatonWorkerPool(1, FAKE_BATON_COMMAND)
+        pool.close()
+        self.assertRaises(ValueError, pool.request, {'collection': '/seq', 'data_object': '1.cram'})
@@ -20,6 +20,7 @@ This file has been created on Jun 26, 2015.
 """
 
 import unittest
+from unittest import mock
 
 from mcheck.metadata.irods_metadata.constants import IrodsPermission
 from mcheck.metadata.irods_metadata.avu import MetaAVU
@@ -293,6 +294,24 @@ class TestIrodsRawFileMetadata(unittest.TestCase):
             else:
                 self.assertEqual(check_res.result, RESULT.SUCCESS)
 
+    def test_acls_check_cached_by_acl_values(self):
+        IrodsRawFileMetadata.ACLsChecks.clear_cache()
+        acls = [IrodsACL(access_group='ss_123#seq', zone='seq', permission='read'),
+                IrodsACL(access_group='public#seq', zone='seq', permission='read')]
+        same_acls = [IrodsACL(access_group='ss_123#seq', zone='seq', permission='read'),
+                     IrodsACL(access_group='public#seq', zone='seq', permission='read')]
+        expected = IrodsRawFileMetadata.ACLsChecks._check_acls(acls)
+        with mock.patch.object(IrodsRawFileMetadata.ACLsChecks, '_check_acls',
+                               wraps=IrodsRawFileMetadata.ACLsChecks._check_acls) as check_acls:
+            self.assertEqual(IrodsRawFileMetadata.ACLsChecks.check(acls), expected)
+            result = IrodsRawFileMetadata.ACLsChecks.check(same_acls)
+            self.assertEqual(result, expected)
+            self.assertEqual(check_acls.call_count, 1)
+            # Different permissions aren't served from the cache:
+            same_acls[0] = IrodsACL(access_group='ss_123#seq', zone='seq', permission='own')
+            self.assertNotEqual(IrodsRawFileMetadata.ACLsChecks.check(same_acls), expected)
+            self.assertEqual(check_acls.call_count, 2)
+        IrodsRawFileMetadata.ACLsChecks.clear_cache()
 
     def test_check_more_than_one_replicas_when_1(self):
         replicas = [baton_models.DataObjectReplica(number=2, checksum="abc")]
@@ -534,6 +553,17 @@ class TestIrodsSeqFileMetadata(unittest.TestCase):
         check_result = IrodsSeqFileMetadata.CompleteMetadataChecks.check_attribute_frequencies(avus)
         self.assertEqual(check_result.result, RESULT.SUCCESS)
 
+    def test_check_attribute_frequencies_when_target_library(self):
+        # The library CRAMs are checked against the library rules, which also require a library_type:
+        avus = {'study_id': {'3257'}, 'sample_id': {'1248216'}, 'sample_accession_number': {'EGA123'},
+                'target': {'library'}, 'study_accession_number': {'EGAS00001000929'}, 'library_id': {'14820960'},
+                'study': {'GDAP_XTEN'}, 'sample': {'APP5201296'}, 'md5': {'123abc'}, 'manual_qc': {'1'},
+                'sample_common_name': {'Homo sapiens'}, 'type': {'cram'},
+                'reference': {'hla/all/bwa0_6/Homo_sapiens.GRCh38_full_analysis_set_plus_decoy_hla.fa'}}
+        check_result = IrodsSeqFileMetadata.CompleteMetadataChecks.check_attribute_frequencies(avus)
+        self.assertEqual(check_result.result, RESULT.FAILURE)
+        self.assertEqual(check_result.error_message, ['Missing attribute library_type'])
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,69 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+"""
+
+import pickle
+import unittest
+from collections import defaultdict
+
+from mcheck.metadata.irods_metadata import interning
+from mcheck.metadata.irods_metadata.acl import IrodsACL
+from mcheck.metadata.irods_metadata.file_metadata import IrodsRawFileMetadata
+from mcheck.metadata.irods_metadata.file_replica import IrodsFileReplica
+
+
+class TestInternAvus(unittest.TestCase):
+
+    def test_shared_values_are_the_same_object(self):
+        avus1 = interning.intern_avus({'study': {'Study ' + str(1)}, 'md5': {'abc'}})
+        avus2 = interning.intern_avus({'study': {'Study ' + str(1)}, 'md5': {'abc'}})
+        self.assertIs(avus1['study'], avus2['study'])
+        self.assertEqual(avus1['study'], {'Study 1'})
+        # The values that are different for each file are left as they are:
+        self.assertIsInstance(avus1['md5'], set)
+
+    def test_keeps_the_type_of_dict(self):
+        avus = defaultdict(set)
+        avus['sample'].add('S1')
+        interned = interning.intern_avus(avus)
+        self.assertIsInstance(interned, defaultdict)
+        self.assertEqual(interned['missing'], set())
+
+    def test_raw_metadata_avus_interned(self):
+        metadata = IrodsRawFileMetadata(fpath='/seq/1/1.cram', avus={'reference': {'/ref/' + 'hs37d5.fa'}})
+        other = IrodsRawFileMetadata(fpath='/seq/1/2.cram', avus={'reference': {'/ref/' + 'hs37d5.fa'}})
+        self.assertIs(metadata.avus['reference'], other.avus['reference'])
+
+
+class TestImmutableValues(unittest.TestCase):
+
+    def test_acl_immutable_and_picklable(self):
+        acl = IrodsACL(access_group='ss_123', zone='seq', permission='read')
+        self.assertRaises(AttributeError, setattr, acl, 'permission', 'own')
+        self.assertEqual(pickle.loads(pickle.dumps(acl)), acl)
+
+    def test_replica_immutable_and_picklable(self):
+        replica = IrodsFileReplica(checksum='abc', replica_nr=1)
+        self.assertRaises(AttributeError, setattr, replica, 'checksum', 'def')
+        self.assertEqual(pickle.loads(pickle.dumps(replica)), replica)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from mcheck.metadata.irods_metadata import constants as irods_consts
+from mcheck.metadata.irods_metadata.acl import IrodsACL
+from mcheck.metadata.irods_metadata.file_metadata import IrodsRawFileMetadata
+from mcheck.metadata.irods_metadata.file_replica import IrodsFileReplica
+from mcheck.metadata.irods_metadata.irods_meta_cache import IrodsRawFileMetadataCache
+from mcheck.metadata.irods_metadata.irods_meta_provider import iRODSMetadataProvider
+
+
+def _raw_metadata(fpath, checksum='abc'):
+    return IrodsRawFileMetadata(fpath, file_replicas=[IrodsFileReplica(checksum, 1), IrodsFileReplica(checksum, 0)],
+                                acls=[IrodsACL('ss_1234', 'humgen', irods_consts.IrodsPermission.READ)],
+                                avus={'sample': {'S1', 'S2'}, 'md5': {checksum}})
+
+
+class TestIrodsRawFileMetadataCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, 'irods.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_get_after_put(self):
+        with IrodsRawFileMetadataCache(self.db_path) as cache:
+            cache.put(_raw_metadata('/seq/1.cram'))
+        with IrodsRawFileMetadataCache(self.db_path) as cache:
+            cached = cache.get('/seq/1.cram')
+            self.assertTrue(cache.is_fresh(cached))
+            self.assertEqual(cached.raw_metadata.fpath, '/seq/1.cram')
+            self.assertEqual(cached.raw_metadata.file_replicas, [IrodsFileReplica('abc', 1), IrodsFileReplica('abc', 0)])
+            self.assertEqual(cached.raw_metadata.acls, [IrodsACL('ss_1234', 'humgen', irods_consts.IrodsPermission.READ)])
+            self.assertEqual(cached.raw_metadata.avus, {'sample': {'S1', 'S2'}, 'md5': {'abc'}})
+
+    def test_missing_path(self):
+        with IrodsRawFileMetadataCache(self.db_path) as cache:
+            self.assertIsNone(cache.get('/seq/1.cram'))
+
+    def test_stale_until_put_again(self):
+        with IrodsRawFileMetadataCache(self.db_path, ttl=0) as cache:
+            cache.put(_raw_metadata('/seq/1.cram'))
+            self.assertFalse(cache.is_fresh(cache.get('/seq/1.cram')))
+            cache.ttl = 60
+            cache.put(_raw_metadata('/seq/1.cram'))
+            self.assertTrue(cache.is_fresh(cache.get('/seq/1.cram')))
+
+    def test_lookup_counts_outcomes(self):
+        with IrodsRawFileMetadataCache(self.db_path, ttl=60) as cache:
+            cache.put(_raw_metadata('/seq/1.cram'))
+            outcome, raw_metadata = cache.lookup('/seq/1.cram')
+            self.assertEqual(outcome, IrodsRawFileMetadataCache.FRESH_HIT)
+            self.assertEqual(raw_metadata.fpath, '/seq/1.cram')
+            self.assertEqual(cache.lookup('/seq/2.cram'), (IrodsRawFileMetadataCache.MISS, None))
+            cache.ttl = 0
+            self.assertEqual(cache.lookup('/seq/1.cram'), (IrodsRawFileMetadataCache.EXPIRED, None))
+            self.assertEqual(cache.get_stats(), {'fresh_hits': 1, 'misses': 1, 'expired': 1})
+
+
+class FetchRawFilesMetadataWithCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache = IrodsRawFileMetadataCache(os.path.join(self.tmp_dir, 'irods.db'), ttl=0)
+        self.cache.put(_raw_metadata('/seq/1.cram'))
+        self.cache.put(_raw_metadata('/seq/2.cram'))
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.tmp_dir)
+
+    @mock.patch.object(iRODSMetadataProvider, 'fetch_raw_file_metadata_by_path')
+    def test_expired_and_missing_files_fetched(self, fetch_mock):
+        fetch_mock.side_effect = lambda fpath: _raw_metadata(fpath, 'def')
+        fpaths = ['/seq/3.cram', '/seq/2.cram']
+        results = list(iRODSMetadataProvider.fetch_raw_files_metadata_by_paths(fpaths, cache=self.cache))
+        self.assertEqual([fpath for fpath, _, _ in results], fpaths)
+        self.assertEqual([raw_metadata.avus['md5'] for _, raw_metadata, _ in results], [{'def'}, {'def'}])
+        self.assertEqual(sorted(call[0][0] for call in fetch_mock.call_args_list), ['/seq/2.cram', '/seq/3.cram'])
+        self.assertEqual(self.cache.get_stats(), {'misses': 1, 'expired': 1})
+        self.assertEqual(self.cache.get('/seq/3.cram').raw_metadata.avus['md5'], {'def'})
+
+    @mock.patch.object(iRODSMetadataProvider, 'fetch_raw_file_metadata_by_path')
+    def test_expired_file_with_changed_avus_and_same_checksums(self, fetch_mock):
+        # E.g. the manual_qc of the file was fixed in iRODS after a failing run:
+        changed_metadata = _raw_metadata('/seq/1.cram')
+        changed_metadata.avus = {'sample': {'S1', 'S2'}, 'md5': {'abc'}, 'manual_qc': {'1'}}
+        fetch_mock.return_value = changed_metadata
+        results = list(iRODSMetadataProvider.fetch_raw_files_metadata_by_paths(['/seq/1.cram'], cache=self.cache))
+        self.assertEqual(results[0][1].avus['manual_qc'], {'1'})
+        self.assertEqual(self.cache.get('/seq/1.cram').raw_metadata.avus['manual_qc'], {'1'})
+
+    @mock.patch.object(iRODSMetadataProvider, 'fetch_raw_file_metadata_by_path')
+    def test_fresh_files_not_fetched(self, fetch_mock):
+        self.cache.ttl = 60
+        results = list(iRODSMetadataProvider.fetch_raw_files_metadata_by_paths(['/seq/1.cram'], cache=self.cache))
+        self.assertEqual(results[0][1].fpath, '/seq/1.cram')
+        self.assertFalse(fetch_mock.called)
+        self.assertEqual(self.cache.get_stats(), {'fresh_hits': 1})
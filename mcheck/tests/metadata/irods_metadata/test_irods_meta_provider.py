@@ -18,7 +18,9 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 This file has been created on Jul 20, 2016.
 """
+import time
 import unittest
+from unittest import mock
 from mcheck.metadata.irods_metadata.irods_meta_provider import iRODSMetadataProvider
 
 class ArgsConvertedToIrodsFieldsTests(unittest.TestCase):
@@ -45,3 +47,134 @@ class ArgsConvertedToIrodsFieldsTests(unittest.TestCase):
         result = set(iRODSMetadataProvider.convert_to_irods_fields(filter_by_file_types='bam'))
         expected = set([('type', 'bam')])
         self.assertSetEqual(result, expected)
+
+
+class FetchRawFilesMetadataByPathsTests(unittest.TestCase):
+
+    @staticmethod
+    def _fetch_with_latency(fpath):
+        # The first paths take the longest, so that they finish last:
+        time.sleep(0.01 * (5 - int(fpath[-1])))
+        if fpath.endswith('3'):
+            raise OSError("No such path")
+        return "metadata for " + fpath
+
+    @mock.patch.object(iRODSMetadataProvider, 'fetch_raw_file_metadata_by_path')
+    def test_results_keep_input_order(self, fetch_mock):
+        fetch_mock.side_effect = self._fetch_with_latency
+        fpaths = ['/seq/1', '/seq/2', '/seq/4']
+        results = list(iRODSMetadataProvider.fetch_raw_files_metadata_by_paths(fpaths, workers=3))
+        self.assertEqual([fpath for fpath, _, _ in results], fpaths)
+        self.assertEqual([raw_metadata for _, raw_metadata, _ in results], ["metadata for " + f for f in fpaths])
+
+    @mock.patch.object(iRODSMetadataProvider, 'fetch_raw_file_metadata_by_path')
+    def test_errors_returned_per_path(self, fetch_mock):
+        fetch_mock.side_effect = self._fetch_with_latency
+        results = list(iRODSMetadataProvider.fetch_raw_files_metadata_by_paths(['/seq/1', '/seq/3'], workers=2))
+        self.assertIsNone(results[0][2])
+        self.assertIsNone(results[1][1])
+        self.assertIsInstance(results[1][2], OSError)
+
+    @mock.patch.object(iRODSMetadataProvider, 'fetch_raw_file_metadata_by_path')
+    def test_serial_when_one_worker(self, fetch_mock):
+        fetch_mock.side_effect = self._fetch_with_latency
+        results = list(iRODSMetadataProvider.fetch_raw_files_metadata_by_paths(['/seq/2', '/seq/3'], workers=1))
+        self.assertEqual(results[0], ('/seq/2', "metadata for /seq/2", None))
+        self.assertIsInstance(results[1][2], OSError)
+
+
+@mock.patch('mcheck.metadata.irods_metadata.irods_meta_provider.IrodsRawFileMetadata.from_baton_wrapper',
+            lambda data_object: "metadata for " + data_object['data_object'])
+class FetchRawFilesMetadataInBulkTests(unittest.TestCase):
+
+    # baton-list doesn't necessarily return the data objects in the order they were requested:
+    BATON_OUTPUT = '{"collection": "/seq/1", "data_object": "2.cram", "avus": []}\n' \
+                   '{"collection": "/seq/1", "data_object": "1.cram", "avus": []}\n' \
+                   '{"collection": "/seq/1", "data_object": "3.cram", ' \
+                   '"error": {"code": -310000, "message": "Path does not exist"}}\n'
+
+    @mock.patch.object(iRODSMetadataProvider, '_run_baton_list')
+    def test_output_matched_to_paths(self, run_mock):
+        run_mock.return_value = self.BATON_OUTPUT
+        fpaths = ['/seq/1/1.cram', '/seq/1/2.cram', '/seq/1/3.cram']
+        results = list(iRODSMetadataProvider.fetch_raw_files_metadata_by_paths(fpaths, chunk_size=500))
+        self.assertEqual(results[0], ('/seq/1/1.cram', "metadata for 1.cram", None))
+        self.assertEqual(results[1], ('/seq/1/2.cram', "metadata for 2.cram", None))
+        self.assertIsNone(results[2][1])
+        self.assertIsInstance(results[2][2], OSError)
+        run_mock.assert_called_once_with(fpaths)
+
+    @mock.patch.object(iRODSMetadataProvider, '_run_baton_list')
+    def test_path_missing_from_output(self, run_mock):
+        run_mock.return_value = self.BATON_OUTPUT
+        results = list(iRODSMetadataProvider.fetch_raw_files_metadata_by_paths(['/seq/1/4.cram'], chunk_size=500))
+        self.assertIsNone(results[0][1])
+        self.assertIsInstance(results[0][2], OSError)
+
+    @mock.patch.object(iRODSMetadataProvider, '_run_baton_list')
+    def test_one_baton_process_per_chunk(self, run_mock):
+        run_mock.return_value = self.BATON_OUTPUT
+        fpaths = ['/seq/1/1.cram', '/seq/1/2.cram', '/seq/1/3.cram']
+        results = list(iRODSMetadataProvider.fetch_raw_files_metadata_by_paths(fpaths, workers=2, chunk_size=2))
+        self.assertEqual([fpath for fpath, _, _ in results], fpaths)
+        self.assertEqual(run_mock.call_count, 2)
+
+    @mock.patch.object(iRODSMetadataProvider, '_run_baton_list')
+    def test_truncated_output(self, run_mock):
+        run_mock.return_value = self.BATON_OUTPUT.split('\n')[0] + '\n{"collection": "/seq/1", "data_ob'
+        results = list(iRODSMetadataProvider.fetch_raw_files_metadata_by_paths(['/seq/1/1.cram', '/seq/1/2.cram'],
+                                                                               chunk_size=500))
+        self.assertEqual(results[1], ('/seq/1/2.cram', "metadata for 2.cram", None))
+        self.assertEqual(results[0][:2], ('/seq/1/1.cram', None))
+        self.assertIsInstance(results[0][2], ValueError)
+
+    @mock.patch.object(iRODSMetadataProvider, '_run_baton_list')
+    def test_conversion_error_reported_for_its_path_only(self, run_mock):
+        run_mock.return_value = self.BATON_OUTPUT.replace('"data_object": "1.cram", "avus": []',
+                                                          '"data_object": "1.cram"')
+        with mock.patch('mcheck.metadata.irods_metadata.irods_meta_provider.IrodsRawFileMetadata.from_baton_wrapper',
+                        lambda data_object: "metadata for " + data_object['data_object'] + str(data_object['avus'])):
+            results = list(iRODSMetadataProvider.fetch_raw_files_metadata_by_paths(['/seq/1/1.cram', '/seq/1/2.cram'],
+                                                                                   chunk_size=500))
+        self.assertIsInstance(results[0][2], ValueError)
+        self.assertEqual(results[1], ('/seq/1/2.cram', "metadata for 2.cram[]", None))
+
+    @mock.patch.object(iRODSMetadataProvider, '_run_baton_list')
+    def test_paths_matched_once_normalised(self, run_mock):
+        run_mock.return_value = self.BATON_OUTPUT
+        results = list(iRODSMetadataProvider.fetch_raw_files_metadata_by_paths(['/seq//1/1.cram', '/seq/1/2.cram/'],
+                                                                               chunk_size=500))
+        self.assertEqual(results, [('/seq//1/1.cram', "metadata for 1.cram", None),
+                                   ('/seq/1/2.cram/', "metadata for 2.cram", None)])
+
+    def test_baton_target_normalised(self):
+        self.assertEqual(iRODSMetadataProvider._to_baton_target('/seq//1/1.cram/'),
+                         {'collection': '/seq/1', 'data_object': '1.cram'})
+
+    @mock.patch.object(iRODSMetadataProvider, '_run_baton_list')
+    def test_baton_failure_reported_for_whole_chunk(self, run_mock):
+        run_mock.side_effect = OSError("ERROR: you need to log into iRODS and aquire the KERBEROS credentials.")
+        results = list(iRODSMetadataProvider.fetch_raw_files_metadata_by_paths(['/seq/1/1.cram', '/seq/1/2.cram'],
+                                                                               chunk_size=500))
+        self.assertTrue(all(isinstance(error, OSError) for _, _, error in results))
+
+
+@mock.patch('mcheck.metadata.irods_metadata.irods_meta_provider.IrodsRawFileMetadata.from_baton_wrapper',
+            lambda data_object: "metadata for " + data_object['data_object'])
+class FetchRawFilesMetadataWithWorkerPoolTests(unittest.TestCase):
+
+    def test_paths_sent_to_worker_pool(self):
+        worker_pool = mock.Mock()
+        worker_pool.request.side_effect = lambda target: dict(target, avus=[])
+        results = list(iRODSMetadataProvider.fetch_raw_files_metadata_by_paths(['/seq/1/1.cram', '/seq/1/2.cram'],
+                                                                               workers=2, worker_pool=worker_pool))
+        self.assertEqual(results, [('/seq/1/1.cram', "metadata for 1.cram", None),
+                                   ('/seq/1/2.cram', "metadata for 2.cram", None)])
+        worker_pool.request.assert_any_call({'collection': '/seq/1', 'data_object': '1.cram'})
+
+    def test_worker_error_returned_per_path(self):
+        worker_pool = mock.Mock()
+        worker_pool.request.side_effect = OSError("baton worker 0 exited with status 1")
+        results = list(iRODSMetadataProvider.fetch_raw_files_metadata_by_paths(['/seq/1/1.cram'],
+                                                                               worker_pool=worker_pool))
+        self.assertIsInstance(results[0][2], OSError)
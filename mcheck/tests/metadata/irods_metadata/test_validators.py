@@ -0,0 +1,77 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+"""
+
+import unittest
+
+from mcheck.check_names import CHECK_NAMES
+from mcheck.metadata.irods_metadata import constants as irods_consts
+from mcheck.metadata.irods_metadata import validators
+from mcheck.metadata.irods_metadata.acl import IrodsACL
+from mcheck.metadata.irods_metadata.file_replica import IrodsFileReplica
+from mcheck.results.constants import RESULT
+
+
+class TestBatchValidators(unittest.TestCase):
+
+    def test_are_checksums_valid(self):
+        self.assertEqual(validators.are_checksums_valid(['123abc', 'ABCdef0', '12x', '', None, 123]),
+                         [True, True, False, False, False, False])
+
+    def test_are_replica_nrs_valid(self):
+        self.assertEqual(validators.are_replica_nrs_valid([0, '1', -1, 'a']), [True, True, False, False])
+        self.assertRaises(TypeError, validators.are_replica_nrs_valid, [0, 1.5])
+
+    def test_are_irods_zones_valid(self):
+        self.assertEqual(validators.are_irods_zones_valid(['seq', 'humgen', 'Sanger1', 'other', None]),
+                         [True, True, True, False, True])
+        self.assertRaises(TypeError, validators.are_irods_zones_valid, [1])
+
+    def test_are_permissions_valid(self):
+        self.assertEqual(validators.are_permissions_valid(['read', irods_consts.IrodsPermission.OWN, 'READ', []]),
+                         [True, True, False, False])
+
+
+class TestValidateReplicasAndACLs(unittest.TestCase):
+
+    def test_validate_replicas(self):
+        check_results = validators.validate_replicas([IrodsFileReplica('abc', 0), IrodsFileReplica('xyz', '-1')])
+        self.assertEqual([check_result.check_name for check_result in check_results],
+                         [CHECK_NAMES.check_replica_checksum_valid, CHECK_NAMES.check_replica_number] * 2)
+        self.assertEqual([check_result.result for check_result in check_results],
+                         [RESULT.SUCCESS, RESULT.SUCCESS, RESULT.FAILURE, RESULT.FAILURE])
+        self.assertEqual(check_results[2].error_message, "The checksum looks invalid: xyz")
+
+    def test_validate_acls(self):
+        check_results = validators.validate_acls([IrodsACL('ss_1', 'seq', 'read'), IrodsACL('ss_1', 'zone', 'x')])
+        self.assertEqual([check_result.check_name for check_result in check_results],
+                         [CHECK_NAMES.check_irods_zone_within_acl, CHECK_NAMES.check_irods_permission_within_acl] * 2)
+        self.assertEqual([check_result.result for check_result in check_results],
+                         [RESULT.SUCCESS, RESULT.SUCCESS, RESULT.FAILURE, RESULT.FAILURE])
+
+    def test_validate_fields_goes_through_validators(self):
+        self.assertEqual(IrodsFileReplica('abc', 1).validate_fields(),
+                         validators.validate_replicas([IrodsFileReplica('abc', 1)]))
+        self.assertEqual(IrodsACL('ss_1', 'seq', 'read').validate_fields(),
+                         validators.validate_acls([IrodsACL('ss_1', 'seq', 'read')]))
+
+
+if __name__ == "__main__":
+    unittest.main()
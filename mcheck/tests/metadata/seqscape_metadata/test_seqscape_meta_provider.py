@@ -19,10 +19,15 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 This file has been created on Mar 02, 2016.
 """
 
+import threading
 from unittest import TestCase, mock, skip
 
+from sequencescape import Sample, Study, Library
+from sqlalchemy.exc import OperationalError
+
 import config
-from mcheck.metadata.seqscape_metadata.seqscape_meta_provider import SeqscapeRawMetadataProvider
+from mcheck.metadata.seqscape_metadata.seqscape_meta_provider import SeqscapeRawMetadataProvider, SeqscapeConnectionProvider, \
+    PrefetchedEntityMapper, SampleStudyAssociationIndex
 
 @skip
 class TestFetchSamplesFromSeqscapeRawMetadataProvider(TestCase):
@@ -179,3 +184,224 @@ class TestFetchRawMetadata(TestCase):
         self.assertEqual(len(raw_meta.get_entities_by_type('sample')), 3)
         self.assertEqual(len(raw_meta.get_entities_by_type('library')), 2)
         self.assertEqual(len(raw_meta.get_entities_by_type('study')), 3)
+
+
+class TestSeqscapeConnectionProvider(TestCase):
+
+    def setUp(self):
+        self.connection_provider = SeqscapeConnectionProvider('host', 1234, 'db', 'user', health_check_interval=60)
+
+    @mock.patch.object(SeqscapeRawMetadataProvider, '_get_connection')
+    def test_get_connection_opens_only_one_connection(self, get_connection_mock):
+        for _ in range(10):
+            self.connection_provider.get_connection()
+        self.assertEqual(get_connection_mock.call_count, 1)
+        self.assertEqual(self.connection_provider.connections_opened, 1)
+
+    @mock.patch.object(SeqscapeRawMetadataProvider, '_get_connection')
+    def test_get_connection_one_connection_per_thread(self, get_connection_mock):
+        get_connection_mock.side_effect = lambda host, port, db_name, user: mock.Mock()
+        connections = []
+        threads = [threading.Thread(target=lambda: connections.extend([self.connection_provider.get_connection(),
+                                                                       self.connection_provider.get_connection()]))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(map(id, connections))), 4)
+        self.assertEqual(self.connection_provider.get_stats()['connections_opened'], 4)
+
+    @mock.patch.object(SeqscapeRawMetadataProvider, '_get_connection')
+    def test_get_connection_reconnects_when_stale(self, get_connection_mock):
+        self.connection_provider.health_check_interval = -1
+        connection = self.connection_provider.get_connection()
+        connection.study.get_by_id.side_effect = OSError("Lost connection to MySQL server")
+        self.connection_provider.get_connection()
+        self.assertEqual(self.connection_provider.connections_opened, 2)
+        self.assertEqual(self.connection_provider.reconnections, 1)
+        self.assertEqual(self.connection_provider.failed_health_checks, 1)
+
+    @mock.patch.object(SeqscapeRawMetadataProvider, '_get_connection')
+    def test_get_connection_keeps_healthy_connection(self, get_connection_mock):
+        self.connection_provider.health_check_interval = -1
+        self.connection_provider.get_connection()
+        self.connection_provider.get_connection()
+        self.assertEqual(self.connection_provider.connections_opened, 1)
+        self.assertEqual(self.connection_provider.health_checks, 1)
+
+    @mock.patch.object(SeqscapeRawMetadataProvider, '_fetch_raw_metadata')
+    @mock.patch.object(SeqscapeRawMetadataProvider, '_get_connection')
+    def test_fetch_raw_metadata_retries_on_new_connection(self, get_connection_mock, fetch_mock):
+        fetch_mock.side_effect = [OperationalError("SELECT", {}, Exception("Lost connection to MySQL server")),
+                                  'raw metadata']
+        result = SeqscapeRawMetadataProvider.fetch_raw_metadata({'name': {'s1'}}, None, None, self.connection_provider)
+        self.assertEqual(result, 'raw metadata')
+        self.assertEqual(self.connection_provider.get_stats()['reconnections'], 1)
+
+    @mock.patch.object(SeqscapeRawMetadataProvider, '_fetch_raw_metadata')
+    @mock.patch.object(SeqscapeRawMetadataProvider, '_get_connection')
+    def test_fetch_raw_metadata_doesnt_retry_other_errors(self, get_connection_mock, fetch_mock):
+        fetch_mock.side_effect = KeyError('name')
+        self.assertRaises(KeyError, SeqscapeRawMetadataProvider.fetch_raw_metadata, {'name': {'s1'}}, None, None,
+                          self.connection_provider)
+        self.assertEqual(fetch_mock.call_count, 1)
+        self.assertEqual(self.connection_provider.get_stats()['reconnections'], 0)
+
+
+class FakeSeqscapeMapper:
+    """
+    Answers the queries from a list of entities, the way the Sequencescape mappers do and counts the queries.
+    """
+    def __init__(self, entities):
+        self.entities = entities
+        self.queries = 0
+
+    def _get_by(self, id_type, ids):
+        self.queries += 1
+        ids = [str(id) for id in ids]
+        return [entity for entity in self.entities if str(getattr(entity, id_type)) in ids]
+
+    def get_by_name(self, names):
+        return self._get_by('name', names)
+
+    def get_by_id(self, internal_ids):
+        return self._get_by('internal_id', internal_ids)
+
+    def get_by_accession_number(self, accession_numbers):
+        return self._get_by('accession_number', accession_numbers)
+
+    def get_associated_with_study(self, studies):
+        return [entity for entity in self.entities if entity.name.startswith('sam')]
+
+    def get_associated_with_sample(self, samples):
+        return [entity for entity in self.entities if entity.name.startswith('st')]
+
+
+class TestPrefetchedEntityMapper(TestCase):
+
+    def setUp(self):
+        self.mapper = FakeSeqscapeMapper([Sample(name='sam%s' % i, internal_id=str(i), accession_number='EGAN%s' % i)
+                                          for i in range(10)])
+        self.prefetched_mapper = PrefetchedEntityMapper(self.mapper, chunk_size=4)
+
+    def test_prefetch_in_chunks(self):
+        self.prefetched_mapper.prefetch('name', ['sam%s' % i for i in range(10)])
+        self.assertEqual(self.mapper.queries, 3)
+
+    def test_get_by_name_from_prefetched(self):
+        self.prefetched_mapper.prefetch('name', ['sam1', 'sam2', 'sam3'])
+        self.assertEqual(self.prefetched_mapper.get_by_name(['sam1', 'sam2']), self.mapper.get_by_name(['sam1', 'sam2']))
+        self.assertEqual(self.mapper.queries, 2)
+
+    def test_get_by_id_not_prefetched_fetches_missing_ids(self):
+        self.assertEqual(self.prefetched_mapper.get_by_id(['1']), [self.mapper.entities[1]])
+        self.assertEqual(self.mapper.queries, 1)
+
+    def test_get_by_id_nonexisting(self):
+        self.prefetched_mapper.prefetch('internal_id', ['100'])
+        self.assertEqual(self.prefetched_mapper.get_by_id(['100']), [])
+
+    def test_get_ids_not_found(self):
+        self.prefetched_mapper.prefetch('accession_number', ['EGAN1', 'EGAN100'])
+        self.assertEqual(self.prefetched_mapper.get_ids_not_found('accession_number', ['EGAN1', 'EGAN100']), {'EGAN100'})
+
+
+class TestSampleStudyAssociationIndex(TestCase):
+
+    def setUp(self):
+        self.samples = [Sample(name='sam%s' % i, internal_id=str(i), accession_number='EGAN%s' % i) for i in range(3)]
+        self.studies = [Study(name='st1', internal_id='1', accession_number='EGAS1')]
+        self.ss_connection = mock.Mock()
+        self.ss_connection.sample = FakeSeqscapeMapper(self.samples)
+        self.ss_connection.study = FakeSeqscapeMapper(self.studies)
+        self.association_index = SampleStudyAssociationIndex(self.ss_connection, chunk_size=2)
+
+    def test_get_samples_for_studies(self):
+        self.assertEqual(self.association_index.get_samples_for_studies(self.studies), set(self.samples))
+
+    def test_get_studies_for_samples(self):
+        self.assertEqual(self.association_index.get_studies_for_samples(self.samples[:1]), set(self.studies))
+
+    def test_get_studies_for_samples_queries_in_chunks_once(self):
+        for _ in range(5):
+            self.assertEqual(self.association_index.get_studies_for_samples(self.samples), set(self.studies))
+        self.assertEqual(self.association_index.queries, 2)
+
+    def test_get_studies_for_samples_already_fetched_one_by_one(self):
+        for sample in self.samples:
+            self.association_index.get_studies_for_samples([sample])
+        self.assertEqual(self.association_index.get_studies_for_samples(self.samples), set(self.studies))
+        self.assertEqual(self.association_index.queries, len(self.samples))
+
+    def test_get_samples_for_no_studies(self):
+        self.assertEqual(self.association_index.get_samples_for_studies([]), set())
+        self.assertEqual(self.association_index.queries, 0)
+
+
+class TestFetchRawMetadataInBatch(TestCase):
+
+    def setUp(self):
+        self.samples = [Sample(name='sam%s' % i, internal_id=str(i), accession_number='EGAN%s' % i) for i in range(6)]
+        self.studies = [Study(name='st1', internal_id='1', accession_number='EGAS1')]
+        self.libraries = [Library(name='lib1', internal_id='11')]
+        self.ss_connection = mock.Mock()
+        self.ss_connection.sample = FakeSeqscapeMapper(self.samples)
+        self.ss_connection.study = FakeSeqscapeMapper(self.studies)
+        self.ss_connection.library = FakeSeqscapeMapper(self.libraries)
+        self.ss_connection.well = FakeSeqscapeMapper([])
+        self.ss_connection.multiplexed_library = FakeSeqscapeMapper([])
+        self.connection_provider = mock.Mock()
+        self.connection_provider.get_connection.return_value = self.ss_connection
+        self.entities_ids_by_fpath = {}
+        for i in range(6):
+            self.entities_ids_by_fpath['/seq/%s.cram' % i] = ({'name': {'sam%s' % i}, 'internal_id': {str(i)},
+                                                               'accession_number': {'EGAN%s' % i}},
+                                                              {'name': set(), 'internal_id': {'11', '12'},
+                                                               'accession_number': set()},
+                                                              {'name': {'st1'}, 'internal_id': {'1'},
+                                                               'accession_number': set()})
+
+    def test_fetch_raw_metadata_in_batch_same_as_per_file(self):
+        raw_metadata_by_fpath = SeqscapeRawMetadataProvider.fetch_raw_metadata_in_batch(self.entities_ids_by_fpath,
+                                                                                        self.connection_provider)
+        for fpath, (samples, libraries, studies) in self.entities_ids_by_fpath.items():
+            expected = SeqscapeRawMetadataProvider._fetch_raw_metadata(self.ss_connection, samples, libraries, studies)
+            self.assertEqual(raw_metadata_by_fpath[fpath], expected)
+            self.assertEqual(raw_metadata_by_fpath[fpath].check_metadata(), expected.check_metadata())
+
+    def test_fetch_raw_metadata_in_batch_retries_on_new_connection(self):
+        stale_connection = mock.Mock()
+        stale_connection.sample.get_by_name.side_effect = \
+            OperationalError("SELECT", {}, Exception("Lost connection to MySQL server"))
+        self.connection_provider.get_connection.return_value = stale_connection
+        self.connection_provider.reconnect.return_value = self.ss_connection
+        raw_metadata_by_fpath = SeqscapeRawMetadataProvider.fetch_raw_metadata_in_batch(self.entities_ids_by_fpath,
+                                                                                        self.connection_provider)
+        self.connection_provider.reconnect.assert_called_once_with()
+        for fpath, (samples, libraries, studies) in self.entities_ids_by_fpath.items():
+            expected = SeqscapeRawMetadataProvider._fetch_raw_metadata(self.ss_connection, samples, libraries, studies)
+            self.assertEqual(raw_metadata_by_fpath[fpath], expected)
+
+    def test_association_query_retried_on_new_connection(self):
+        stale_connection = mock.Mock()
+        stale_connection.study.get_associated_with_sample.side_effect = \
+            OperationalError("SELECT", {}, Exception("Lost connection to MySQL server"))
+        self.connection_provider.reconnect.return_value = self.ss_connection
+        association_index = SampleStudyAssociationIndex(stale_connection, connection_provider=self.connection_provider)
+        self.assertEqual(association_index.get_studies_for_samples(self.samples), set(self.studies))
+        self.connection_provider.reconnect.assert_called_once_with()
+
+    def test_association_query_not_retried_without_connection_provider(self):
+        stale_connection = mock.Mock()
+        stale_connection.study.get_associated_with_sample.side_effect = \
+            OperationalError("SELECT", {}, Exception("Lost connection to MySQL server"))
+        association_index = SampleStudyAssociationIndex(stale_connection)
+        self.assertRaises(OperationalError, association_index.get_studies_for_samples, self.samples)
+
+    def test_fetch_raw_metadata_in_batch_queries_once_per_id_type(self):
+        SeqscapeRawMetadataProvider.fetch_raw_metadata_in_batch(self.entities_ids_by_fpath, self.connection_provider)
+        self.assertEqual(self.ss_connection.sample.queries, 3)
+        self.assertEqual(self.ss_connection.study.queries, 2)
+        self.assertEqual(self.ss_connection.library.queries, 1)
+        self.assertEqual(self.ss_connection.well.queries, 1)
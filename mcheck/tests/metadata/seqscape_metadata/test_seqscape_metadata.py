@@ -19,6 +19,7 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 This file has been created on Feb 26, 2016.
 """
 import unittest
+from unittest import mock
 from sequencescape import connect_to_sequencescape, Sample, Study, Library
 from mcheck.metadata.seqscape_metadata.seqscape_metadata import SeqscapeRawMetadata, SeqscapeEntityQueryAndResults, SeqscapeMetadata
 from mcheck.results.checks_results import RESULT
@@ -265,6 +266,10 @@ class TestSeqscapeEntitiesFetched(unittest.TestCase):
         entities_fetched = raw_metadata.get_fetched_entities_by_type('sample')
         result = raw_metadata._check_by_comparison_entities_fetched_by_different_id_types(entities_fetched)
         self.assertEqual(result.result, RESULT.FAILURE)
+        self.assertIn("Extra sample found when querying by name compared to internal_id: [('sam12', 'ega12')].",
+                      str(result.error_message))
+        self.assertIn("Extra sample found when querying by internal_id compared to name: [('sam34', 'ega34')].",
+                      str(result.error_message))
 
     def test_check_by_comparison_entities_fetched_by_different_id_types_more_wrong(self):
         raw_metadata = SeqscapeRawMetadata()
@@ -390,6 +395,45 @@ class TestSamplesAndStudiesFetched(unittest.TestCase):
         self.assertEqual(result.result, RESULT.FAILURE)
 
 
+class TestSamplesAndStudiesFetchedWithAssociationIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.sam1 = Sample(name='sam1', accession_number='ega1', internal_id='1')
+        self.std1 = Study(name='study1', accession_number='ega2', internal_id='2')
+        self.raw_metadata = SeqscapeRawMetadata()
+        self.raw_metadata.add_fetched_entities(SeqscapeEntityQueryAndResults(self.sam1, query_ids=['sam1'],
+                                                                             query_id_type='name',
+                                                                             query_entity_type='sample',
+                                                                             fetched_entity_type='sample'))
+        self.raw_metadata.add_fetched_entities(SeqscapeEntityQueryAndResults(self.std1, query_ids=['study1'],
+                                                                             query_id_type='name',
+                                                                             query_entity_type='study',
+                                                                             fetched_entity_type='study'))
+        self.association_index = mock.Mock()
+        self.raw_metadata.set_association_index(self.association_index)
+
+    def test_check_studies_fetched_by_samples_when_associated(self):
+        self.association_index.get_studies_for_samples.return_value = {self.std1}
+        result = self.raw_metadata.check_studies_fetched_by_samples()
+        self.assertEqual(result[0].result, RESULT.SUCCESS)
+        self.association_index.get_studies_for_samples.assert_called_once_with([self.sam1])
+
+    def test_check_studies_fetched_by_samples_when_not_associated(self):
+        self.association_index.get_studies_for_samples.return_value = set()
+        result = self.raw_metadata.check_studies_fetched_by_samples()
+        self.assertEqual(result[0].result, RESULT.FAILURE)
+
+    def test_check_samples_fetched_by_studies_when_associated(self):
+        self.association_index.get_samples_for_studies.return_value = {self.sam1}
+        result = self.raw_metadata.check_samples_fetched_by_studies()
+        self.assertEqual(result.result, RESULT.SUCCESS)
+
+    def test_check_samples_fetched_by_studies_when_not_associated(self):
+        self.association_index.get_samples_for_studies.return_value = set()
+        result = self.raw_metadata.check_samples_fetched_by_studies()
+        self.assertEqual(result.result, RESULT.FAILURE)
+
+
 class TestCheckEntitiesFetched(unittest.TestCase):
 
     def test_check_entities_fetched_ok(self):
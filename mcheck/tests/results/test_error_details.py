@@ -0,0 +1,85 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+"""
+
+import pickle
+import unittest
+
+from mcheck.results import error_details
+from mcheck.results.checks_results import CheckResult
+from mcheck.results.error_details import ErrorDetails, ListedItems
+from mcheck.check_names import CHECK_NAMES
+
+
+class ListedItemsTest(unittest.TestCase):
+
+    def test_render_all(self):
+        self.assertEqual(ListedItems(['s3', 's1', 's2']).render(), '[s1, s2, s3]')
+
+    def test_render_capped(self):
+        items = ListedItems('s%s' % i for i in range(10))
+        self.assertEqual(items.render(max_items=3), '[s0, s1, s2, ... (7 more, 10 in total)]')
+
+    def test_render_under_cap(self):
+        self.assertEqual(ListedItems(['s1']).render(max_items=3), '[s1]')
+
+
+class ErrorDetailsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.max_listed_items = error_details.MAX_LISTED_ITEMS
+
+    def tearDown(self):
+        error_details.set_max_listed_items(self.max_listed_items)
+
+    def test_str_uses_the_configured_cap(self):
+        details = ErrorDetails("Samples missing: %s, study: %s", ListedItems(['s1', 's2', 's3']), 'st1')
+        error_details.set_max_listed_items(2)
+        self.assertEqual(str(details), "Samples missing: [s1, s2, ... (1 more, 3 in total)], study: st1")
+        error_details.set_max_listed_items(None)
+        self.assertEqual(str(details), "Samples missing: [s1, s2, s3], study: st1")
+
+    def test_append(self):
+        details = ErrorDetails()
+        self.assertFalse(details)
+        details.append("A: %s.", ListedItems([1])).append("B: %s.", ListedItems([2]))
+        self.assertEqual(details.render(), "A: [1].B: [2].")
+
+    def test_copy(self):
+        details = ErrorDetails("A: %s.", ListedItems([1]))
+        copied = details.copy()
+        copied.append("B: %s.", ListedItems([2]))
+        self.assertEqual(details.render(), "A: [1].")
+        self.assertEqual(copied.render(), "A: [1].B: [2].")
+
+    def test_pickle(self):
+        details = ErrorDetails("Samples missing: %s", ListedItems([('s1', 'ega1')]))
+        self.assertEqual(pickle.loads(pickle.dumps(details)), details)
+
+    def test_rendered_in_json(self):
+        check_result = CheckResult(check_name=CHECK_NAMES.check_samples_in_irods_same_as_samples_fetched_by_study_from_seqscape,
+                                   error_message=ErrorDetails("Ids: %s", ListedItems(['s2', 's1'])))
+        error_details.set_max_listed_items(1)
+        self.assertEqual(CheckResult.to_json_mapping()[2].object_property_getter(check_result),
+                         "Ids: [s1, ... (1 more, 2 in total)]")
+
+
+if __name__ == '__main__':
+    unittest.main()
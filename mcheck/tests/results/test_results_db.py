@@ -0,0 +1,88 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from collections import Counter
+
+from mcheck.check_names import CHECK_NAMES
+from mcheck.results.checks_results import CheckResult
+from mcheck.results.constants import RESULT, SEVERITY
+from mcheck.results.error_details import ErrorDetails, ListedItems
+from mcheck.results.results_db import CheckResultsDatabase
+from mcheck.results.results_processing import CheckResultsProcessing
+
+
+class CheckResultsDatabaseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, 'results.db')
+        self.check_results_by_path = {
+            '/seq/1.cram': [CheckResult(CHECK_NAMES.check_desired_reference, result=RESULT.FAILURE,
+                                        error_message=["Wrong reference"]),
+                            CheckResult(CHECK_NAMES.check_all_id_types_present, executed=False, result=None)],
+            '/seq/2.cram': [CheckResult(CHECK_NAMES.check_desired_reference, result=RESULT.FAILURE,
+                                        severity=SEVERITY.WARNING,
+                                        error_message=ErrorDetails("Ids: %s", ListedItems(['s1'])))]}
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_failed_check_results_stats(self):
+        with CheckResultsDatabase(self.db_path, batch_size=1) as results_db:
+            results_db.add_all(self.check_results_by_path)
+            self.assertEqual(CheckResultsProcessing.failed_check_results_stats(results_db),
+                             Counter({CHECK_NAMES.check_desired_reference: 2}))
+
+    def test_count_by(self):
+        with CheckResultsDatabase(self.db_path) as results_db:
+            results_db.add_all(self.check_results_by_path)
+            self.assertEqual(results_db.count_by('executed'), Counter({True: 2, False: 1}))
+            self.assertEqual(results_db.count_by('result'), Counter({RESULT.FAILURE: 2, None: 1}))
+            self.assertEqual(results_db.count_by('severity'), Counter({SEVERITY.IMPORTANT: 2, SEVERITY.WARNING: 1}))
+            with self.assertRaises(ValueError):
+                results_db.count_by('fpath')
+
+    def test_has_failures(self):
+        with CheckResultsDatabase(self.db_path) as results_db:
+            results_db.add_all(self.check_results_by_path)
+            self.assertTrue(results_db.has_failures())
+            self.assertFalse(results_db.has_failures([CHECK_NAMES.check_desired_reference]))
+
+    def test_runs_kept_apart(self):
+        with CheckResultsDatabase(self.db_path) as results_db:
+            results_db.add_all(self.check_results_by_path)
+            first_run_id = results_db.run_id
+        with CheckResultsDatabase(self.db_path) as results_db:
+            self.assertNotEqual(results_db.run_id, first_run_id)
+            self.assertEqual(results_db.count_files_by_failed_check(), Counter())
+        with CheckResultsDatabase(self.db_path, run_id=first_run_id) as results_db:
+            self.assertEqual(results_db.get_check_results('/seq/2.cram'),
+                             [CheckResult(CHECK_NAMES.check_desired_reference, result=RESULT.FAILURE,
+                                          severity=SEVERITY.WARNING, error_message="Ids: [s1]")])
+            self.assertEqual(results_db.get_check_results('/seq/1.cram')[0].error_message, '["Wrong reference"]')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+Copyright (C) 2016  Genome Research Ltd.
+
+Author: Irina Colgiu <ic4@sanger.ac.uk>
+
+This program is part of meta-check
+
+meta-check is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+This file has been created on Oct 18, 2026.
+"""
+
+import pickle
+import unittest
+
+from mcheck.check_names import CHECK_NAMES
+from mcheck.results.checks_results import CheckResult, CHECK_NAME_CODES
+from mcheck.results.constants import RESULT, SEVERITY
+from mcheck.results.results_processing import CheckResultsProcessing
+from mcheck.results.results_store import CheckResultsStore
+
+
+class CheckResultsStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.check_results_by_path = {
+            '/seq/1.cram': [CheckResult(CHECK_NAMES.check_npg_qc_field),
+                            CheckResult(CHECK_NAMES.check_target_field, result=RESULT.FAILURE,
+                                        severity=SEVERITY.WARNING, error_message="The target field looks invalid")],
+            '/seq/2.cram': [CheckResult(CHECK_NAMES.check_npg_qc_field, executed=False, result=None,
+                                        error_message=[]),
+                            CheckResult(CHECK_NAMES.check_more_than_one_replica, result=RESULT.FAILURE)],
+            '/seq/3.cram': []}
+        self.store = CheckResultsStore.from_dict(self.check_results_by_path)
+
+    def test_same_results_as_dict(self):
+        self.assertEqual(list(self.store.keys()), list(self.check_results_by_path.keys()))
+        self.assertEqual(dict(self.store), self.check_results_by_path)
+        self.assertEqual(self.store['/seq/2.cram'][0].error_message, [])
+        self.assertIsNone(self.store['/seq/2.cram'][0].result)
+
+    def test_results_added_again_for_a_file(self):
+        self.store.add('/seq/3.cram', [CheckResult(CHECK_NAMES.check_npg_qc_field)])
+        self.assertEqual(len(self.store), 3)
+        self.assertEqual(self.store['/seq/3.cram'], [CheckResult(CHECK_NAMES.check_npg_qc_field)])
+
+    def test_has_failures(self):
+        self.assertTrue(self.store.has_failures())
+        self.assertTrue(self.store.has_failures([CHECK_NAMES.check_more_than_one_replica]))
+        self.assertFalse(self.store.has_failures([CHECK_NAMES.check_more_than_one_replica,
+                                                  CHECK_NAMES.check_target_field]))
+
+    def test_failed_check_results_stats(self):
+        self.assertEqual(CheckResultsProcessing.failed_check_results_stats(self.store),
+                         CheckResultsProcessing.failed_check_results_stats(self.check_results_by_path))
+
+    def test_pickled_with_codes_of_another_process(self):
+        self.store.add('/seq/4.cram', [CheckResult('A check only known by this process')])
+        state = self.store.__getstate__()
+        # Another process might have given another code to the same check name:
+        check_names = state['_code_tables']['_check_codes']
+        check_names.append(check_names.pop(CHECK_NAME_CODES.encode(CHECK_NAMES.check_target_field)))
+        state['_check_codes'] = state['_check_codes'].__class__(
+            'I', (check_names.index(CHECK_NAME_CODES.decode(code)) for code in state['_check_codes']))
+        unpickled = CheckResultsStore.__new__(CheckResultsStore)
+        unpickled.__setstate__(state)
+        self.assertEqual(dict(unpickled), dict(self.store))
+        self.assertEqual(dict(pickle.loads(pickle.dumps(self.store))), dict(self.store))
+
+
+if __name__ == "__main__":
+    unittest.main()
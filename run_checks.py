@@ -20,12 +20,21 @@ This file has been created on May 05, 2016.
 """
 
 
+import sys
 from sys import exit
 from mcheck.main.api import check_metadata_fetched_by_metadata, check_metadata_fetched_by_path, check_metadata_given_as_json_stream
 from mcheck.check_names import CHECK_NAMES
 from mcheck.results.checks_results import RESULT
+from mcheck.results.results_store import CheckResultsStore
+from mcheck.results.results_db import CheckResultsDatabase
+from mcheck.results import error_details
 from mcheck.main import arg_parser
-from mcheck.main.output_formatter import format_output_as_json, format_output_as_tsv
+from mcheck.main.output_formatter import JSONResultsWriter, NDJSONResultsWriter, TSVResultsWriter, \
+    DeduplicatedResultsWriter
+from mcheck.main.run_statistics import RunStatistics
+from mcheck.com.profiling import PROFILER
+from mcheck.main.pipeline import FileChecksPipeline
+from mcheck.metadata.file_header_metadata.header_cache import SAMFileHeaderMetadataCache
 
 # import logging
 # my_logger = logging.getLogger('MyLogger')
@@ -35,6 +44,8 @@ from mcheck.main.output_formatter import format_output_as_json, format_output_as
 def decide_exit_status(check_results_by_path):
     exit_status = 0
     irrelevant = [CHECK_NAMES.check_for_samples_in_more_studies, CHECK_NAMES.check_more_than_one_replica]
+    if isinstance(check_results_by_path, CheckResultsStore):
+        return 1 if check_results_by_path.has_failures(irrelevant) else 0
     for fpath, check_results in check_results_by_path.items():
         for check_result in check_results:
             if check_result.result == RESULT.FAILURE and check_result.check_name not in irrelevant:
@@ -88,6 +99,19 @@ def main():
     except AttributeError:
         reference = None
 
+    try:
+        irods_workers = args.irods_workers
+        irods_chunk_size = args.irods_chunk_size
+        baton_pool_size = args.baton_pool_size
+        irods_cache = args.irods_cache
+        irods_cache_ttl = args.irods_cache_ttl
+    except AttributeError:
+        irods_workers = 1
+        irods_chunk_size = None
+        baton_pool_size = None
+        irods_cache = None
+        irods_cache_ttl = None
+
     if args.metadata_fetching_strategy == 'fetch_by_metadata':
         if not file_types:
             print(
@@ -101,24 +125,82 @@ def main():
                 "WARNING! You haven't filtered on manual_qc field. You will get the report from checking all the data, "
                 "no matter if qc pass of fail.")
 
+    if args.pipelined and args.workers > 1:
+        print("ERROR: --pipelined can't be used together with --workers.")
+        exit(1)
+
+    if args.profile_stages or args.profile_stages_json:
+        PROFILER.enable()
+
+    error_details.set_max_listed_items(None if args.full_error_details else args.max_listed_ids)
+
+    output = open(args.output_file, 'w') if args.output_file else sys.stdout
+    if args.json_output:
+        results_writer = JSONResultsWriter(output)
+    elif args.ndjson_output:
+        results_writer = NDJSONResultsWriter(output)
+    elif args.deduplicated_output:
+        results_writer = DeduplicatedResultsWriter(output)
+    else:
+        results_writer = TSVResultsWriter(output)
+
+    run_stats = RunStatistics()
+    pipeline = None
+    # Without a pipeline, the results are written a chunk of files at a time, as soon as the chunk is checked:
+    on_result = results_writer.write
+    if args.pipelined:
+        header_cache = SAMFileHeaderMetadataCache(args.header_cache) if args.header_cache else None
+        # The results of each file are written as soon as its checks are done:
+        pipeline = FileChecksPipeline(header_workers=args.header_workers, seqscape_workers=args.seqscape_workers,
+                                      run_stats=run_stats, header_timeout=args.header_timeout,
+                                      header_cache=header_cache, on_result=results_writer.write)
+        on_result = None
     if args.metadata_fetching_strategy == 'fetch_by_metadata':
         check_results_by_fpath = check_metadata_fetched_by_metadata(filter_npg_qc, filter_target, file_types,
                                                                     study_name, study_acc_nr, study_internal_id,
-                                                                    irods_zone, reference)
+                                                                    irods_zone, reference, run_stats=run_stats,
+                                                                    pipeline=pipeline, workers=args.workers,
+                                                                    header_workers=args.header_workers,
+                                                                    header_timeout=args.header_timeout,
+                                                                    header_cache_path=args.header_cache,
+                                                                    on_result=on_result)
     elif args.metadata_fetching_strategy == 'fetch_by_path':
-        check_results_by_fpath = check_metadata_fetched_by_path(irods_fpaths, reference)
+        check_results_by_fpath = check_metadata_fetched_by_path(irods_fpaths, reference, run_stats=run_stats,
+                                                                irods_workers=irods_workers,
+                                                                irods_chunk_size=irods_chunk_size,
+                                                                baton_pool_size=baton_pool_size,
+                                                                pipeline=pipeline, workers=args.workers,
+                                                                header_workers=args.header_workers,
+                                                                header_timeout=args.header_timeout,
+                                                                header_cache_path=args.header_cache,
+                                                                irods_cache_path=irods_cache,
+                                                                irods_cache_ttl=irods_cache_ttl, on_result=on_result)
     elif args.metadata_fetching_strategy == 'given_at_stdin':
-        check_results_by_fpath = check_metadata_given_as_json_stream(reference)
+        check_results_by_fpath = check_metadata_given_as_json_stream(reference, run_stats=run_stats, pipeline=pipeline,
+                                                                     workers=args.workers,
+                                                                     header_workers=args.header_workers,
+                                                                     header_timeout=args.header_timeout,
+                                                                     header_cache_path=args.header_cache,
+                                                                     on_result=on_result)
     else:
         raise ValueError("Fetching strategy not supported")
-
-    if args.json_output:
-        check_results_as_json = format_output_as_json(check_results_by_fpath)
-        print(check_results_as_json)
-    else:
-        result_as_tsv_string = format_output_as_tsv(check_results_by_fpath)
-        print(result_as_tsv_string)
-
+    if pipeline and pipeline.header_cache:
+        pipeline.header_cache.close()
+
+    results_writer.close()
+    if args.output_file:
+        output.close()
+    if args.results_db:
+        with CheckResultsDatabase(args.results_db) as results_db:
+            results_db.add_all(check_results_by_fpath)
+            print("Check results stored in %s as run %s" % (args.results_db, results_db.run_id), file=sys.stderr)
+
+    if args.verbosity:
+        print(run_stats.format_as_text(), file=sys.stderr)
+    if args.profile_stages:
+        print(PROFILER.format_as_text(), file=sys.stderr)
+    if args.profile_stages_json:
+        PROFILER.write_as_json(args.profile_stages_json)
     exit(decide_exit_status(check_results_by_fpath))
 
 if __name__ == '__main__':